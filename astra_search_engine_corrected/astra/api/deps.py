@@ -2,12 +2,19 @@ from __future__ import annotations
 
 from collections.abc import Generator
 
+from fastapi import Request
+
 from astra.common.config import settings
 from astra.storage.db import connect
 from astra.storage.repo import Repo
 
 
-def get_repo() -> Generator[Repo, None, None]:
+def get_repo(request: Request) -> Generator[Repo, None, None]:
+    image = getattr(request.app.state, "image", None)
+    if image is not None:
+        # this thread's read-only connection to the shared index image; kept across requests
+        yield image.repo()
+        return
     conn = connect(settings.db_path)
     try:
         yield Repo(conn)
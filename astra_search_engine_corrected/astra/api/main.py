@@ -2,49 +2,235 @@ from __future__ import annotations
 
 import logging
 
-from fastapi import Depends, FastAPI, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 
 from astra.api.deps import get_repo
 from astra.api.middleware import request_logging_middleware
-from astra.api.schemas import HealthResponse, SearchResponse
+from astra.api.schemas import (
+    BatchSearchItem,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    HealthResponse,
+    PostingCacheResponse,
+    SearchResponse,
+    SpellResponse,
+    SuggestResponse,
+    WorkersResponse,
+)
+from astra.common.config import settings
 from astra.common.tokenizer import parse_query
-from astra.ranker.search_service import SearchService
+from astra.indexer.merger import SegmentMergeThread
+from astra.ranker.search_service import BatchQuery, SearchPage, SearchService, StaleCursorError
+from astra.ranker.sharded import ShardedSearchService
+from astra.ranker.spelling import Correction, did_you_mean, expand_query
+from astra.ranker.suggest import Suggester
+from astra.storage.image import ImageWatcher, IndexImage, build_image, read_worker_reports
+from astra.storage.maintenance import MaintenanceThread
+from astra.storage.posting_cache import posting_cache_stats
 from astra.storage.repo import Repo
+from astra.storage.shards import shard_paths
 
 log = logging.getLogger(__name__)
 
 
+def _search_response(
+    q: str,
+    k: int,
+    page: int,
+    page_size: int,
+    result: SearchPage,
+    corrections: dict[str, list[Correction]] | None = None,
+) -> SearchResponse:
+    return SearchResponse(
+        query=q,
+        k=k,
+        page=page,
+        page_size=page_size,
+        total_hits=result.total,
+        total_hits_relation=result.total_relation,
+        next_cursor=result.next_cursor,
+        did_you_mean=did_you_mean(q, corrections or {}),
+        hits=[h.__dict__ for h in result.hits],
+    )
+
+
+def _thin(result: SearchPage, page_size: int) -> bool:
+    # corrections cost a lookup per unknown word (and a pool round trip when sharded):
+    # only offer "did you mean" when the results are empty or short
+    return result.total < page_size
+
+
+def serves_image() -> bool:
+    # segment files are already immutable and shared; sharded search has its own pool
+    return (
+        settings.serve_workers > 1
+        and settings.num_shards <= 1
+        and settings.index_layout == "table"
+    )
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="Astra Search", version="1.0.0")
 
     app.middleware("http")(request_logging_middleware)
 
+    app.state.sharded = None
+    if settings.num_shards > 1:
+        app.state.sharded = ShardedSearchService(shard_paths(settings.db_path, settings.num_shards))
+        app.add_event_handler("shutdown", app.state.sharded.close)
+
+    app.state.suggester = Suggester(shard_paths(settings.db_path, settings.num_shards))
+    app.add_event_handler("startup", app.state.suggester.rebuild)
+
+    app.state.image = None
+    if serves_image():
+        # workers map one read-only snapshot instead of each caching its own copy
+        app.state.image = IndexImage(build_image(settings.db_path))
+        watcher = ImageWatcher(app.state.image)
+        app.add_event_handler("startup", watcher.start)
+        app.add_event_handler("shutdown", watcher.stop)
+
+    # with several workers, `astra serve` runs merges and maintenance once, in the parent
+    if settings.index_layout == "segments" and settings.serve_workers <= 1:
+        for path in shard_paths(settings.db_path, settings.num_shards):
+            merger = SegmentMergeThread(path)
+            app.add_event_handler("startup", merger.start)
+            app.add_event_handler("shutdown", merger.stop)
+
+    if settings.maintenance_interval_seconds > 0 and settings.serve_workers <= 1:
+        for path in shard_paths(settings.db_path, settings.num_shards):
+            maintenance = MaintenanceThread(path)
+            app.add_event_handler("startup", maintenance.start)
+            app.add_event_handler("shutdown", maintenance.stop)
+
     @app.get("/health", response_model=HealthResponse)
     def health() -> HealthResponse:
         return HealthResponse(status="ok")
 
+    @app.get("/workers", response_model=WorkersResponse)
+    def workers() -> WorkersResponse:
+        return WorkersResponse(workers=read_worker_reports(settings.db_path))
+
+    @app.get("/cache/postings", response_model=PostingCacheResponse)
+    def postings_cache() -> PostingCacheResponse:
+        return PostingCacheResponse(caches=posting_cache_stats())
+
     @app.get("/search", response_model=SearchResponse)
     def search(
+        request: Request,
         q: str = Query(..., min_length=1),
         k: int = Query(10, ge=1, le=1000),
         page: int = Query(1, ge=1),
         page_size: int = Query(10, ge=1, le=100),
+        search_after: str | None = Query(
+            None, description="Opaque cursor from a previous `next_cursor`"
+        ),
+        track_total_hits: int = Query(
+            settings.track_total_hits, ge=0, description="Count hits exactly up to this"
+        ),
+        fuzzy: bool = Query(
+            False, description="Expand misspelled words to indexed terms within edit distance 2"
+        ),
         repo: Repo = Depends(get_repo),
     ) -> SearchResponse:
         query = parse_query(q)
-        svc = SearchService(repo)
+        svc = request.app.state.sharded or SearchService(repo)
+        corrections = svc.spelling(query) if fuzzy else None
+        if corrections:
+            query = expand_query(query, corrections)
+
+        try:
+            result = svc.search_page(
+                query=query,
+                k=k,
+                page=page,
+                page_size=page_size,
+                search_after=search_after,
+                track_total_hits=track_total_hits,
+            )
+        except StaleCursorError as e:
+            raise HTTPException(status_code=409, detail=str(e)) from e
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+        if result.total:
+            request.app.state.suggester.record_query(q)
+        if corrections is None and _thin(result, page_size):
+            corrections = svc.spelling(parse_query(q))
+        return _search_response(q, k, page, page_size, result, corrections)
 
-        hits, total = svc.search(query=query, k=k, page=page, page_size=page_size)
-        return SearchResponse(
+    @app.post("/search/batch", response_model=BatchSearchResponse)
+    def search_batch(
+        request: Request,
+        body: BatchSearchRequest,
+        repo: Repo = Depends(get_repo),  # noqa: B008
+    ) -> BatchSearchResponse:
+        svc = request.app.state.sharded or SearchService(repo)
+        queries = [parse_query(item.q) for item in body.queries]
+        corrections = [
+            svc.spelling(query) if item.fuzzy else None
+            for item, query in zip(body.queries, queries, strict=True)
+        ]
+        batch = [
+            BatchQuery(
+                query=expand_query(query, fixes) if fixes else query,
+                k=item.k,
+                page=item.page,
+                page_size=item.page_size,
+                search_after=item.search_after,
+                track_total_hits=item.track_total_hits,
+            )
+            for item, query, fixes in zip(body.queries, queries, corrections, strict=True)
+        ]
+        result = svc.search_batch(batch)
+
+        items: list[BatchSearchItem] = []
+        for item, fixes, outcome in zip(body.queries, corrections, result.outcomes, strict=True):
+            if outcome.page is None:
+                status = 409 if isinstance(outcome.error, StaleCursorError) else 400
+                error = str(outcome.error)
+                items.append(BatchSearchItem(status=status, error=error, took_ms=outcome.took_ms))
+                continue
+            if outcome.page.total:
+                request.app.state.suggester.record_query(item.q)
+            if fixes is None and _thin(outcome.page, item.page_size):
+                fixes = svc.spelling(parse_query(item.q))
+            response = _search_response(
+                item.q, item.k, item.page, item.page_size, outcome.page, fixes
+            )
+            items.append(BatchSearchItem(took_ms=outcome.took_ms, result=response))
+        return BatchSearchResponse(
+            took_ms=result.took_ms,
+            terms=result.terms,
+            posting_lists=result.posting_lists,
+            documents=result.documents,
+            results=items,
+        )
+
+    @app.get("/spell", response_model=SpellResponse)
+    def spell(
+        request: Request,
+        q: str = Query(..., min_length=1, max_length=200),
+        repo: Repo = Depends(get_repo),  # noqa: B008
+    ) -> SpellResponse:
+        svc = request.app.state.sharded or SearchService(repo)
+        corrections = svc.spelling(parse_query(q))
+        return SpellResponse(
             query=q,
-            k=k,
-            page=page,
-            page_size=page_size,
-            total_hits=total,
-            hits=[h.__dict__ for h in hits],
+            did_you_mean=did_you_mean(q, corrections),
+            corrections={w: [c.__dict__ for c in cs] for w, cs in corrections.items()},
         )
 
+    @app.get("/suggest", response_model=SuggestResponse)
+    def suggest(
+        request: Request,
+        prefix: str = Query(..., min_length=1, max_length=100),
+        k: int = Query(settings.suggest_top_k, ge=1, le=settings.suggest_top_k),
+    ) -> SuggestResponse:
+        suggestions = request.app.state.suggester.suggest(prefix, k)
+        return SuggestResponse(prefix=prefix, suggestions=[s.__dict__ for s in suggestions])
+
     @app.exception_handler(Exception)
     async def unhandled_exception_handler(_, exc: Exception):
         log.exception("unhandled_exception", exc_info=exc)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from pydantic import BaseModel, Field
 
+from astra.common.config import settings
+
 
 class HealthResponse(BaseModel):
     status: str = "ok"
@@ -21,4 +23,95 @@ class SearchResponse(BaseModel):
     page: int = Field(ge=1)
     page_size: int = Field(ge=1, le=100)
     total_hits: int
+    total_hits_relation: str = "eq"
+    next_cursor: str | None = None
+    # the query with misspelled (unindexed) words replaced by their best correction
+    did_you_mean: str | None = None
     hits: list[SearchHit]
+
+
+class BatchQueryRequest(BaseModel):
+    q: str = Field(min_length=1)
+    k: int = Field(10, ge=1, le=1000)
+    page: int = Field(1, ge=1)
+    page_size: int = Field(10, ge=1, le=100)
+    search_after: str | None = None
+    track_total_hits: int | None = Field(None, ge=0)
+    fuzzy: bool = False
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[BatchQueryRequest] = Field(min_length=1, max_length=settings.max_batch_queries)
+
+
+class BatchSearchItem(BaseModel):
+    status: int = 200
+    error: str | None = None
+    took_ms: float
+    result: SearchResponse | None = None
+
+
+class BatchSearchResponse(BaseModel):
+    took_ms: float
+    terms: int  # distinct terms whose postings the batch prefetched
+    posting_lists: int  # posting lists read, each once
+    documents: int  # documents fetched, each once
+    results: list[BatchSearchItem]
+
+
+class SuggestItem(BaseModel):
+    text: str
+    score: float
+    kind: str
+
+
+class SuggestResponse(BaseModel):
+    prefix: str
+    suggestions: list[SuggestItem]
+
+
+class SpellCorrection(BaseModel):
+    term: str
+    distance: int
+    df: int
+
+
+class SpellResponse(BaseModel):
+    query: str
+    did_you_mean: str | None = None
+    # misspelled word -> indexed terms within edit distance, best first
+    corrections: dict[str, list[SpellCorrection]]
+
+
+class PostingCacheStats(BaseModel):
+    index_version: int | None = None
+    entries: int
+    bytes: int
+    budget_bytes: int
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    invalidations: int
+    rejected: int
+
+
+class PostingCacheResponse(BaseModel):
+    # this process's caches by database file (sharded search caches inside its pool workers)
+    caches: dict[str, PostingCacheStats]
+
+
+class WorkerMemory(BaseModel):
+    pid: int
+    index_version: int
+    image: str
+    updated_at: float
+    rss_bytes: int = 0
+    pss_bytes: int = 0
+    shared_bytes: int = 0
+    private_bytes: int = 0
+    image_rss_bytes: int = 0
+
+
+class WorkersResponse(BaseModel):
+    workers: list[WorkerMemory]
@@ -1,19 +1,42 @@
 from __future__ import annotations
 
+import json
 import logging
+import os
+import statistics
+import time
+from collections import Counter
 from pathlib import Path
 from typing import Optional
 
 import typer
 import uvicorn
 
-from astra.api.main import create_app
+from astra.api.main import create_app, serves_image
 from astra.common.config import settings
 from astra.common.logging import setup_logging
+from astra.common.tokenizer import parse_query
 from astra.crawler.crawler import PoliteCrawler
+from astra.indexer.impacts import build_impacts
 from astra.indexer.indexer import Indexer
-from astra.storage.db import connect
+from astra.indexer.live import LiveIndexer
+from astra.indexer.merger import SegmentMerger, SegmentMergeThread
+from astra.indexer.pagerank import compute_priors
+from astra.indexer.rebuild import IndexRebuilder
+from astra.indexer.spelling import update_spelling_index
+from astra.ingest.loader import BulkLoader, IngestStats
+from astra.ingest.readers import iter_records
+from astra.loadtest.queries import cycle_queries, read_query_file, zipf_queries
+from astra.loadtest.runner import run_loadtest
+from astra.ranker.bm25 import BM25Ranker
+from astra.ranker.impact import evaluate_impacts
+from astra.storage.db import connect, tx
+from astra.storage.image import build_image
+from astra.storage.maintenance import MaintenanceThread, storage_report
+from astra.storage.maintenance import maintain as maintain_db
 from astra.storage.repo import Repo
+from astra.storage.segments import segment_report
+from astra.storage.shards import ShardRouter, shard_paths
 
 app = typer.Typer(add_completion=False, help="Astra mini search engine CLI")
 
@@ -24,53 +47,465 @@ def crawl(
     allowed_domains: str = typer.Option(..., "--allowed-domains", help="Comma-separated domain allowlist"),
     max_pages: int = typer.Option(200, help="Max pages to fetch"),
     max_depth: int = typer.Option(3, help="Max BFS depth from seeds"),
+    shards: int = typer.Option(
+        settings.num_shards, help="Number of shard databases to partition documents into"
+    ),
+    index_live: bool = typer.Option(
+        False,
+        "--index-live",
+        help="Index stored pages while crawling, so they are searchable within seconds",
+    ),
 ) -> None:
-    """Crawl documents and persist into SQLite."""
+    """Crawl documents and persist into SQLite; prints throughput and per-host metrics as JSON."""
     setup_logging()
     log = logging.getLogger("astra.cli")
 
     domains = {d.strip() for d in allowed_domains.split(",") if d.strip()}
     seed_urls = [ln.strip() for ln in seeds.read_text(encoding="utf-8").splitlines() if ln.strip()]
 
-    conn = connect(settings.db_path)
-    repo = Repo(conn)
+    paths = shard_paths(settings.db_path, shards)
+    conns = [connect(p) for p in paths]
+    repo = Repo(conns[0]) if shards <= 1 else ShardRouter(conns)
     crawler = PoliteCrawler(repo=repo, allowed_domains=domains, max_pages=max_pages, max_depth=max_depth)
+    live = LiveIndexer(paths) if index_live else None
+    if live is not None:
+        live.start()
+    counts: Counter[str] = Counter()
     try:
-        results = crawler.crawl(seed_urls)
-        stored = sum(1 for r in results if r.status == "stored")
-        skipped = sum(1 for r in results if r.status == "skipped")
-        errors = sum(1 for r in results if r.status == "error")
-        log.info("crawl_done", extra={"stored": stored, "skipped": skipped, "errors": errors})
+        for r in crawler.iter_crawl(seed_urls):
+            counts[r.status] += 1
+            if live is not None and r.stored_doc_id is not None:
+                live.submit(r.stored_doc_id)
     finally:
         crawler.close()
-        conn.close()
+        if live is not None:
+            live.stop()
+            live.join()
+        for conn in conns:
+            conn.close()
+    log.info(
+        "crawl_done",
+        extra={"stored": counts["stored"], "skipped": counts["skipped"], "errors": counts["error"]},
+    )
+    report = crawler.metrics.as_dict(crawler.scheduler)
+    if live is not None:
+        report["live_index"] = live.as_dict()
+    typer.echo(json.dumps(report, indent=2))
 
 
 @app.command()
-def index(batch_size: int = typer.Option(200, help="Number of unindexed documents to index per run")) -> None:
+def index(
+    batch_size: int = typer.Option(200, help="Number of unindexed documents to index per run"),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to index"),
+    layout: str = typer.Option(settings.index_layout, help="Index layout: 'table' or 'segments'"),
+    merge: bool = typer.Option(True, help="Segment layout: run the merge policy after flushing"),
+) -> None:
     """Index newly crawled documents into the SQLite inverted index."""
     setup_logging()
     log = logging.getLogger("astra.cli")
+    settings.index_layout = layout
+
+    for path in shard_paths(settings.db_path, shards):
+        conn = connect(path)
+        try:
+            repo = Repo(conn)
+            indexer = Indexer(repo)
+            n = indexer.index_new_documents(batch_size=batch_size)
+            if layout == "segments" and merge:
+                SegmentMerger(repo).maybe_merge()
+            log.info("index_done", extra={"indexed_docs": n, "db_path": path})
+        finally:
+            conn.close()
+
+
+@app.command()
+def reindex(
+    full: bool = typer.Option(
+        False, "--full", help="Rebuild by external sort and swap, not per-doc inserts"
+    ),
+    memory_mb: int = typer.Option(
+        settings.rebuild_memory_mb, help="--full: postings buffer budget per run"
+    ),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to reindex"),
+    layout: str = typer.Option(settings.index_layout, help="Index layout: 'table' or 'segments'"),
+) -> None:
+    """Reindex every document from scratch."""
+    setup_logging()
+    settings.index_layout = layout
 
+    reports = []
+    for path in shard_paths(settings.db_path, shards):
+        conn = connect(path)
+        try:
+            repo = Repo(conn)
+            start = time.perf_counter()
+            if full:
+                report = IndexRebuilder(repo, memory_mb=memory_mb).rebuild().as_dict()
+            else:
+                with tx(conn, immediate=True):
+                    conn.execute("DELETE FROM indexed_docs")
+                report = {"docs": Indexer(repo).index_documents(repo.iter_unindexed_documents())}
+                report["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+            reports.append({"db_path": path, **report})
+        finally:
+            conn.close()
+    typer.echo(json.dumps(reports if len(reports) > 1 else reports[0], indent=2))
+
+
+@app.command()
+def impacts(
+    bits: int = typer.Option(settings.impact_bits, help="Bits per quantized impact"),
+    eval_queries: Path | None = typer.Option(  # noqa: B008
+        None, help="Query file (one per line) to compare against exact BM25"
+    ),
+    k: int = typer.Option(10, help="Cutoff for the quality and latency comparison"),
+    layout: str = typer.Option(settings.index_layout, help="Index layout: 'table' or 'segments'"),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases"),
+) -> None:
+    """Build quantized impact-ordered postings for score-at-a-time search."""
+    if shards > 1:
+        raise typer.BadParameter("sharded search always scores exact BM25", param_hint="--shards")
+    setup_logging()
+    settings.index_layout = layout
     conn = connect(settings.db_path)
     try:
         repo = Repo(conn)
-        indexer = Indexer(repo)
-        n = indexer.index_new_documents(batch_size=batch_size)
-        log.info("index_done", extra={"indexed_docs": n})
+        report: dict[str, object] = {"build": build_impacts(repo, bits=bits)}
+        if eval_queries:
+            lines = eval_queries.read_text(encoding="utf-8").splitlines()
+            queries = [ln.strip() for ln in lines if ln.strip()]
+            report["evaluation"] = evaluate_impacts(repo, queries, k=k)
+        typer.echo(json.dumps(report, indent=2))
     finally:
         conn.close()
 
 
+@app.command("rank-prior")
+def rank_prior(
+    damping: float = typer.Option(settings.pagerank_damping, help="PageRank damping factor"),
+    tol: float = typer.Option(
+        1e-9, help="Stop when the L1 change of the rank vector drops below this"
+    ),
+    max_iter: int = typer.Option(100, help="Maximum power iterations"),
+    shards: int = typer.Option(
+        settings.num_shards, help="Number of shard databases in the link graph"
+    ),
+) -> None:
+    """Compute PageRank over the crawled link graph and store it as a static ranking prior."""
+    setup_logging()
+    conns = [connect(p) for p in shard_paths(settings.db_path, shards)]
+    try:
+        repos = [Repo(c) for c in conns]
+        report = compute_priors(repos, damping=damping, tol=tol, max_iter=max_iter)
+        typer.echo(json.dumps(report, indent=2))
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+@app.command()
+def spelling(
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to update"),
+    rebuild: bool = typer.Option(False, help="Regenerate the index for every term"),
+) -> None:
+    """Build the typo-tolerance (symmetric delete) index for terms not covered yet."""
+    setup_logging()
+    report = []
+    for path in shard_paths(settings.db_path, shards):
+        conn = connect(path)
+        try:
+            start = time.perf_counter()
+            terms = update_spelling_index(Repo(conn), rebuild=rebuild)
+            variants = int(conn.execute("SELECT COUNT(*) FROM spell_deletes").fetchone()[0])
+            report.append(
+                {
+                    "db_path": path,
+                    "terms_added": terms,
+                    "variants": variants,
+                    "seconds": round(time.perf_counter() - start, 3),
+                }
+            )
+        finally:
+            conn.close()
+    typer.echo(json.dumps(report, indent=2))
+
+
+@app.command()
+def ingest(
+    paths: list[Path] = typer.Argument(..., help="JSONL or WARC files (optionally .gz)"),  # noqa: B008
+    fmt: str = typer.Option("auto", "--format", help="Input format: 'auto', 'jsonl' or 'warc'"),
+    batch_size: int = typer.Option(500, help="Documents per transaction"),
+    index_docs: bool = typer.Option(
+        False, "--index/--no-index", help="Index documents as they are loaded"
+    ),
+    cache_mb: int = typer.Option(256, help="SQLite page cache size during the load"),
+    shards: int = typer.Option(
+        settings.num_shards, help="Number of shard databases to partition documents into"
+    ),
+) -> None:
+    """Bulk-load an offline corpus without crawling."""
+    setup_logging()
+
+    def progress(s: IngestStats) -> None:
+        typer.echo(json.dumps({"progress": s.as_dict()}), err=True)
+
+    conns = [connect(p) for p in shard_paths(settings.db_path, shards)]
+    try:
+        loader = BulkLoader(
+            Repo(conns[0]) if shards <= 1 else ShardRouter(conns),
+            batch_size=batch_size,
+            index=index_docs,
+            cache_mb=cache_mb,
+            on_progress=progress,
+        )
+        records = (rec for path in paths for rec in iter_records(path, fmt))
+        stats = loader.load(records)
+        typer.echo(json.dumps(stats.as_dict(), indent=2))
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+@app.command()
+def delete(
+    url: str = typer.Option(..., help="URL of the document to delete"),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases"),
+) -> None:
+    """Delete a document (tombstoned until the next merge in the segment layout)."""
+    setup_logging()
+    conns = [connect(p) for p in shard_paths(settings.db_path, shards)]
+    try:
+        repo = Repo(conns[0]) if shards <= 1 else ShardRouter(conns)
+        doc_id = repo.delete_document(url)
+        typer.echo(json.dumps({"url": url, "deleted_doc_id": doc_id}))
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+@app.command()
+def merge(
+    full: bool = typer.Option(False, "--all", help="Merge every live segment into one"),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to merge"),
+) -> None:
+    """Compact index segments according to the merge policy."""
+    setup_logging()
+    reports = []
+    for path in shard_paths(settings.db_path, shards):
+        conn = connect(path)
+        try:
+            merger = SegmentMerger(Repo(conn))
+            n = merger.merge_all() if full else merger.maybe_merge()
+            reports.append({"db_path": path, "merges": n, **segment_report(conn)})
+        finally:
+            conn.close()
+    typer.echo(json.dumps(reports if len(reports) > 1 else reports[0], indent=2))
+
+
+@app.command()
+def segments(
+    bench_queries: Path | None = typer.Option(  # noqa: B008
+        None, help="Query file (one per line) to time against the segments"
+    ),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to report"),
+) -> None:
+    """Report live segments, tombstones, write amplification and optional query latency."""
+    setup_logging()
+    settings.index_layout = "segments"
+    queries: list[str] = []
+    if bench_queries:
+        lines = bench_queries.read_text(encoding="utf-8").splitlines()
+        queries = [ln for ln in lines if ln.strip()]
+    reports = []
+    for path in shard_paths(settings.db_path, shards):
+        conn = connect(path)
+        try:
+            report = {"db_path": path, **segment_report(conn)}
+            ranker = BM25Ranker(Repo(conn))
+            latencies = []
+            for line in queries:
+                start = time.perf_counter()
+                ranker.search(parse_query(line), k=10)
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            if latencies:
+                latencies.sort()
+                report["query_latency_ms"] = {
+                    "queries": len(latencies),
+                    "mean": round(statistics.fmean(latencies), 3),
+                    "p95": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+                }
+            reports.append(report)
+        finally:
+            conn.close()
+    typer.echo(json.dumps(reports if len(reports) > 1 else reports[0], indent=2))
+
+
+@app.command()
+def maintain(
+    analyze: bool = typer.Option(True, help="Run a full ANALYZE (otherwise only PRAGMA optimize)"),
+    vacuum_pages: int | None = typer.Option(None, help="Free pages to release (default: all)"),
+    enable_incremental_vacuum: bool = typer.Option(
+        False, help="Switch an existing database to auto_vacuum=INCREMENTAL (runs one full VACUUM)"
+    ),
+    report_only: bool = typer.Option(False, help="Only print the storage report"),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to maintain"),
+) -> None:
+    """Compact stats, refresh planner statistics, vacuum, checkpoint the WAL and report storage."""
+    setup_logging()
+    reports = []
+    for path in shard_paths(settings.db_path, shards):
+        conn = connect(path)
+        try:
+            repo = Repo(conn)
+            if report_only:
+                reports.append(storage_report(repo))
+                continue
+            before = storage_report(repo)
+            steps = maintain_db(
+                repo,
+                analyze=analyze,
+                vacuum_pages=vacuum_pages,
+                enable_incremental_vacuum=enable_incremental_vacuum,
+            )
+            after = storage_report(repo)
+            keys = ("file_bytes", "wal_bytes", "freelist_pages", "stats_rows")
+            summary = {k: before[k] for k in keys}
+            reports.append({"db_path": path, "before": summary, "steps": steps, "after": after})
+        finally:
+            conn.close()
+    typer.echo(json.dumps(reports if len(reports) > 1 else reports[0], indent=2))
+
+
+@app.command()
+def loadtest(
+    queries: Path | None = typer.Option(  # noqa: B008
+        None, help="Query log to replay (one per line); default: Zipfian mix"
+    ),
+    zipf: int = typer.Option(
+        10_000, help="Synthetic queries to generate when no query file is given"
+    ),
+    url: str | None = typer.Option(
+        None, help="Base URL of a running server; default: in-process ASGI app"
+    ),
+    clients: int = typer.Option(32, help="Concurrent async clients"),
+    rates: str = typer.Option(
+        "25,50,100,200,400", help="Comma-separated arrival rates (queries/sec) to step through"
+    ),
+    duration: float = typer.Option(10.0, help="Seconds per rate step"),
+    warmup: float = typer.Option(1.0, help="Unrecorded seconds at the first rate"),
+    slo_p99_ms: float | None = typer.Option(None, help="p99 above this marks a step as saturated"),
+    k: int = typer.Option(10, help="k passed to /search"),
+    output: Path | None = typer.Option(None, help="Also write the JSON report here"),  # noqa: B008
+    seed: int = typer.Option(0, help="Seed for the query mix and arrival times"),
+) -> None:
+    """Measure throughput and tail latency of /search under an open-loop query load."""
+    try:
+        step_rates = [float(r) for r in rates.split(",") if r.strip()]
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--rates") from e
+    if not step_rates or min(step_rates) <= 0:
+        raise typer.BadParameter("expected one or more rates above 0", param_hint="--rates")
+    if clients < 1:
+        raise typer.BadParameter("expected at least 1", param_hint="--clients")
+    if duration <= 0:
+        raise typer.BadParameter("expected more than 0 seconds", param_hint="--duration")
+    if warmup < 0:
+        raise typer.BadParameter("expected 0 seconds or more", param_hint="--warmup")
+    if not queries and zipf < 1:
+        raise typer.BadParameter("expected at least 1 query", param_hint="--zipf")
+
+    setup_logging("WARNING")
+    # the request middleware logs unconditionally; a line per request would skew what is measured
+    logging.getLogger("astra.api").disabled = True
+    if queries:
+        mix = read_query_file(queries)
+        if not mix:
+            raise typer.BadParameter(f"no queries in {queries}", param_hint="--queries")
+    else:
+        conn = connect(settings.db_path)
+        try:
+            mix = zipf_queries(Repo(conn), zipf, seed=seed)
+        except ValueError as e:
+            raise typer.BadParameter(f"{e}; run `astra index` first", param_hint="--zipf") from e
+        finally:
+            conn.close()
+    report = run_loadtest(
+        url or create_app(),
+        cycle_queries(mix),
+        rates=step_rates,
+        duration=duration,
+        clients=clients,
+        k=k,
+        warmup=warmup,
+        slo_p99_ms=slo_p99_ms,
+        seed=seed,
+    )
+    report["queries"] = {"source": str(queries) if queries else "zipf", "distinct": len(set(mix))}
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text, encoding="utf-8")
+    typer.echo(text)
+
+
 @app.command()
 def serve(
     host: str = typer.Option("127.0.0.1", help="Host to bind"),
     port: int = typer.Option(8000, help="Port to bind"),
     log_level: str = typer.Option("info", help="Uvicorn log level"),
+    shards: int = typer.Option(settings.num_shards, help="Number of shard databases to search"),
+    layout: str = typer.Option(settings.index_layout, help="Index layout: 'table' or 'segments'"),
+    impact_scoring: bool = typer.Option(
+        settings.impact_scoring, help="Use quantized impacts when they are current"
+    ),
+    maintenance_interval: float = typer.Option(
+        settings.maintenance_interval_seconds,
+        help="Seconds between background maintenance passes (0 disables)",
+    ),
+    workers: int = typer.Option(
+        settings.serve_workers,
+        help=(
+            "Worker processes; >1 serves a shared memory-mapped index image. The posting "
+            "cache budget is split between workers; term dictionaries and suggestions are "
+            "held once per worker"
+        ),
+    ),
 ) -> None:
     """Run the FastAPI service."""
     setup_logging()
-    uvicorn.run(create_app(), host=host, port=port, log_level=log_level)
+    settings.num_shards = shards
+    settings.index_layout = layout
+    settings.maintenance_interval_seconds = maintenance_interval
+    settings.impact_scoring = impact_scoring
+    settings.serve_workers = workers
+    if workers <= 1:
+        uvicorn.run(create_app(), host=host, port=port, log_level=log_level)
+        return
+
+    # workers are fresh interpreters: hand them the effective settings through the environment
+    for name in ("db_path", "num_shards", "index_layout", "impact_scoring", "serve_workers"):
+        os.environ[f"ASTRA_{name.upper()}"] = str(getattr(settings, name))
+    if serves_image():
+        build_image(settings.db_path)  # workers start on it instead of racing to build it
+    background: list[SegmentMergeThread | MaintenanceThread] = []
+    for path in shard_paths(settings.db_path, shards):
+        if layout == "segments":
+            background.append(SegmentMergeThread(path))
+        if maintenance_interval > 0:
+            background.append(MaintenanceThread(path))
+    for t in background:
+        t.start()
+    try:
+        uvicorn.run(
+            "astra.api.main:create_app",
+            factory=True,
+            workers=workers,
+            host=host,
+            port=port,
+            log_level=log_level,
+        )
+    finally:
+        for t in background:
+            t.stop()
 
 
 def main() -> None:
@@ -7,9 +7,33 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="ASTRA_", case_sensitive=False)
 
     db_path: str = "./data/astra.db"
+    # >1 partitions documents by URL hash across `<db>-shardNN.db` files
+    num_shards: int = 1
+    # "table": one `postings` B-tree; "segments": immutable per-run segment files + merges
+    index_layout: str = "table"
+    segment_merge_factor: int = 4
+    segment_merge_interval_seconds: float = 30.0
+    # `astra reindex --full`: postings buffered before a sorted run is spilled, runs merged per pass
+    rebuild_memory_mb: int = 64
+    rebuild_merge_fanin: int = 64
+    # `astra crawl --index-live`: stored pages are indexed in batches of up to this many docs,
+    # at least every `live_index_flush_seconds`; the crawler blocks when `live_index_queue` is full
+    live_index_batch_docs: int = 50
+    live_index_flush_seconds: float = 2.0
+    live_index_queue: int = 1000
+    # `astra serve` maintenance task (0 disables): stats compaction/optimize/vacuum pass
+    # plus WAL checkpoints
+    maintenance_interval_seconds: float = 0.0
+    wal_checkpoint_seconds: float = 60.0
+    maintenance_vacuum_pages: int = 1000  # free pages released per background pass
+    # `astra serve --workers N`: worker processes share a memory-mapped read-only image of the index
+    serve_workers: int = 1
+    image_poll_seconds: float = 1.0  # how often workers check the live index_version
 
     user_agent: str = "AstraSearchBot/1.0"
-    crawl_delay_seconds: float = 1.0
+    crawl_delay_seconds: float = 1.0  # per-host floor; slow or throttling hosts get longer delays
+    crawl_max_delay_seconds: float = 60.0
+    crawl_latency_factor: float = 2.0  # settle at this multiple of a host's smoothed response time
     http_timeout_seconds: float = 10.0
     max_response_bytes: int = 2_000_000  # 2MB safety cap
 
@@ -17,9 +41,37 @@ class Settings(BaseSettings):
     title_boost: float = 2.0
     k1: float = 1.2
     b: float = 0.75
+    # score-at-a-time over quantized impacts when they are current (`astra impacts`)
+    impact_scoring: bool = False
+    impact_bits: int = 8
+    # static link-based prior (`astra rank-prior`) added once per matched doc:
+    # score += weight * prior
+    prior_weight: float = 1.0
+    pagerank_damping: float = 0.85
 
     # tokenization
     min_token_len: int = 2
 
+    # query parsing
+    max_wildcard_expansions: int = 64  # terms one `prefix*` may expand to
+    # typo tolerance: symmetric-delete index over the first `spell_prefix_length` chars of each term
+    spell_max_distance: int = 2
+    spell_prefix_length: int = 7
+    spell_max_suggestions: int = 5  # corrections returned per misspelled term
+    fuzzy_max_expansions: int = 3  # `/search?fuzzy=true`: corrections one unknown term expands to
+    # decoded posting lists kept per database file between queries (0 disables); split
+    # evenly between the processes of `astra serve --workers`
+    posting_cache_mb: int = 64
+    track_total_hits: int = 10_000  # count hits exactly up to this many
+    max_batch_queries: int = 64  # queries per POST /search/batch
+
+    # /suggest
+    suggest_top_k: int = 10
+    suggest_max_prefix_len: int = 12
+    suggest_max_candidates: int = 50_000
+    suggest_query_weight: float = 1.0  # score added per served query
+    suggest_max_queries: int = 10_000  # distinct served queries counted between rebuilds
+    suggest_refresh_seconds: float = 1.0
+
 
 settings = Settings()
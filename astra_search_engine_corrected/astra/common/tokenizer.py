@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Iterable
 
 from .config import settings
@@ -24,6 +24,12 @@ STOPWORDS = {
 class Query:
     terms: list[str]
     phrases: list[str]
+    # wildcard prefixes, e.g. "optim" for `optim*`
+    prefixes: list[str] = field(default_factory=list)
+    # boolean constraints: `+term` / `a AND b` must match, `-term` / `NOT term` must not;
+    # required terms are also part of `terms` (they contribute to the score)
+    required: list[str] = field(default_factory=list)
+    excluded: list[str] = field(default_factory=list)
 
 
 def tokenize(text: str) -> list[str]:
@@ -39,13 +45,65 @@ def tokenize(text: str) -> list[str]:
 
 
 _PHRASE_RE = re.compile(r'"([^"]+)"')
+_WILDCARD_RE = re.compile(r"(?<![A-Za-z0-9])([A-Za-z0-9]+)\*")
 
 
 def parse_query(q: str) -> Query:
     phrases = [p.strip() for p in _PHRASE_RE.findall(q) if p.strip()]
     q_wo_phrases = _PHRASE_RE.sub(" ", q)
-    terms = tokenize(q_wo_phrases)
-    return Query(terms=terms, phrases=phrases)
+    prefixes = []
+    for m in _WILDCARD_RE.finditer(q_wo_phrases):
+        p = m.group(1).lower()
+        if len(p) >= settings.min_token_len and p not in prefixes:
+            prefixes.append(p)
+    terms, required, excluded = _parse_boolean(_WILDCARD_RE.sub(" ", q_wo_phrases))
+    return Query(
+        terms=terms, phrases=phrases, prefixes=prefixes, required=required, excluded=excluded
+    )
+
+
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def _parse_boolean(text: str) -> tuple[list[str], list[str], list[str]]:
+    # operators bind to their neighbouring words only and are recognized in upper case
+    # alone: `a AND b` / `+a` require, `NOT a` / `-a` exclude, `a OR b` / `a b` are optional
+    terms: list[str] = []
+    required: list[str] = []
+    excluded: list[str] = []
+    words = text.split()
+    pending_and = False
+    negate_next = False
+    prev_terms: list[str] = []
+
+    for i, w in enumerate(words):
+        if w in _OPERATORS:
+            if w == "AND" and prev_terms:
+                required.extend(t for t in prev_terms if t not in required)
+                pending_and = True
+            elif w == "NOT":
+                negate_next = True
+            continue
+
+        sign = ""
+        if w[0] in "+-" and len(w) > 1:
+            sign, w = w[0], w[1:]
+        toks = tokenize(w)
+        if not toks:
+            continue
+
+        if negate_next or sign == "-":
+            excluded.extend(t for t in toks if t not in excluded)
+            prev_terms = []
+        else:
+            terms.extend(toks)
+            if sign == "+" or pending_and or (i + 1 < len(words) and words[i + 1] == "AND"):
+                required.extend(t for t in toks if t not in required)
+            prev_terms = toks
+        pending_and = False
+        negate_next = False
+
+    return terms, required, excluded
 
 
 def count_terms(tokens: Iterable[str]) -> dict[str, int]:
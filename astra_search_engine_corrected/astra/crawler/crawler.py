@@ -1,12 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import re
 import time
-from collections import defaultdict, deque
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable
 from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 
@@ -15,6 +15,7 @@ import httpx
 from astra.common.config import settings
 from astra.common.text import html_to_text
 from astra.common.url import normalize_url
+from astra.crawler.scheduler import CrawlMetrics, HostScheduler, host_of, retry_after_seconds
 from astra.storage.repo import Repo
 
 log = logging.getLogger(__name__)
@@ -28,6 +29,10 @@ class CrawlResult:
     error: str | None = None
 
 
+def _url_key(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
 class PoliteCrawler:
     def __init__(
         self,
@@ -35,15 +40,18 @@ class PoliteCrawler:
         allowed_domains: set[str],
         max_pages: int = 200,
         max_depth: int = 3,
+        client: httpx.Client | None = None,
+        scheduler: HostScheduler | None = None,
     ) -> None:
         self.repo = repo
         self.allowed_domains = {d.lower() for d in allowed_domains}
         self.max_pages = max_pages
         self.max_depth = max_depth
-        self._last_fetch_by_host: dict[str, float] = defaultdict(lambda: 0.0)
         self._robots: dict[str, RobotFileParser] = {}
+        self.scheduler = scheduler or HostScheduler()
+        self.metrics = CrawlMetrics()
 
-        self._client = httpx.Client(
+        self._client = client or httpx.Client(
             headers={"User-Agent": settings.user_agent},
             timeout=httpx.Timeout(settings.http_timeout_seconds),
             follow_redirects=True,
@@ -53,7 +61,7 @@ class PoliteCrawler:
         self._client.close()
 
     def _host_allowed(self, url: str) -> bool:
-        host = (urlparse(url).hostname or "").lower()
+        host = host_of(url)
         return any(host == d or host.endswith("." + d) for d in self.allowed_domains)
 
     def _get_robot(self, url: str) -> RobotFileParser:
@@ -64,24 +72,49 @@ class PoliteCrawler:
         rp = RobotFileParser()
         rp.set_url(f"{base}/robots.txt")
         try:
-            rp.read()
+            resp = self._client.get(f"{base}/robots.txt")
+            if resp.status_code in (401, 403):
+                rp.disallow_all = True
+            elif resp.status_code >= 400:
+                rp.allow_all = True
+            else:
+                rp.parse(resp.text.splitlines())
         except Exception:
             # if robots is unreachable, default to allow
             rp = RobotFileParser()
             rp.parse([])
+        delay = rp.crawl_delay(settings.user_agent)
+        if delay:
+            self.scheduler.set_robots_delay(host_of(url), float(delay))
         self._robots[base] = rp
         return rp
 
-    def _polite_wait(self, url: str) -> None:
-        host = (urlparse(url).hostname or "").lower()
-        elapsed = time.time() - self._last_fetch_by_host[host]
-        delay = max(0.0, settings.crawl_delay_seconds - elapsed)
-        if delay > 0:
-            time.sleep(delay)
+    def _fetch(self, url: str, wait: float) -> httpx.Response:
+        """GET `url` after its host's politeness wait, feeding the outcome back to the scheduler."""
+        if wait > 0:
+            time.sleep(wait)
+            self.metrics.waited_seconds += wait
+        host = host_of(url)
+        t0 = time.perf_counter()
+        try:
+            resp = self._client.get(url)
+        except Exception as e:
+            self.scheduler.record(host, None)
+            self.metrics.observe(None, type(e).__name__, 0)
+            raise
+        latency = time.perf_counter() - t0
+        retry_after = retry_after_seconds(resp.headers.get("retry-after"))
+        self.scheduler.record(host, latency, resp.status_code, retry_after)
+        self.metrics.observe(latency, str(resp.status_code), len(resp.content))
+        return resp
 
     def crawl(self, seeds: Iterable[str]) -> list[CrawlResult]:
-        seen: set[str] = set()
-        q: deque[tuple[str, int]] = deque()
+        return list(self.iter_crawl(seeds))
+
+    def iter_crawl(self, seeds: Iterable[str]) -> Iterator[CrawlResult]:
+        """Crawl from `seeds`, yielding each result once its document is committed."""
+        seen: set[int] = set()  # 8-byte URL hashes
+        frontier = self.scheduler
 
         for s in seeds:
             u = normalize_url(s.strip(), "")
@@ -89,48 +122,53 @@ class PoliteCrawler:
                 continue
             if not self._host_allowed(u):
                 continue
-            if u not in seen:
-                seen.add(u)
-                q.append((u, 0))
+            key = _url_key(u)
+            if key not in seen:
+                seen.add(key)
+                frontier.add(u, 0)
 
-        results: list[CrawlResult] = []
         pages = 0
 
-        while q and pages < self.max_pages:
-            url, depth = q.popleft()
-            if depth > self.max_depth:
-                continue
-
-            if not self._host_allowed(url):
+        while frontier and pages < self.max_pages:
+            url, depth, wait = frontier.next()
+            host = host_of(url)
+            if depth > self.max_depth or not self._host_allowed(url):
+                frontier.skip(host)
                 continue
 
             rp = self._get_robot(url)
             if not rp.can_fetch(settings.user_agent, url):
-                results.append(CrawlResult(url=url, stored_doc_id=None, status="skipped", error="robots"))
+                frontier.skip(host)
+                yield CrawlResult(url=url, stored_doc_id=None, status="skipped", error="robots")
                 continue
 
             try:
-                self._polite_wait(url)
-                self._last_fetch_by_host[(urlparse(url).hostname or "").lower()] = time.time()
-
-                resp = self._client.get(url)
+                resp = self._fetch(url, wait)
                 pages += 1
 
                 if resp.status_code >= 400:
-                    results.append(
-                        CrawlResult(url=url, stored_doc_id=None, status="error", error=f"http_{resp.status_code}")
+                    yield CrawlResult(
+                        url=url,
+                        stored_doc_id=None,
+                        status="error",
+                        error=f"http_{resp.status_code}",
                     )
                     continue
 
                 ctype = resp.headers.get("content-type", "")
                 if "text/html" not in ctype:
-                    results.append(CrawlResult(url=url, stored_doc_id=None, status="skipped", error="non_html"))
+                    yield CrawlResult(
+                        url=url, stored_doc_id=None, status="skipped", error="non_html"
+                    )
                     continue
 
-                content = resp.content[: settings.max_response_bytes].decode(resp.encoding or "utf-8", errors="ignore")
+                raw = resp.content[: settings.max_response_bytes]
+                content = raw.decode(resp.encoding or "utf-8", errors="ignore")
                 title, body = html_to_text(content)
                 if not body:
-                    results.append(CrawlResult(url=url, stored_doc_id=None, status="skipped", error="empty_body"))
+                    yield CrawlResult(
+                        url=url, stored_doc_id=None, status="skipped", error="empty_body"
+                    )
                     continue
 
                 doc_id = self.repo.upsert_document(
@@ -139,21 +177,22 @@ class PoliteCrawler:
                     body=body,
                     fetched_at=datetime.now(timezone.utc).isoformat(),
                 )
-                results.append(CrawlResult(url=url, stored_doc_id=doc_id, status="stored"))
                 log.info("crawled", extra={"url": url, "doc_id": doc_id})
 
-                # extract outgoing links
+                # extract outgoing links; the link graph keeps them even past max_depth
+                links = self._extract_links(url, content)
+                self.repo.set_outlinks(doc_id, links)
                 if depth < self.max_depth:
-                    links = self._extract_links(url, content)
                     for link in links:
-                        if link not in seen and self._host_allowed(link):
-                            seen.add(link)
-                            q.append((link, depth + 1))
+                        key = _url_key(link)
+                        if key not in seen and self._host_allowed(link):
+                            seen.add(key)
+                            frontier.add(link, depth + 1)
 
             except Exception as e:
-                results.append(CrawlResult(url=url, stored_doc_id=None, status="error", error=str(e)))
-
-        return results
+                yield CrawlResult(url=url, stored_doc_id=None, status="error", error=str(e))
+                continue
+            yield CrawlResult(url=url, stored_doc_id=doc_id, status="stored")
 
     def _extract_links(self, base_url: str, html: str) -> list[str]:
         # lightweight link extraction (no need for full soup)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from astra.common.config import settings
+
+# upper bounds (seconds) of the fetch latency histogram; the last bucket is open
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_EWMA_ALPHA = 0.3  # weight of the newest latency sample
+_RECOVERY = 0.75  # per successful fetch, a backed-off delay moves this much back toward its target
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+@dataclass
+class HostState:
+    host: str
+    queue: deque[tuple[str, int]] = field(default_factory=deque)
+    delay: float = 0.0
+    next_allowed: float = 0.0
+    robots_delay: float = 0.0
+    latency_ewma: float | None = None
+    fetches: int = 0
+    throttled: int = 0  # 429/503 responses
+    errors: int = 0
+    scheduled: bool = False  # has an entry in the ready heap
+
+    def target_delay(self, base: float, factor: float) -> float:
+        """Largest of the base delay, robots Crawl-delay and a multiple of response time."""
+        return max(base, self.robots_delay, factor * (self.latency_ewma or 0.0))
+
+
+class HostScheduler:
+    """Frontier of per-host FIFO queues, ordered by each host's next allowed fetch time.
+
+    A host's delay doubles (or follows `Retry-After`) on 429/503 and decays back
+    towards `target_delay` after successful fetches.
+    """
+
+    def __init__(
+        self,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        latency_factor: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_delay = settings.crawl_delay_seconds if base_delay is None else base_delay
+        self.max_delay = settings.crawl_max_delay_seconds if max_delay is None else max_delay
+        if latency_factor is None:
+            latency_factor = settings.crawl_latency_factor
+        self.latency_factor = latency_factor
+        self.clock = clock
+        self.hosts: dict[str, HostState] = {}
+        self._ready: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def _host(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(host=host, delay=self.base_delay)
+        return state
+
+    def _schedule(self, state: HostState) -> None:
+        if state.queue and not state.scheduled:
+            state.scheduled = True
+            heapq.heappush(self._ready, (state.next_allowed, next(self._seq), state.host))
+
+    def add(self, url: str, depth: int) -> None:
+        state = self._host(host_of(url))
+        state.queue.append((url, depth))
+        self._pending += 1
+        self._schedule(state)
+
+    def next(self) -> tuple[str, int, float]:
+        """(url, depth, seconds to wait before fetching it); raises IndexError when empty."""
+        next_allowed, _, host = heapq.heappop(self._ready)
+        state = self.hosts[host]
+        state.scheduled = False
+        url, depth = state.queue.popleft()
+        self._pending -= 1
+        # the host stays out of the heap until `record` sets its next window
+        return url, depth, max(0.0, next_allowed - self.clock())
+
+    def set_robots_delay(self, host: str, seconds: float) -> None:
+        state = self._host(host)
+        state.robots_delay = seconds
+        state.delay = max(state.delay, seconds)
+
+    def record(
+        self,
+        host: str,
+        latency: float | None,
+        status: int | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        """Account for one fetch (latency None for a connection failure) and reschedule the host."""
+        state = self._host(host)
+        state.fetches += 1
+        if latency is not None:
+            prev = state.latency_ewma
+            if prev is not None:
+                latency = _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * prev
+            state.latency_ewma = latency
+        target = state.target_delay(self.base_delay, self.latency_factor)
+        if status in (429, 503):
+            state.throttled += 1
+            state.delay = max(target, state.delay * 2, self.base_delay or 1.0, retry_after or 0.0)
+        elif status is None or status >= 500:
+            state.errors += 1
+            state.delay = max(target, state.delay * 1.5)
+        else:
+            state.delay = max(target, target + (state.delay - target) * _RECOVERY)
+        # max_delay caps our own backoff, not what robots.txt or the server asked for
+        state.delay = min(state.delay, max(self.max_delay, state.robots_delay, retry_after or 0.0))
+        state.next_allowed = self.clock() + state.delay
+        self._schedule(state)
+
+    def skip(self, host: str) -> None:
+        """Reschedule a host whose URL was dropped without a fetch (e.g. disallowed by robots)."""
+        self._schedule(self._host(host))
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """A delta-seconds `Retry-After` header (HTTP dates are ignored)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+@dataclass
+class CrawlMetrics:
+    started_at: float = field(default_factory=time.perf_counter)
+    pages: int = 0
+    bytes: int = 0
+    waited_seconds: float = 0.0  # time asleep because every queued host was in its window
+    statuses: Counter[str] = field(default_factory=Counter)
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def observe(self, latency: float | None, status: str, size: int) -> None:
+        self.statuses[status] += 1
+        if latency is None:
+            return
+        self.pages += 1
+        self.bytes += size
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def as_dict(self, scheduler: HostScheduler | None = None) -> dict[str, object]:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS] + ["inf"]
+        report: dict[str, object] = {
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "elapsed_seconds": round(elapsed, 3),
+            "pages_per_sec": round(self.pages / elapsed, 3),
+            "bytes_per_sec": round(self.bytes / elapsed, 1),
+            "waited_seconds": round(self.waited_seconds, 3),
+            "statuses": dict(self.statuses),
+            "fetch_latency_seconds": dict(zip(labels, self.latency_buckets, strict=True)),
+        }
+        if scheduler is not None:
+            report["hosts"] = {
+                h.host: {
+                    "queued": len(h.queue),
+                    "fetches": h.fetches,
+                    "delay_seconds": round(h.delay, 3),
+                    "robots_delay_seconds": h.robots_delay,
+                    "latency_ewma_ms": round(h.latency_ewma * 1e3, 1) if h.latency_ewma else None,
+                    "throttled": h.throttled,
+                    "errors": h.errors,
+                }
+                for h in scheduler.hosts.values()
+            }
+        return report
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Iterator
+
+from astra.common.config import settings
+from astra.ranker.bm25 import bm25_idf, bm25_weight
+from astra.storage.db import tx
+from astra.storage.repo import Repo
+from astra.storage.segments import SegmentSet
+
+log = logging.getLogger(__name__)
+
+_Posting = tuple[int, int, int, int, int]  # term_id, doc_id, tf_title, tf_body, length
+
+
+def _iter_postings(repo: Repo) -> Iterator[_Posting]:
+    """Every live posting with its document length, in term_id order."""
+    if settings.index_layout == "segments":
+        with SegmentSet(repo) as segs:
+            lengths: dict[int, int] = {}
+            for seg in segs.segments:  # ascending seq: newer lengths win
+                lengths.update(segs.iter_doc_lengths(seg))
+            merged = heapq.merge(*(segs.iter_postings(s) for s in segs.segments))
+            for term_id, doc_id, tf_title, tf_body in merged:
+                yield term_id, doc_id, tf_title, tf_body, lengths.get(doc_id, 0)
+        return
+    rows = repo.conn.execute(
+        """
+        SELECT p.term_id, p.doc_id, p.tf_title, p.tf_body, d.length
+        FROM postings p JOIN documents d ON d.doc_id = p.doc_id
+        ORDER BY p.term_id
+        """
+    )
+    for r in rows:
+        yield int(r[0]), int(r[1]), int(r[2]), int(r[3]), int(r[4])
+
+
+def _iter_weights(
+    repo: Repo, doc_count: int, avgdl: float
+) -> Iterator[tuple[int, list[tuple[int, float]]]]:
+    """(term_id, [(doc_id, BM25 weight)]) per term; one posting list in memory at a time."""
+    for term_id, group in itertools.groupby(_iter_postings(repo), key=lambda p: p[0]):
+        postings = list(group)
+        idf = bm25_idf(doc_count, len(postings))
+        yield term_id, [(p[1], bm25_weight(idf, p[2], p[3], p[4], avgdl)) for p in postings]
+
+
+def build_impacts(repo: Repo, bits: int | None = None) -> dict[str, float | int]:
+    """Precompute every posting's BM25 weight, quantized to `bits` bits."""
+    # uniform over [0, global max], so a document's score is the plain sum of its
+    # impacts; one pass finds the max, a second writes the impact-ordered lists
+    start = time.perf_counter()
+    bits = bits or settings.impact_bits
+    levels = (1 << bits) - 1
+    stats = repo.get_stats()
+    version = int(stats["index_version"])
+    doc_count = max(int(stats["doc_count"]), 1)
+    avgdl = float(stats["avg_doc_len"] or 0.0) or 1.0
+
+    max_weight = 0.0
+    for _term_id, weights in _iter_weights(repo, doc_count, avgdl):
+        max_weight = max(max_weight, max(w for _, w in weights))
+    scale = max_weight / levels if max_weight > 0 else 1.0
+
+    postings = terms = 0
+    with tx(repo.conn, immediate=True):
+        repo.conn.execute("DELETE FROM impacts")
+        repo.conn.execute("DELETE FROM impact_meta")
+        for term_id, weights in _iter_weights(repo, doc_count, avgdl):
+            repo.conn.executemany(
+                "INSERT INTO impacts(term_id, impact, doc_id) VALUES(?, ?, ?)",
+                [(term_id, max(1, min(levels, round(w / scale))), doc_id) for doc_id, w in weights],
+            )
+            postings += len(weights)
+            terms += 1
+        repo.conn.execute(
+            """
+            INSERT INTO impact_meta(index_version, bits, scale, posting_count, built_at)
+            VALUES(?, ?, ?, ?, datetime('now'))
+            """,
+            (version, bits, scale, postings),
+        )
+
+    elapsed = time.perf_counter() - start
+    log.info("impacts_built", extra={"latency_ms": round(elapsed * 1000.0, 2)})
+    return {
+        "index_version": version,
+        "terms": terms,
+        "postings": postings,
+        "bits": bits,
+        "max_weight": round(max_weight, 6),
+        "scale": scale,
+        "elapsed_seconds": round(elapsed, 3),
+    }
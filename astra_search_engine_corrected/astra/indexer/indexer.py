@@ -1,31 +1,54 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterable
 
+from astra.common.config import settings
 from astra.common.tokenizer import count_terms, tokenize
+from astra.indexer.spelling import update_spelling_index
 from astra.storage.db import tx
-from astra.storage.repo import Repo
+from astra.storage.repo import Document, Repo
+from astra.storage.segments import PostingTuple, flush_segment
 
 log = logging.getLogger(__name__)
 
 
 class Indexer:
-    def __init__(self, repo: Repo):
+    def __init__(self, repo: Repo, layout: str | None = None):
         self.repo = repo
+        self.layout = layout or settings.index_layout
 
     def index_new_documents(self, batch_size: int = 100) -> int:
+        return self.index_documents(self.repo.iter_unindexed_documents(limit=batch_size))
+
+    def index_documents(self, docs: Iterable[Document], fresh: bool = False) -> int:
+        """Index `docs`; `fresh=True` promises none of them has postings yet."""
         stats = self.repo.get_stats()
         index_version = int(stats["index_version"])
 
-        indexed = 0
-        for doc in self.repo.iter_unindexed_documents(limit=batch_size):
-            title_tokens = tokenize(doc.title)
-            body_tokens = tokenize(doc.body)
+        if self.layout == "segments":
+            indexed = self._index_into_segment(docs, index_version)
+        else:
+            indexed = self._index_into_table(docs, index_version, fresh)
+
+        if indexed > 0:
+            with tx(self.repo.conn, immediate=True):
+                update_spelling_index(self.repo)
+                self.repo.bump_stats()
+
+        return indexed
 
-            tf_title = count_terms(title_tokens)
-            tf_body = count_terms(body_tokens)
+    def _index_into_table(
+        self, docs: Iterable[Document], index_version: int, fresh: bool = False
+    ) -> int:
+        indexed = 0
+        for doc in docs:
+            tf_title, tf_body = self._term_counts(doc)
 
-            with tx(self.repo.conn):
+            with tx(self.repo.conn, immediate=True):
+                if not fresh:
+                    # drop postings of terms the (updated) document no longer contains
+                    self.repo.delete_postings_for_doc(doc.doc_id)
                 for term in set(tf_title) | set(tf_body):
                     term_id = self.repo.ensure_term_id(term)
                     self.repo.upsert_posting(
@@ -38,9 +61,26 @@ class Indexer:
 
             indexed += 1
             log.info("indexed_doc", extra={"doc_id": doc.doc_id, "url": doc.url})
+        return indexed
 
-        if indexed > 0:
-            with tx(self.repo.conn):
-                self.repo.bump_stats()
+    def _index_into_segment(self, docs: Iterable[Document], index_version: int) -> int:
+        """Build the whole batch in memory and flush it as one immutable segment."""
+        postings: list[PostingTuple] = []
+        lengths: dict[int, int] = {}
+        for doc in docs:
+            tf_title, tf_body = self._term_counts(doc)
+            with tx(self.repo.conn, immediate=True):
+                for term in set(tf_title) | set(tf_body):
+                    term_id = self.repo.ensure_term_id(term)
+                    tf = (tf_title.get(term, 0), tf_body.get(term, 0))
+                    postings.append((term_id, doc.doc_id, *tf))
+            lengths[doc.doc_id] = doc.length
+            log.info("indexed_doc", extra={"doc_id": doc.doc_id, "url": doc.url})
 
-        return indexed
+        if lengths:
+            flush_segment(self.repo, postings, lengths, index_version)
+        return len(lengths)
+
+    @staticmethod
+    def _term_counts(doc: Document) -> tuple[dict[str, int], dict[str, int]]:
+        return count_terms(tokenize(doc.title)), count_terms(tokenize(doc.body))
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from astra.common.config import settings
+from astra.indexer.indexer import Indexer
+from astra.indexer.merger import SegmentMerger
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.shards import from_global_doc_id
+
+log = logging.getLogger(__name__)
+
+
+class LiveIndexer(threading.Thread):
+    """Indexes pages, submitted by doc id, while the crawl that fetches them is still running."""
+
+    def __init__(
+        self,
+        db_paths: list[str],
+        batch_docs: int | None = None,
+        flush_seconds: float | None = None,
+        max_queued: int | None = None,
+        layout: str | None = None,
+    ):
+        super().__init__(name="astra-live-indexer", daemon=True)
+        self.db_paths = db_paths
+        self.batch_docs = max(1, batch_docs or settings.live_index_batch_docs)
+        if flush_seconds is None:
+            flush_seconds = settings.live_index_flush_seconds
+        self.flush_seconds = flush_seconds
+        self.layout = layout or settings.index_layout
+        # bounded, so a crawler that outruns indexing blocks instead of buffering
+        max_queued = max_queued or settings.live_index_queue
+        self._queue: queue.Queue[tuple[int, float]] = queue.Queue(max_queued)
+        self._stop_event = threading.Event()
+        self.indexed = 0
+        self.batches = 0
+        self.failed = 0
+        self.max_lag_seconds = 0.0
+        self._lag_total = 0.0
+        self._lag_count = 0
+
+    def submit(self, doc_id: int) -> None:
+        self._queue.put((doc_id, time.monotonic()))
+
+    def stop(self) -> None:
+        """Finish the documents already submitted, then exit."""
+        self._stop_event.set()
+
+    def run(self) -> None:
+        conns = [connect(p) for p in self.db_paths]
+        try:
+            repos = [Repo(c) for c in conns]
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    break
+                try:
+                    self._index(repos, batch)
+                except Exception:
+                    # left unindexed; a later `astra index` picks them up
+                    self.failed += len(batch)
+                    log.exception("live_index_failed")
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def _next_batch(self) -> list[tuple[int, float]]:
+        """Block for the next submission; empty once stopped and drained."""
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    return []
+        batch = [first]
+        deadline = first[1] + self.flush_seconds
+        while len(batch) < self.batch_docs:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, min(remaining, 0.1))))
+            except queue.Empty:
+                if remaining <= 0 or self._stop_event.is_set():
+                    break
+        return batch
+
+    def _index(self, repos: list[Repo], batch: list[tuple[int, float]]) -> None:
+        by_shard: dict[int, list[int]] = defaultdict(list)
+        for doc_id, _ in batch:
+            shard, local_id = from_global_doc_id(doc_id, len(repos))
+            by_shard[shard].append(local_id)
+        for shard, local_ids in sorted(by_shard.items()):
+            repo = repos[shard]
+            # a recrawled page whose content did not change is already indexed
+            docs = repo.fetch_unindexed_documents(sorted(set(local_ids)))
+            n = Indexer(repo, layout=self.layout).index_documents(docs)
+            if n and self.layout == "segments":
+                SegmentMerger(repo).maybe_merge()
+            self.indexed += n
+        self.batches += 1
+        now = time.monotonic()
+        self._lag_count += len(batch)
+        for _, submitted in batch:
+            self._lag_total += now - submitted
+            self.max_lag_seconds = max(self.max_lag_seconds, now - submitted)
+        log.info("live_index_batch", extra={"indexed_docs": len(batch)})
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "indexed": self.indexed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+            # submit -> searchable
+            "mean_lag_seconds": (
+                round(self._lag_total / self._lag_count, 3) if self._lag_count else 0.0
+            ),
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+        }
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from astra.common.config import settings
+from astra.storage.db import connect, tx
+from astra.storage.repo import Repo
+from astra.storage.segments import (
+    PostingTuple,
+    SegmentInfo,
+    SegmentSet,
+    bump_counter,
+    db_file,
+    segments_dir,
+    write_segment_file,
+)
+
+log = logging.getLogger(__name__)
+
+# retired segment files are kept this long so in-flight readers can finish
+RETIRED_GRACE_SECONDS = 300
+
+
+class SegmentMerger:
+    """Tiered merges: `merge_factor` live segments of a level become one of the next level."""
+
+    def __init__(self, repo: Repo, merge_factor: int | None = None):
+        self.repo = repo
+        self.merge_factor = max(2, merge_factor or settings.segment_merge_factor)
+
+    def pick_merge(self, segments: list[SegmentInfo]) -> list[SegmentInfo] | None:
+        by_level: dict[int, list[SegmentInfo]] = {}
+        for seg in segments:
+            by_level.setdefault(seg.level, []).append(seg)
+        for level in sorted(by_level):
+            group = by_level[level]
+            if len(group) >= self.merge_factor:
+                return sorted(group, key=lambda s: s.seq)[: self.merge_factor]
+        return None
+
+    def maybe_merge(self) -> int:
+        merges = 0
+        while True:
+            with SegmentSet(self.repo) as view:
+                group = self.pick_merge(view.segments)
+                if group is None or self._merge(view, group) is None:
+                    break
+            merges += 1
+        self.cleanup()
+        return merges
+
+    def merge_all(self) -> int:
+        with SegmentSet(self.repo) as view:
+            if len(view.segments) <= 1 and not view.tombstones:
+                return 0
+            merged = self._merge(view, view.segments)
+        self.cleanup()
+        return 1 if merged is not None else 0
+
+    def _merge(self, view: SegmentSet, group: list[SegmentInfo]) -> SegmentInfo | None:
+        postings = heapq.merge(*(view.iter_postings(seg) for seg in group))
+        lengths: dict[int, int] = {}
+        for seg in group:  # ascending seq: newer lengths win
+            lengths.update(view.iter_doc_lengths(seg))
+
+        name, doc_count, posting_count, size = write_segment_file(
+            view.directory, _dedupe(postings), sorted(lengths.items())
+        )
+        level = max(s.level for s in group) + 1
+        seq = max(s.seq for s in group)
+        try:
+            segment_id = self._commit_merge(group, name, seq, level, doc_count, posting_count, size)
+        except _MergeConflictError:
+            (view.directory / name).unlink(missing_ok=True)
+            return None
+
+        log.info("segments_merged", extra={"inputs": [s.segment_id for s in group], "level": level})
+        return SegmentInfo(segment_id, name, seq, level, doc_count, posting_count, size)
+
+    def _commit_merge(
+        self,
+        group: list[SegmentInfo],
+        name: str,
+        seq: int,
+        level: int,
+        doc_count: int,
+        posting_count: int,
+        size: int,
+    ) -> int:
+        ids = [s.segment_id for s in group]
+        q = ",".join("?" for _ in ids)
+        with tx(self.repo.conn, immediate=True):
+            cur = self.repo.conn.execute(
+                f"""
+                UPDATE segments SET live=0, retired_at=datetime('now')
+                WHERE live=1 AND segment_id IN ({q})
+                """,  # noqa: S608 - placeholders only
+                ids,
+            )
+            if cur.rowcount != len(ids):
+                # a concurrent merge already replaced some inputs
+                raise _MergeConflictError()
+            cur = self.repo.conn.execute(
+                """
+                INSERT INTO segments(
+                  path, seq, level, doc_count, posting_count, size_bytes, created_at
+                )
+                VALUES(?, ?, ?, ?, ?, ?, datetime('now'))
+                """,
+                (name, seq, level, doc_count, posting_count, size),
+            )
+            # tombstones older than every live segment no longer hide anything
+            self.repo.conn.execute(
+                """
+                DELETE FROM tombstones
+                WHERE seq <= (SELECT COALESCE(MIN(seq), 1 << 62) FROM segments WHERE live=1)
+                """
+            )
+            segment_id = int(cur.lastrowid)
+            bump_counter(self.repo.conn, "bytes_merged", size)
+        return segment_id
+
+    def cleanup(self) -> None:
+        directory = segments_dir(db_file(self.repo.conn))
+        rows = self.repo.conn.execute(
+            """
+            SELECT segment_id, path FROM segments
+            WHERE live=0 AND retired_at <= datetime('now', ?)
+            """,
+            (f"-{RETIRED_GRACE_SECONDS} seconds",),
+        ).fetchall()
+        for r in rows:
+            Path(directory / r["path"]).unlink(missing_ok=True)
+        if rows:
+            with tx(self.repo.conn, immediate=True):
+                self.repo.conn.executemany(
+                    "DELETE FROM segments WHERE segment_id=?", [(r["segment_id"],) for r in rows]
+                )
+
+
+class _MergeConflictError(Exception):
+    pass
+
+
+def _dedupe(postings: Iterable[PostingTuple]) -> Iterator[PostingTuple]:
+    # reindexing tombstones older copies, so live duplicates should not occur;
+    # guard anyway since the output table's primary key would reject them
+    prev: PostingTuple | None = None
+    for p in postings:
+        if prev is not None and prev[:2] != p[:2]:
+            yield prev
+        prev = p
+    if prev is not None:
+        yield prev
+
+
+class SegmentMergeThread(threading.Thread):
+    """Background merges for a serving process (segment layout only)."""
+
+    def __init__(self, db_path: str | None = None, interval_seconds: float | None = None):
+        super().__init__(name="astra-segment-merger", daemon=True)
+        self.db_path = db_path or settings.db_path
+        self.interval_seconds = interval_seconds or settings.segment_merge_interval_seconds
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        conn = connect(self.db_path)
+        try:
+            merger = SegmentMerger(Repo(conn))
+            while not self._stop_event.wait(self.interval_seconds):
+                try:
+                    merger.maybe_merge()
+                except Exception:
+                    log.exception("segment_merge_failed")
+        finally:
+            conn.close()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import logging
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from astra.common.config import settings
+from astra.storage.db import tx
+from astra.storage.links import prior_version
+from astra.storage.repo import Repo
+
+log = logging.getLogger(__name__)
+
+
+class LinkGraph:
+    """Documents of one or more shards as graph nodes, edges as parallel arrays.
+
+    Node i is document `doc_ids[i]` of shard `shards[i]`; links to pages that
+    were never stored and self-links are dropped.
+    """
+
+    def __init__(self, repos: list[Repo]):
+        url_to_node: dict[str, int] = {}
+        shards: list[np.ndarray] = []
+        doc_ids: list[np.ndarray] = []
+        self.urls: list[str] = []
+        for s, repo in enumerate(repos):
+            ids = []
+            rows = repo.conn.execute("SELECT doc_id, url FROM documents ORDER BY doc_id")
+            for doc_id, url in rows:
+                url_to_node[url] = len(self.urls)
+                self.urls.append(url)
+                ids.append(int(doc_id))
+            doc_ids.append(np.asarray(ids, dtype=np.int64))
+            shards.append(np.full(len(ids), s, dtype=np.int32))
+        self.shards = np.concatenate(shards) if shards else np.zeros(0, np.int32)
+        self.doc_ids = np.concatenate(doc_ids) if doc_ids else np.zeros(0, np.int64)
+
+        src: list[np.ndarray] = []
+        dst: list[np.ndarray] = []
+        offset = 0
+        for s, repo in enumerate(repos):
+            local = doc_ids[s]
+            top = repo.conn.execute("SELECT MAX(url_id) FROM link_urls").fetchone()[0] or 0
+            target = np.full(int(top) + 1, -1, dtype=np.int64)
+            for url_id, url in repo.conn.execute("SELECT url_id, url FROM link_urls"):
+                target[int(url_id)] = url_to_node.get(url, -1)
+
+            sources: list[int] = []
+            counts: list[int] = []
+            blobs: list[bytes] = []
+            rows = repo.conn.execute("SELECT doc_id, url_ids FROM outlinks ORDER BY doc_id")
+            for doc_id, blob in rows:
+                sources.append(int(doc_id))
+                counts.append(len(blob) // 4)
+                blobs.append(blob)
+            if not blobs or not len(local):
+                offset += len(local)
+                continue
+            # decode every outlink list of the shard at once
+            ids = np.frombuffer(b"".join(blobs), dtype="<u4")
+            sources_arr = np.asarray(sources, dtype=np.int64)
+            pos = np.searchsorted(local, sources_arr)
+            known = (pos < len(local)) & (local[np.minimum(pos, len(local) - 1)] == sources_arr)
+            s_nodes = np.repeat(np.where(known, pos + offset, -1), counts)
+            d_nodes = target[ids]
+            keep = (s_nodes >= 0) & (d_nodes >= 0) & (s_nodes != d_nodes)
+            src.append(s_nodes[keep])
+            dst.append(d_nodes[keep])
+            offset += len(local)
+        self.src = np.concatenate(src) if src else np.zeros(0, np.int64)
+        self.dst = np.concatenate(dst) if dst else np.zeros(0, np.int64)
+
+    @property
+    def nodes(self) -> int:
+        return len(self.urls)
+
+    @property
+    def edges(self) -> int:
+        return len(self.src)
+
+
+def pagerank(
+    src: np.ndarray,
+    dst: np.ndarray,
+    n: int,
+    damping: float = 0.85,
+    tol: float = 1e-9,
+    max_iter: int = 100,
+) -> tuple[np.ndarray, int, float]:
+    """Power iteration; returns (ranks, iterations, last L1 change)."""
+    if n == 0:
+        return np.zeros(0), 0, 0.0
+    outdeg = np.bincount(src, minlength=n).astype(np.float64)
+    # M[j, i] = 1/outdeg(i) for every edge i -> j
+    m = sp.csr_matrix((1.0 / outdeg[src], (dst, src)), shape=(n, n))
+    # dangling nodes spread their rank uniformly, so ranks stay a distribution
+    dangling = outdeg == 0
+    ranks = np.full(n, 1.0 / n)
+    delta = 0.0
+    iterations = 0
+    while iterations < max_iter:
+        iterations += 1
+        new = damping * (m @ ranks) + (damping * ranks[dangling].sum() + 1.0 - damping) / n
+        delta = float(np.abs(new - ranks).sum())
+        ranks = new
+        if delta < tol:
+            break
+    return ranks, iterations, delta
+
+
+def compute_priors(
+    repos: list[Repo],
+    damping: float | None = None,
+    tol: float = 1e-9,
+    max_iter: int = 100,
+    top: int = 10,
+) -> dict[str, object]:
+    """Compute PageRank over the stored link graph and write `doc_priors` in every shard."""
+    damping = settings.pagerank_damping if damping is None else damping
+    start = time.perf_counter()
+    graph = LinkGraph(repos)
+    loaded = time.perf_counter()
+    ranks, iterations, delta = pagerank(graph.src, graph.dst, graph.nodes, damping, tol, max_iter)
+    computed = time.perf_counter()
+
+    n = graph.nodes
+    peak = float(ranks.max()) if n else 0.0
+    # log-scaled to [0, 1] so the prior adds to BM25 on a bounded scale
+    priors = np.log1p(ranks * n) / np.log1p(peak * n) if peak > 0 else ranks
+    for s, repo in enumerate(repos):
+        mask = graph.shards == s
+        columns = (graph.doc_ids[mask], ranks[mask], priors[mask])
+        rows = zip(*(c.tolist() for c in columns), strict=True)
+        with tx(repo.conn, immediate=True):
+            repo.conn.execute("DELETE FROM doc_priors")
+            repo.conn.executemany(
+                "INSERT INTO doc_priors(doc_id, pagerank, prior) VALUES(?, ?, ?)", rows
+            )
+            # no index_version bump: postings are unchanged, so impacts and the caches keyed
+            # by it stay valid; prior caches and index images follow prior_meta instead
+            version = prior_version(repo.conn) + 1
+            repo.conn.execute("DELETE FROM prior_meta")
+            repo.conn.execute(
+                "INSERT INTO prior_meta(version, built_at) VALUES(?, datetime('now'))", (version,)
+            )
+    stored = time.perf_counter()
+    log.info("priors_built", extra={"latency_ms": round((stored - start) * 1000.0, 2)})
+
+    best = np.argsort(-ranks)[:top] if n else []
+    return {
+        "nodes": n,
+        "edges": graph.edges,
+        "dangling": int((np.bincount(graph.src, minlength=n) == 0).sum()) if n else 0,
+        "damping": damping,
+        "iterations": iterations,
+        "l1_delta": delta,
+        "elapsed_seconds": {
+            "load": round(loaded - start, 3),
+            "pagerank": round(computed - loaded, 3),
+            "store": round(stored - computed, 3),
+        },
+        "top": [{"url": graph.urls[i], "pagerank": round(float(ranks[i]), 8)} for i in best],
+    }
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import struct
+import tempfile
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from astra.common.config import settings
+from astra.common.tokenizer import count_terms, tokenize
+from astra.indexer.spelling import update_spelling_index
+from astra.storage.db import SECONDARY_INDEXES, connect, tx
+from astra.storage.repo import Repo
+from astra.storage.segments import (
+    PostingTuple,
+    bump_counter,
+    db_file,
+    segments_dir,
+    write_segment_file,
+)
+from astra.storage.term_dict import load_term_dictionary
+
+log = logging.getLogger(__name__)
+
+_RUN_RECORD = struct.Struct("<qqii")  # term_id, doc_id, tf_title, tf_body
+# a buffered posting is one packed int (~44 bytes) plus its list slot
+_BUFFERED_POSTING_BYTES = 52
+_READ_RECORDS = 4096
+
+
+@dataclass
+class RebuildStats:
+    docs: int = 0
+    postings: int = 0
+    runs: int = 0
+    merge_passes: int = 0
+    peak_buffer_bytes: int = 0
+    stale_docs: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    elapsed_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, float | int]:
+        return {
+            "docs": self.docs,
+            "postings": self.postings,
+            "runs": self.runs,
+            "merge_passes": self.merge_passes,
+            "peak_buffer_mb": round(self.peak_buffer_bytes / 1e6, 3),
+            "stale_docs": self.stale_docs,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "docs_per_sec": round(self.docs / max(self.elapsed_seconds, 1e-9), 1),
+        }
+
+
+def _pack(term_id: int, doc_id: int, tf_title: int, tf_body: int) -> int:
+    # one int per posting: sorts by (term_id, doc_id) and is ~3x smaller than a tuple
+    return (term_id << 128) | (doc_id << 64) | (tf_title << 32) | tf_body
+
+
+def _unpack(p: int) -> PostingTuple:
+    return p >> 128, (p >> 64) & 0xFFFFFFFF_FFFFFFFF, (p >> 32) & 0xFFFFFFFF, p & 0xFFFFFFFF
+
+
+def _write_run(path: Path, postings: Iterator[PostingTuple]) -> None:
+    with open(path, "wb") as fh:
+        buf = bytearray()
+        for p in postings:
+            buf += _RUN_RECORD.pack(*p)
+            if len(buf) >= _RUN_RECORD.size * _READ_RECORDS:
+                fh.write(buf)
+                buf.clear()
+        fh.write(buf)
+
+
+def _read_run(path: Path) -> Iterator[PostingTuple]:
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(_RUN_RECORD.size * _READ_RECORDS)
+            if not chunk:
+                return
+            yield from _RUN_RECORD.iter_unpack(chunk)
+
+
+class IndexRebuilder:
+    """Offline full rebuild: sorted runs, a k-way merge and one swap transaction.
+
+    Readers keep the old index until the swap commits; documents changed
+    meanwhile are left for the next incremental `astra index`.
+    """
+
+    def __init__(
+        self,
+        repo: Repo,
+        memory_mb: float | None = None,
+        fanin: int | None = None,
+        layout: str | None = None,
+    ):
+        self.repo = repo
+        self.memory_bytes = int((memory_mb or settings.rebuild_memory_mb) * 1024 * 1024)
+        self.fanin = max(2, fanin or settings.rebuild_merge_fanin)
+        self.layout = layout or settings.index_layout
+
+    def rebuild(self) -> RebuildStats:
+        stats = RebuildStats()
+        conn = self.repo.conn
+        with tx(conn, immediate=True):
+            conn.execute("DROP TABLE IF EXISTS postings_rebuild")
+            conn.execute("DROP TABLE IF EXISTS rebuild_docs")
+            conn.execute(
+                """
+                CREATE TABLE rebuild_docs (
+                  doc_id INTEGER PRIMARY KEY,
+                  length INTEGER NOT NULL,
+                  fetched_at TEXT NOT NULL
+                )
+                """
+            )
+
+        # runs live next to the database: /tmp may be a RAM-backed tmpfs
+        parent = Path(db_file(conn)).parent
+        with tempfile.TemporaryDirectory(prefix="astra-rebuild-", dir=parent) as tmp:
+            runs, snapshot_seq = self._invert(Path(tmp), stats)
+            merged = self._merge_runs(runs, Path(tmp), stats)
+            if self.layout == "segments":
+                self._swap_segment(merged, snapshot_seq, stats)
+            else:
+                self._swap_table(merged, stats)
+
+        stats.elapsed_seconds = time.perf_counter() - stats.started_at
+        log.info(
+            "index_rebuilt",
+            extra={
+                "indexed_docs": stats.docs,
+                "latency_ms": round(stats.elapsed_seconds * 1000.0, 2),
+            },
+        )
+        return stats
+
+    # -------------------- phase 1: runs --------------------
+    def _invert(self, tmp: Path, stats: RebuildStats) -> tuple[list[Path], int]:
+        term_dict = load_term_dictionary(self.repo)
+        new_terms: dict[str, int] = {}
+        runs: list[Path] = []
+        buffer: list[int] = []
+        doc_rows: list[tuple[int, int, str]] = []
+
+        def spill() -> None:
+            buffered = len(buffer) * _BUFFERED_POSTING_BYTES
+            stats.peak_buffer_bytes = max(stats.peak_buffer_bytes, buffered)
+            if buffer:
+                buffer.sort()
+                path = tmp / f"run-{len(runs):06d}.bin"
+                _write_run(path, (_unpack(p) for p in buffer))
+                runs.append(path)
+                buffer.clear()
+            if doc_rows:
+                with tx(self.repo.conn, immediate=True):
+                    self.repo.conn.executemany(
+                        "INSERT INTO rebuild_docs VALUES(?, ?, ?)", doc_rows
+                    )
+                doc_rows.clear()
+
+        def term_id(term: str) -> int:
+            tid = term_dict.lookup(term)
+            if tid is None:
+                tid = new_terms.get(term)
+                if tid is None:
+                    tid = new_terms[term] = self.repo.ensure_term_id(term)
+            return tid
+
+        # a second connection holds one read snapshot for the whole scan while
+        # the main one writes terms and staging rows
+        snap = connect(db_file(self.repo.conn))
+        try:
+            snap.execute("BEGIN")
+            row = snap.execute("SELECT COALESCE(MAX(seq), 0) FROM segments WHERE live=1").fetchone()
+            snapshot_seq = int(row[0])
+            docs = snap.execute(
+                "SELECT doc_id, title, body, length, fetched_at FROM documents ORDER BY doc_id"
+            )
+            for doc in docs:
+                doc_id = int(doc["doc_id"])
+                tf_title = count_terms(tokenize(doc["title"]))
+                tf_body = count_terms(tokenize(doc["body"]))
+                for term in set(tf_title) | set(tf_body):
+                    tf = (tf_title.get(term, 0), tf_body.get(term, 0))
+                    buffer.append(_pack(term_id(term), doc_id, *tf))
+                doc_rows.append((doc_id, int(doc["length"]), doc["fetched_at"]))
+                stats.docs += 1
+                if len(buffer) * _BUFFERED_POSTING_BYTES >= self.memory_bytes:
+                    spill()
+            spill()
+            snap.rollback()
+        finally:
+            snap.close()
+
+        stats.runs = len(runs)
+        return runs, snapshot_seq
+
+    # -------------------- phase 2: k-way merge --------------------
+    def _merge_runs(
+        self, runs: list[Path], tmp: Path, stats: RebuildStats
+    ) -> Iterator[PostingTuple]:
+        # bound open files: merge `fanin` runs at a time until one pass suffices
+        while len(runs) > self.fanin:
+            stats.merge_passes += 1
+            merged: list[Path] = []
+            for i in range(0, len(runs), self.fanin):
+                group = runs[i : i + self.fanin]
+                path = tmp / f"pass{stats.merge_passes}-{len(merged):06d}.bin"
+                _write_run(path, heapq.merge(*(_read_run(r) for r in group)))
+                for r in group:
+                    r.unlink()
+                merged.append(path)
+            runs = merged
+        stats.merge_passes += 1
+        return heapq.merge(*(_read_run(r) for r in runs))
+
+    # -------------------- phase 3: write + swap --------------------
+    def _swap_table(self, postings: Iterator[PostingTuple], stats: RebuildStats) -> None:
+        conn = self.repo.conn
+        ddl = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='postings'"
+        ).fetchone()[0]
+        with tx(conn, immediate=True):
+            conn.execute(ddl.replace("postings", "postings_rebuild", 1))
+
+        batch: list[PostingTuple] = []
+        for p in postings:
+            batch.append(p)
+            if len(batch) >= 50_000:
+                # short transactions so crawler/indexer writes can interleave
+                with tx(conn, immediate=True):
+                    conn.executemany("INSERT INTO postings_rebuild VALUES(?, ?, ?, ?)", batch)
+                stats.postings += len(batch)
+                batch.clear()
+        with tx(conn, immediate=True):
+            conn.executemany("INSERT INTO postings_rebuild VALUES(?, ?, ?, ?)", batch)
+        stats.postings += len(batch)
+
+        version = int(self.repo.get_stats()["index_version"])
+        with tx(conn, immediate=True):
+            stale = self._stale_docs()
+            conn.execute("DROP TABLE postings")
+            conn.execute("ALTER TABLE postings_rebuild RENAME TO postings")
+            for sql in SECONDARY_INDEXES.values():
+                conn.execute(sql)
+            conn.executemany("DELETE FROM postings WHERE doc_id=?", [(d,) for d in stale])
+            # postings written by concurrent incremental runs were in the old
+            # table, so only documents covered by this rebuild count as indexed
+            conn.execute("DELETE FROM indexed_docs")
+            self._mark_rebuilt(version)
+            conn.execute("DROP TABLE rebuild_docs")
+            update_spelling_index(self.repo)
+            self.repo.bump_stats()
+        stats.stale_docs = len(stale)
+
+    def _swap_segment(
+        self, postings: Iterator[PostingTuple], snapshot_seq: int, stats: RebuildStats
+    ) -> None:
+        conn = self.repo.conn
+        directory = segments_dir(db_file(conn))
+        rows = conn.execute("SELECT doc_id, length FROM rebuild_docs ORDER BY doc_id")
+        lengths = ((int(r[0]), int(r[1])) for r in rows)
+        name, doc_count, posting_count, size = write_segment_file(directory, postings, lengths)
+        stats.postings = posting_count
+
+        version = int(self.repo.get_stats()["index_version"])
+        with tx(conn, immediate=True):
+            stats.stale_docs = len(self._stale_docs())
+            row = conn.execute(
+                "SELECT COALESCE(MAX(level), 0) + 1 FROM segments WHERE live=1"
+            ).fetchone()
+            level = int(row[0])
+            # segments flushed after the snapshot have a higher seq, so their
+            # tombstones still hide the rebuilt copy of documents they reindexed
+            conn.execute(
+                """
+                UPDATE segments SET live=0, retired_at=datetime('now')
+                WHERE live=1 AND seq <= ?
+                """,
+                (snapshot_seq,),
+            )
+            conn.execute(
+                """
+                INSERT INTO segments(
+                  path, seq, level, doc_count, posting_count, size_bytes, created_at
+                )
+                VALUES(?, ?, ?, ?, ?, ?, datetime('now'))
+                """,
+                (name, snapshot_seq, level, doc_count, posting_count, size),
+            )
+            conn.execute("DELETE FROM tombstones WHERE seq <= ?", (snapshot_seq,))
+            self._mark_rebuilt(version)
+            conn.execute("DROP TABLE rebuild_docs")
+            bump_counter(conn, "bytes_merged", size)
+            update_spelling_index(self.repo)
+            self.repo.bump_stats()
+
+    def _stale_docs(self) -> list[int]:
+        rows = self.repo.conn.execute(
+            """
+            SELECT r.doc_id FROM rebuild_docs r
+            LEFT JOIN documents d ON d.doc_id = r.doc_id
+            WHERE d.doc_id IS NULL OR d.fetched_at != r.fetched_at
+            """
+        )
+        return [int(r[0]) for r in rows]
+
+    def _mark_rebuilt(self, version: int) -> None:
+        self.repo.conn.execute(
+            """
+            INSERT OR IGNORE INTO indexed_docs(doc_id, index_version, indexed_at)
+            SELECT r.doc_id, ?, datetime('now') FROM rebuild_docs r
+            JOIN documents d ON d.doc_id = r.doc_id AND d.fetched_at = r.fetched_at
+            """,
+            (version,),
+        )
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+
+from astra.common.config import settings
+from astra.storage.db import tx
+from astra.storage.repo import Repo
+
+log = logging.getLogger(__name__)
+
+_INSERT_BATCH = 5000
+_INSERT_SQL = "INSERT OR IGNORE INTO spell_deletes(variant, term_id) VALUES(?, ?)"
+
+
+def deletes(word: str, max_distance: int, prefix_length: int) -> set[str]:
+    """`word` cut to `prefix_length`, plus every string up to `max_distance` deletions away."""
+    # two words within edit distance d share a variant when both sides take up to d deletes;
+    # prefix matches are verified against the full word by the caller
+    out = {word[:prefix_length]}
+    frontier = set(out)
+    for _ in range(max_distance):
+        nxt = set()
+        for w in frontier:
+            if len(w) <= 1:
+                continue
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1 :])
+        nxt -= out
+        out |= nxt
+        frontier = nxt
+    return out
+
+
+def update_spelling_index(
+    repo: Repo,
+    max_distance: int | None = None,
+    prefix_length: int | None = None,
+    rebuild: bool = False,
+) -> int:
+    """Add delete variants for terms created since the last update; returns the terms added."""
+    # terms are never removed, so the highest term_id covered is enough to resume from
+    max_distance = settings.spell_max_distance if max_distance is None else max_distance
+    prefix_length = prefix_length or settings.spell_prefix_length
+    conn = repo.conn
+    with tx(conn, immediate=True):
+        meta = conn.execute(
+            "SELECT max_term_id, max_distance, prefix_length FROM spell_meta"
+        ).fetchone()
+        start = 0
+        params = (max_distance, prefix_length)
+        if meta is not None and not rebuild:
+            if (int(meta["max_distance"]), int(meta["prefix_length"])) == params:
+                start = int(meta["max_term_id"])
+        if start == 0:
+            conn.execute("DELETE FROM spell_deletes")
+
+        rows = conn.execute(
+            "SELECT term_id, term FROM terms WHERE term_id > ? ORDER BY term_id", (start,)
+        )
+        added = 0
+        last = start
+        pending: list[tuple[str, int]] = []
+        for r in rows.fetchall():
+            term_id = int(r["term_id"])
+            pending.extend((v, term_id) for v in deletes(r["term"], max_distance, prefix_length))
+            added += 1
+            last = term_id
+            if len(pending) >= _INSERT_BATCH:
+                conn.executemany(_INSERT_SQL, pending)
+                pending = []
+        if pending:
+            conn.executemany(_INSERT_SQL, pending)
+
+        conn.execute("DELETE FROM spell_meta")
+        conn.execute(
+            """
+            INSERT INTO spell_meta(max_term_id, max_distance, prefix_length, built_at)
+            VALUES(?, ?, ?, datetime('now'))
+            """,
+            (last, max_distance, prefix_length),
+        )
+    if added:
+        log.info("spelling_index_updated", extra={"terms": added})
+    return added
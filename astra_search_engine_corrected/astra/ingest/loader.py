@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from astra.common.text import html_to_text
+from astra.common.url import normalize_url
+from astra.indexer.indexer import Indexer
+from astra.ingest.readers import RawRecord
+from astra.storage.db import bulk_load, tx
+from astra.storage.repo import Repo
+from astra.storage.shards import ShardRouter, shard_for_url
+
+_Row = tuple[str, str, str, str]
+
+
+@dataclass
+class IngestStats:
+    records: int = 0
+    stored: int = 0
+    skipped: int = 0
+    errors: int = 0
+    indexed: int = 0
+    input_bytes: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self) -> dict[str, float | int]:
+        elapsed = max(self.elapsed_seconds, 1e-9)
+        return {
+            "records": self.records,
+            "stored": self.stored,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "indexed": self.indexed,
+            "input_mb": round(self.input_bytes / 1e6, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_sec": round(self.stored / elapsed, 1),
+            "mb_per_sec": round(self.input_bytes / 1e6 / elapsed, 3),
+        }
+
+
+class BulkLoader:
+    """Streams records into SQLite in batched transactions under `bulk_load`.
+
+    With `index=True` new documents are indexed per batch and changed ones after
+    the load, once the secondary indexes are back. Given a `ShardRouter`, each row
+    goes to the shard owning its URL, as in the crawler.
+    """
+
+    def __init__(
+        self,
+        repo: Repo | ShardRouter,
+        batch_size: int = 500,
+        index: bool = False,
+        cache_mb: int = 256,
+        on_progress: Callable[[IngestStats], None] | None = None,
+        progress_every_seconds: float = 5.0,
+    ):
+        self.repos = repo.repos if isinstance(repo, ShardRouter) else [repo]
+        self.batch_size = batch_size
+        self.index = index
+        self.cache_mb = cache_mb
+        self.on_progress = on_progress
+        self.progress_every_seconds = progress_every_seconds
+        self.indexers = [Indexer(r) for r in self.repos]
+
+    def load(self, records: Iterable[RawRecord]) -> IngestStats:
+        stats = IngestStats()
+        last_report = time.perf_counter()
+        batches: list[list[_Row]] = [[] for _ in self.repos]
+
+        with ExitStack() as stack:
+            # the page cache budget is shared by the shards
+            cache_mb = max(1, self.cache_mb // len(self.repos))
+            for repo in self.repos:
+                stack.enter_context(bulk_load(repo.conn, cache_mb=cache_mb))
+            for rec in records:
+                stats.records += 1
+                stats.input_bytes += rec.size
+                row = None if rec.error else self._to_row(rec)
+                if rec.error:
+                    stats.errors += 1
+                elif row is None:
+                    stats.skipped += 1
+                else:
+                    shard = shard_for_url(row[0], len(self.repos))
+                    batches[shard].append(row)
+                    if len(batches[shard]) >= self.batch_size:
+                        self._flush(shard, batches[shard], stats)
+                        batches[shard] = []
+                now = time.perf_counter()
+                if self.on_progress and now - last_report >= self.progress_every_seconds:
+                    self.on_progress(stats)
+                    last_report = now
+            for shard, batch in enumerate(batches):
+                self._flush(shard, batch, stats)
+
+        if self.index:
+            # bounded batches: a reload can leave more changed documents than fit in memory
+            for indexer in self.indexers:
+                while indexed := indexer.index_new_documents(batch_size=self.batch_size):
+                    stats.indexed += indexed
+        return stats
+
+    def _to_row(self, rec: RawRecord) -> _Row | None:
+        url = normalize_url(rec.url.strip(), "")
+        if not url:
+            return None
+        if rec.html is not None:
+            title, body = html_to_text(rec.html)
+        else:
+            title, body = rec.title or "", rec.body or ""
+        if not body:
+            return None
+        fetched_at = rec.fetched_at or datetime.now(UTC).isoformat()
+        return url, title or url, body, fetched_at
+
+    def _flush(self, shard: int, batch: list[_Row], stats: IngestStats) -> None:
+        if not batch:
+            return
+        repo, indexer = self.repos[shard], self.indexers[shard]
+        new_ids, _changed = repo.bulk_upsert_documents(batch)
+        # the last row per URL wins within a batch; earlier duplicates are not written
+        stored = len({row[0] for row in batch})
+        stats.stored += stored
+        stats.skipped += len(batch) - stored
+        if self.index and new_ids:
+            with tx(repo.conn, immediate=True):
+                docs = repo.fetch_documents_by_ids(new_ids)
+                stats.indexed += indexer.index_documents(docs, fresh=True)
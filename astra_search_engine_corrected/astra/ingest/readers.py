@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import logging
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from astra.common.config import settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RawRecord:
+    """One input document: either raw `html`, or already extracted `title`/`body`."""
+
+    url: str
+    fetched_at: str
+    html: str | None = None
+    title: str | None = None
+    body: str | None = None
+    size: int = 0
+    error: str | None = None
+
+
+def _open(path: Path) -> BinaryIO:
+    # gzip.open also reads multi-member files (per-record gzip, as in .warc.gz)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    return open(path, "rb")
+
+
+def detect_format(path: Path) -> str:
+    name = path.name.lower().removesuffix(".gz")
+    if name.endswith(".warc"):
+        return "warc"
+    return "jsonl"
+
+
+def _optional_str(value: object) -> str | None:
+    if value is not None and not isinstance(value, str):
+        raise TypeError(f"expected a string, got {type(value).__name__}")
+    return value
+
+
+def iter_jsonl(path: Path) -> Iterator[RawRecord]:
+    """Lines of {"url", "html"} or {"url", "title", "body"|"text"}; optional "fetched_at".
+
+    Lines that are not JSON objects with string fields come back as `error` records.
+    """
+    with _open(path) as fh:
+        lines = io.TextIOWrapper(fh, encoding="utf-8", errors="replace")
+        for lineno, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+                url = obj["url"]
+                if not isinstance(url, str):
+                    raise TypeError("url is not a string")
+                rec = RawRecord(
+                    url=url,
+                    fetched_at=_optional_str(obj.get("fetched_at")) or "",
+                    html=_optional_str(obj.get("html")),
+                    title=_optional_str(obj.get("title")),
+                    body=_optional_str(obj.get("body", obj.get("text"))),
+                    size=len(line),
+                )
+            except (ValueError, KeyError, TypeError):
+                log.warning("ingest_bad_jsonl_line", extra={"path": str(path), "line": lineno})
+                rec = RawRecord(url="", fetched_at="", size=len(line), error="bad_jsonl_line")
+            yield rec
+
+
+def _read_headers(fh: BinaryIO) -> tuple[str, dict[str, str]] | None:
+    first = fh.readline()
+    while first in (b"\r\n", b"\n"):
+        first = fh.readline()
+    if not first:
+        return None
+    headers: dict[str, str] = {}
+    while True:
+        line = fh.readline()
+        if not line or line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("utf-8", errors="replace").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return first.decode("utf-8", errors="replace").strip(), headers
+
+
+def _decode(payload: bytes, content_type: str) -> str:
+    charset = "utf-8"
+    for part in content_type.split(";"):
+        name, _, value = part.strip().partition("=")
+        if name.lower() == "charset" and value:
+            charset = value.strip("\"'")
+    try:
+        return payload.decode(charset, errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+
+def iter_warc(path: Path) -> Iterator[RawRecord]:
+    """HTML `response` records of a WARC file, truncated to `max_response_bytes`."""
+    limit = settings.max_response_bytes
+    with _open(path) as fh:
+        while True:
+            head = _read_headers(fh)
+            if head is None:
+                return
+            version, headers = head
+            if not version.startswith("WARC/"):
+                raise ValueError(f"{path}: not a WARC record header: {version!r}")
+            length = int(headers.get("content-length", "0"))
+            block = fh.read(min(length, limit + 64 * 1024))
+            remaining = length - len(block)
+            while remaining > 0:
+                chunk = fh.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+
+            if (
+                headers.get("warc-type") != "response"
+                or "msgtype=response" not in headers.get("content-type", "")
+            ):
+                continue
+            http_head, _, payload = block.partition(b"\r\n\r\n")
+            status_line, _, raw_headers = http_head.partition(b"\r\n")
+            parts = status_line.split()
+            if len(parts) < 2 or not parts[1].isdigit() or int(parts[1]) >= 400:
+                continue
+            http_headers = {}
+            for line in raw_headers.split(b"\r\n"):
+                name, _, value = line.decode("latin-1").partition(":")
+                http_headers[name.strip().lower()] = value.strip()
+            ctype = http_headers.get("content-type", "")
+            if "text/html" not in ctype:
+                continue
+            yield RawRecord(
+                url=headers.get("warc-target-uri", "").strip("<>"),
+                fetched_at=headers.get("warc-date", ""),
+                html=_decode(payload[:limit], ctype),
+                size=length,
+            )
+
+
+def iter_records(path: Path, fmt: str = "auto") -> Iterator[RawRecord]:
+    fmt = detect_format(path) if fmt == "auto" else fmt
+    if fmt == "warc":
+        return iter_warc(path)
+    if fmt == "jsonl":
+        return iter_jsonl(path)
+    raise ValueError(f"unknown ingest format: {fmt}")
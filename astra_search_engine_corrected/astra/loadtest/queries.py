@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import itertools
+import random
+from collections.abc import Iterator
+from pathlib import Path
+
+from astra.ranker.suggest import term_dfs
+from astra.storage.repo import Repo
+
+
+def read_query_file(path: Path) -> list[str]:
+    """One query per line; a tab-separated log keeps only its first column."""
+    out = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        q = line.split("\t", 1)[0].strip()
+        if q:
+            out.append(q)
+    return out
+
+
+def zipf_queries(
+    repo: Repo,
+    count: int,
+    vocabulary: int = 1000,
+    exponent: float = 1.1,
+    max_terms: int = 3,
+    seed: int = 0,
+) -> list[str]:
+    """A synthetic query mix: terms drawn by Zipf rank over the `vocabulary` most frequent terms."""
+    # ranking by df makes the hot queries also the ones with the longest posting lists
+    dfs = term_dfs(repo)
+    terms = sorted(dfs, key=lambda t: (-dfs[t], t))[:vocabulary]
+    if not terms:
+        raise ValueError("no indexed terms to build queries from")
+    rng = random.Random(seed)  # noqa: S311 - a reproducible query mix, not secrets
+    cum = list(itertools.accumulate(1.0 / (rank**exponent) for rank in range(1, len(terms) + 1)))
+    out = []
+    for _ in range(count):
+        n = rng.randint(1, max_terms)
+        out.append(" ".join(dict.fromkeys(rng.choices(terms, cum_weights=cum, k=n))))
+    return out
+
+
+def cycle_queries(queries: list[str]) -> Iterator[str]:
+    """Replay in order, wrapping around."""
+    if not queries:
+        raise ValueError("no queries to replay")
+    return itertools.cycle(queries)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import httpx
+
+from astra.storage.posting_cache import posting_cache_stats
+
+# a step is saturated when it completes less than this share of its arrivals
+_THROUGHPUT_FLOOR = 0.9
+_MAX_ERROR_RATE = 0.01
+
+
+@dataclass
+class StepResult:
+    """One fixed-rate run; latency counts from each request's scheduled arrival."""
+
+    offered_qps: float
+    duration_seconds: float
+    sent: int = 0
+    errors: int = 0
+    elapsed_seconds: float = 0.0
+    latencies_ms: list[float] = field(default_factory=list)
+    statuses: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def achieved_qps(self) -> float:
+        return (self.sent - self.errors) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def arrival_qps(self) -> float:
+        """The rate actually generated; a short Poisson run can deviate from `offered_qps`."""
+        return self.sent / self.duration_seconds if self.duration_seconds else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.sent if self.sent else 0.0
+
+    def percentile(self, p: float) -> float:
+        ms = sorted(self.latencies_ms)
+        return ms[int(p * (len(ms) - 1))] if ms else 0.0
+
+    def saturated(self, slo_p99_ms: float | None) -> str | None:
+        """Why this step is past the saturation point, if it is."""
+        if self.achieved_qps < _THROUGHPUT_FLOOR * self.arrival_qps:
+            return "throughput"
+        if self.error_rate > _MAX_ERROR_RATE:
+            return "errors"
+        if slo_p99_ms is not None and self.percentile(0.99) > slo_p99_ms:
+            return "p99_latency"
+        return None
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "offered_qps": self.offered_qps,
+            "arrival_qps": round(self.arrival_qps, 2),
+            "achieved_qps": round(self.achieved_qps, 2),
+            "sent": self.sent,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "mean": round(statistics.fmean(self.latencies_ms), 3) if self.latencies_ms else 0.0,
+                "p50": round(self.percentile(0.50), 3),
+                "p95": round(self.percentile(0.95), 3),
+                "p99": round(self.percentile(0.99), 3),
+                "p999": round(self.percentile(0.999), 3),
+                "max": round(max(self.latencies_ms, default=0.0), 3),
+            },
+        }
+
+
+async def _run_step(
+    client: httpx.AsyncClient,
+    queries: Iterator[str],
+    rate: float,
+    duration: float,
+    clients: int,
+    path: str,
+    k: int,
+    rng: random.Random,
+) -> StepResult:
+    """Open loop: Poisson arrivals at `rate`, whatever the server's response times."""
+    # at most `clients` requests in flight; the wait for a free one counts as latency
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(clients)
+    step = StepResult(offered_qps=rate, duration_seconds=duration)
+
+    async def one(q: str, scheduled: float) -> None:
+        async with slots:
+            try:
+                resp = await client.get(path, params={"q": q, "k": k})
+                status = str(resp.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        step.latencies_ms.append((loop.time() - scheduled) * 1000.0)
+        step.statuses[status] += 1
+        if not status.startswith("2"):
+            step.errors += 1
+
+    tasks = []
+    start = loop.time()
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(next(queries), start + offset)))
+        offset += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    step.sent = len(tasks)
+    step.elapsed_seconds = loop.time() - start
+    return step
+
+
+def saturation_point(steps: list[StepResult], slo_p99_ms: float | None) -> dict[str, object]:
+    """The highest offered rate that was sustained, and the first that was not."""
+    sustained = None
+    for s in steps:
+        reason = s.saturated(slo_p99_ms)
+        if reason is not None:
+            return {
+                "max_sustained_qps": sustained,
+                "saturated_at_qps": s.offered_qps,
+                "reason": reason,
+            }
+        sustained = s.offered_qps
+    return {"max_sustained_qps": sustained, "saturated_at_qps": None, "reason": None}
+
+
+async def _run(
+    client: httpx.AsyncClient,
+    queries: Iterator[str],
+    rates: list[float],
+    duration: float,
+    clients: int,
+    path: str,
+    k: int,
+    warmup: float,
+    slo_p99_ms: float | None,
+    stop_at_saturation: bool,
+    seed: int,
+) -> list[StepResult]:
+    rng = random.Random(seed)  # noqa: S311 - arrival times, not secrets
+    if warmup > 0 and rates:
+        await _run_step(client, queries, rates[0], warmup, clients, path, k, rng)
+    steps = []
+    for rate in rates:
+        step = await _run_step(client, queries, rate, duration, clients, path, k, rng)
+        steps.append(step)
+        if stop_at_saturation and step.saturated(slo_p99_ms):
+            break
+    return steps
+
+
+def run_loadtest(
+    target: object,
+    queries: Iterator[str],
+    rates: list[float],
+    duration: float = 10.0,
+    clients: int = 32,
+    path: str = "/search",
+    k: int = 10,
+    warmup: float = 1.0,
+    slo_p99_ms: float | None = None,
+    stop_at_saturation: bool = True,
+    seed: int = 0,
+) -> dict[str, object]:
+    """Replay `queries` against `target` (an ASGI app, or a base URL) at each rate in turn."""
+    if not rates or min(rates) <= 0:
+        raise ValueError(f"rates must be above 0: {rates}")
+    if duration <= 0 or clients < 1:
+        raise ValueError(f"need duration > 0 and clients >= 1, got {duration} and {clients}")
+    if isinstance(target, str):
+        mode = "http"
+        limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+        client = httpx.AsyncClient(base_url=target, limits=limits, timeout=30.0)
+    else:
+        mode = "asgi"
+        transport = httpx.ASGITransport(app=target)
+        client = httpx.AsyncClient(transport=transport, base_url="http://astra", timeout=30.0)
+
+    async def main() -> list[StepResult]:
+        async with client:
+            return await _run(
+                client,
+                queries,
+                rates,
+                duration,
+                clients,
+                path,
+                k,
+                warmup,
+                slo_p99_ms,
+                stop_at_saturation,
+                seed,
+            )
+
+    steps = asyncio.run(main())
+    report: dict[str, object] = {
+        "mode": mode,
+        "path": path,
+        "clients": clients,
+        "duration_seconds": duration,
+        "slo_p99_ms": slo_p99_ms,
+        "steps": [s.as_dict() for s in steps],
+        "saturation": saturation_point(steps, slo_p99_ms),
+    }
+    if mode == "asgi":
+        # the app ran in this process, so its caches are visible here
+        report["posting_cache"] = posting_cache_stats()
+    return report
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import heapq
 import math
+import time
+from array import array
 from dataclasses import dataclass
 
 from astra.common.config import settings
 from astra.common.tokenizer import Query
+from astra.ranker.boolean import Cursor, intersect
+from astra.storage.links import load_priors
+from astra.storage.posting_cache import PostingList, posting_cache
 from astra.storage.repo import Repo
+from astra.storage.segments import SegmentSet
+from astra.storage.term_dict import load_term_dictionary
 
 
 @dataclass(frozen=True)
@@ -14,48 +22,251 @@ class ScoredDoc:
     score: float
 
 
+@dataclass(frozen=True)
+class CollectionStats:
+    """Collection-level BM25 inputs; df is keyed by term string."""
+
+    doc_count: int
+    avg_doc_len: float
+    df: dict[str, int]
+
+
+def bm25_idf(doc_count: int, df: int) -> float:
+    # BM25 IDF variant with +1 to avoid negatives on very common terms
+    return math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+
+
+def bm25_weight(idf: float, tf_title: int, tf_body: int, length: int, avgdl: float) -> float:
+    """One posting's contribution to a document's BM25 score."""
+    dl = float(length or 0.0) or 1.0
+    tf = tf_body + settings.title_boost * tf_title
+    denom = tf + settings.k1 * (1.0 - settings.b + settings.b * (dl / avgdl))
+    return float(idf * ((tf * (settings.k1 + 1.0)) / denom))
+
+
+_EMPTY = PostingList.from_rows([])
+
+
 class BM25Ranker:
+    # whether the last search saw every matching doc (see ImpactRanker)
+    exhaustive = True
+
     def __init__(self, repo: Repo):
         self.repo = repo
+        # term_id -> postings shared across the queries of a batch (see SearchService.search_batch)
+        self.postings_memo: dict[int, PostingList] | None = None
+
+    def _resolve_terms(self, terms: list[str], prefixes: list[str] | None = None) -> dict[str, int]:
+        term_dict = load_term_dictionary(self.repo)
+        term_ids = term_dict.lookup_many(terms)
+        for p in prefixes or []:
+            for term, tid in term_dict.expand_prefix(p, settings.max_wildcard_expansions):
+                term_ids.setdefault(term, tid)
+        return term_ids
 
-    def search(self, query: Query, k: int) -> list[ScoredDoc]:
+    def posting_term_ids(self, query: Query) -> list[int]:
+        """Terms whose posting lists searching `query` reads."""
+        term_ids = self._resolve_terms(query.terms, query.prefixes)
+        return list(term_ids.values()) + list(self._resolve_terms(query.excluded).values())
+
+    def prefix_dfs(self, prefix: str, limit: int) -> dict[str, int]:
+        """Top `limit` terms by df among the first `16 * limit` starting with `prefix`."""
+        matches = load_term_dictionary(self.repo).expand_prefix(prefix, 16 * limit)
+        df = self.collection_stats([t for t, _ in matches]).df
+        return dict(heapq.nsmallest(limit, df.items(), key=lambda kv: (-kv[1], kv[0])))
+
+    def _postings(self, term_ids: list[int]) -> dict[int, PostingList]:
+        memo = self.postings_memo
+        if memo is None:
+            return self._read_postings(term_ids)
+        missing = [t for t in dict.fromkeys(term_ids) if t not in memo]
+        if missing:
+            fetched = self._read_postings(missing)
+            for t in missing:
+                memo[t] = fetched.get(t, _EMPTY)
+        return {t: memo[t] for t in term_ids if memo[t]}
+
+    def _read_postings(self, term_ids: list[int]) -> dict[int, PostingList]:
+        """Postings through the process-wide posting cache; misses are read in one query."""
+        cached = posting_cache(self.repo)
+        if cached is None:
+            return self._load_postings(term_ids)
+        cache, version = cached
+        out: dict[int, PostingList] = {}
+        missing: list[int] = []
+        for t in dict.fromkeys(term_ids):
+            plist = cache.get(t)
+            if plist is None:
+                missing.append(t)
+            elif plist:
+                out[t] = plist
+        if missing:
+            start = time.perf_counter()
+            loaded = self._load_postings(missing)
+            elapsed = time.perf_counter() - start
+            # one query read them all; split its cost by posting count
+            share = elapsed / (sum(len(p) for p in loaded.values()) + len(missing))
+            for t in missing:
+                plist = loaded.get(t, _EMPTY)
+                cache.put(t, plist, share * (len(plist) + 1), version)
+                if plist:
+                    out[t] = plist
+        return out
+
+    def _load_postings(self, term_ids: list[int]) -> dict[int, PostingList]:
+        if settings.index_layout == "segments":
+            with SegmentSet(self.repo) as segments:
+                rows = segments.get_postings_for_term_ids(term_ids)
+        else:
+            rows = self.repo.get_postings_for_term_ids(term_ids)
+        return {t: PostingList.from_rows(r) for t, r in rows.items()}
+
+    def collection_stats(self, terms: list[str]) -> CollectionStats:
         stats = self.repo.get_stats()
-        N = max(int(stats["doc_count"]), 1)
-        avgdl = float(stats["avg_doc_len"] or 0.0) or 1.0
+        df: dict[str, int] = {}
+        if terms and settings.index_layout == "segments":
+            # tombstones make df depend on liveness; count what search would see
+            term_ids = self._resolve_terms(terms)
+            postings = self._postings(list(term_ids.values()))
+            df = {t: len(postings.get(tid, [])) for t, tid in term_ids.items()}
+        elif terms:
+            q = ",".join("?" for _ in terms)
+            rows = self.repo.conn.execute(
+                f"""
+                SELECT t.term, COUNT(*) AS c
+                FROM terms t
+                JOIN postings p ON p.term_id = t.term_id
+                WHERE t.term IN ({q})
+                GROUP BY t.term
+                """,  # noqa: S608 - placeholders only
+                list(terms),
+            ).fetchall()
+            df = {r["term"]: int(r["c"]) for r in rows}
+        return CollectionStats(
+            doc_count=int(stats["doc_count"]),
+            avg_doc_len=float(stats["avg_doc_len"] or 0.0),
+            df=df,
+        )
 
-        # resolve term -> term_id
-        term_ids: dict[str, int] = {}
-        for t in query.terms:
-            row = self.repo.conn.execute("SELECT term_id FROM terms WHERE term=?", (t,)).fetchone()
-            if row:
-                term_ids[t] = int(row["term_id"])
+    def search(self, query: Query, k: int, stats: CollectionStats | None = None) -> list[ScoredDoc]:
+        # sharded search passes global `stats` so scores from different shards compare
+        return self.search_with_count(query, k, stats=stats)[0]
 
-        postings_by_tid = self.repo.get_postings_for_term_ids(list(term_ids.values()))
+    def search_with_count(
+        self,
+        query: Query,
+        k: int,
+        stats: CollectionStats | None = None,
+        after: tuple[float, int] | None = None,
+        track_total_hits: int = 0,
+    ) -> tuple[list[ScoredDoc], int]:
+        """Top-k docs by (score desc, doc_id asc) after `after`, plus the number matching."""
+        # every match is scored here, so the count is exact whatever `track_total_hits` is
+        if stats is None:
+            row = self.repo.get_stats()
+            n_docs = max(int(row["doc_count"]), 1)
+            avgdl = float(row["avg_doc_len"] or 0.0) or 1.0
+        else:
+            n_docs = max(stats.doc_count, 1)
+            avgdl = stats.avg_doc_len or 1.0
 
-        scores: dict[int, float] = {}
+        term_ids = self._resolve_terms(query.terms, query.prefixes)
+        if any(t not in term_ids for t in query.required):
+            return [], 0  # a required term that is not indexed matches nothing
+        excluded_ids = self._resolve_terms(query.excluded)
+        postings_by_tid = self._postings(list(term_ids.values()) + list(excluded_ids.values()))
 
+        # term -> (idf, doc-id-sorted postings)
+        weighted: dict[str, tuple[float, PostingList]] = {}
         for term, tid in term_ids.items():
-            postings = postings_by_tid.get(tid, [])
-            df = len(postings)
-            if df == 0:
+            postings = postings_by_tid.get(tid)
+            if not postings:
                 continue
+            df = stats.df.get(term, len(postings)) if stats is not None else len(postings)
+            weighted[term] = (bm25_idf(n_docs, df), postings)
 
-            # BM25 IDF variant with +1 to avoid negatives on very common terms
-            idf = math.log(1.0 + (N - df + 0.5) / (df + 0.5))
+        if any(t not in weighted for t in query.required):
+            return [], 0  # indexed once, but every doc containing it was deleted
+        excluded = [
+            postings_by_tid[tid].doc_ids for tid in excluded_ids.values() if tid in postings_by_tid
+        ]
 
-            for r in postings:
-                doc_id = int(r["doc_id"])
-                dl = float(r["length"] or 0.0) or 1.0
+        if query.required:
+            required = list(dict.fromkeys(query.required))
+            scores = self._score_conjunctive(weighted, required, excluded, avgdl)
+        else:
+            scores = self._score_disjunctive(weighted, excluded, avgdl)
+        self._add_priors(scores)
 
-                tf_title = int(r["tf_title"])
-                tf_body = int(r["tf_body"])
-                tf = tf_body + settings.title_boost * tf_title
+        # Phrase filtering is handled outside (requires doc content).
+        candidates = scores.items()
+        if after is not None:
+            after_score, after_doc = after
+            candidates = [
+                (d, sc)
+                for d, sc in candidates
+                if sc < after_score or (sc == after_score and d > after_doc)
+            ]
+        top = heapq.nsmallest(k, candidates, key=lambda kv: (-kv[1], kv[0]))
+        return [ScoredDoc(doc_id=doc_id, score=score) for doc_id, score in top], len(scores)
 
-                denom = tf + settings.k1 * (1.0 - settings.b + settings.b * (dl / avgdl))
-                score = idf * ((tf * (settings.k1 + 1.0)) / denom)
+    def _add_priors(self, scores: dict[int, float]) -> None:
+        """Blend in the static link prior: once per matched doc, never per posting."""
+        priors = load_priors(self.repo) if settings.prior_weight > 0 else None
+        if not priors:
+            return
+        weight, n = settings.prior_weight, len(priors)
+        for doc_id in scores:
+            if doc_id < n:
+                scores[doc_id] += weight * priors[doc_id]
 
-                scores[doc_id] = scores.get(doc_id, 0.0) + float(score)
+    @staticmethod
+    def _term_score(idf: float, postings: PostingList, pos: int, avgdl: float) -> float:
+        p = postings
+        return bm25_weight(idf, p.tf_title[pos], p.tf_body[pos], p.lengths[pos], avgdl)
 
-        # Phrase filtering is handled outside (requires doc content).
-        top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
-        return [ScoredDoc(doc_id=doc_id, score=score) for doc_id, score in top]
+    def _score_disjunctive(
+        self,
+        weighted: dict[str, tuple[float, PostingList]],
+        excluded: list[array],
+        avgdl: float,
+    ) -> dict[int, float]:
+        """OR: every posting of every term contributes; NOT is checked per posting."""
+        skip = {doc_id for ids in excluded for doc_id in ids}
+        scores: dict[int, float] = {}
+        for idf, p in weighted.values():
+            rows = zip(p.doc_ids, p.tf_title, p.tf_body, p.lengths, strict=True)
+            for doc_id, tf_title, tf_body, length in rows:
+                if doc_id in skip:
+                    continue
+                weight = bm25_weight(idf, tf_title, tf_body, length, avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return scores
+
+    def _score_conjunctive(
+        self,
+        weighted: dict[str, tuple[float, PostingList]],
+        required: list[str],
+        excluded: list[array],
+        avgdl: float,
+    ) -> dict[int, float]:
+        """AND: score only docs in every required list; optional terms are probed by cursor."""
+        req_lists = [weighted[t][1] for t in required]
+        req_idfs = [weighted[t][0] for t in required]
+        optional = [
+            (idf, postings, Cursor(postings.doc_ids))
+            for t, (idf, postings) in weighted.items()
+            if t not in required
+        ]
+
+        scores: dict[int, float] = {}
+        for doc_id, positions in intersect([lst.doc_ids for lst in req_lists], excluded):
+            score = 0.0
+            for idf, lst, pos in zip(req_idfs, req_lists, positions, strict=True):
+                score += self._term_score(idf, lst, pos, avgdl)
+            for idf, postings, cur in optional:
+                pos = cur.seek(doc_id)
+                if pos is not None:
+                    score += self._term_score(idf, postings, pos, avgdl)
+            scores[doc_id] = score
+        return scores
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+
+
+def gallop(arr: Sequence[int], target: int, lo: int = 0) -> int:
+    """Smallest index i >= lo with arr[i] >= target (len(arr) if none), in O(log(i - lo))."""
+    n = len(arr)
+    if lo >= n or arr[lo] >= target:
+        return lo
+    step = 1
+    hi = lo + 1
+    while hi < n and arr[hi] < target:
+        lo = hi
+        step <<= 1
+        hi = lo + step
+    hi = min(hi, n)
+    # invariant: arr[lo] < target and (hi == n or arr[hi] >= target)
+    lo += 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if arr[mid] < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class Cursor:
+    """Forward-only position in a doc-id-sorted list."""
+
+    __slots__ = ("doc_ids", "pos")
+
+    def __init__(self, doc_ids: Sequence[int]):
+        self.doc_ids = doc_ids
+        self.pos = 0
+
+    def seek(self, doc_id: int) -> int | None:
+        """Advance to `doc_id`; returns its index if present."""
+        self.pos = gallop(self.doc_ids, doc_id, self.pos)
+        if self.pos < len(self.doc_ids) and self.doc_ids[self.pos] == doc_id:
+            return self.pos
+        return None
+
+
+def intersect(
+    required: Sequence[Sequence[int]],
+    excluded: Sequence[Sequence[int]] = (),
+) -> Iterator[tuple[int, list[int]]]:
+    """Yield (doc_id, its index in each of `required`) for docs in all of them and none excluded."""
+    if not required or any(len(r) == 0 for r in required):
+        return
+    # drive from the shortest list and gallop the others forward
+    order = sorted(range(len(required)), key=lambda i: len(required[i]))
+    lead = required[order[0]]
+    others = [(i, Cursor(required[i])) for i in order[1:]]
+    nots = [Cursor(e) for e in excluded if e]
+
+    positions = [0] * len(required)
+    pos = 0
+    while pos < len(lead):
+        doc_id = lead[pos]
+        positions[order[0]] = pos
+        matched = True
+        for i, cur in others:
+            found = cur.seek(doc_id)
+            if found is None:
+                matched = False
+                # skip the lead forward to where the failing list resumes
+                if cur.pos >= len(cur.doc_ids):
+                    return
+                pos = gallop(lead, cur.doc_ids[cur.pos], pos + 1)
+                break
+            positions[i] = found
+        if not matched:
+            continue
+        if not any(c.seek(doc_id) is not None for c in nots):
+            yield doc_id, list(positions)
+        pos += 1
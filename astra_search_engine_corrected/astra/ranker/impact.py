@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import heapq
+import math
+import sqlite3
+import statistics
+import time
+
+from astra.common.config import settings
+from astra.common.tokenizer import Query, parse_query
+from astra.ranker.bm25 import BM25Ranker, CollectionStats, ScoredDoc
+from astra.storage.links import load_priors
+from astra.storage.repo import Repo
+
+_FETCH = 1024
+
+
+class _ImpactList:
+    """Forward reader over one term's impact-ordered postings."""
+
+    __slots__ = ("_cur", "_rows", "_pos", "head")
+
+    def __init__(self, cur: sqlite3.Cursor):
+        self._cur = cur
+        self._rows: list[tuple[int, int]] = []
+        self._pos = 0
+        self.head: int | None = None  # impact of the next unread segment
+        self._refill()
+
+    def _refill(self) -> None:
+        self._rows = self._cur.fetchmany(_FETCH)
+        self._pos = 0
+        self.head = int(self._rows[0][0]) if self._rows else None
+
+    def take_segment(self) -> list[int]:
+        """Doc ids of the next run of equal impact."""
+        impact = self.head
+        docs: list[int] = []
+        while self.head == impact:
+            rows, pos = self._rows, self._pos
+            while pos < len(rows) and rows[pos][0] == impact:
+                docs.append(int(rows[pos][1]))
+                pos += 1
+            if pos < len(rows):
+                self._pos = pos
+                self.head = int(rows[pos][0])
+            else:
+                self._refill()
+        return docs
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+class ImpactRanker(BM25Ranker):
+    """Score-at-a-time evaluation over precomputed quantized impacts.
+
+    Stops once the impact mass left cannot change the top-k set. AND queries,
+    global (sharded) statistics and stale impacts fall back to exact BM25.
+    """
+
+    def __init__(self, repo: Repo):
+        super().__init__(repo)
+        self.postings_scored = 0
+
+    def impact_meta(self) -> sqlite3.Row | None:
+        """The impact index metadata, if it matches the current index_version."""
+        sql = "SELECT index_version, bits, scale FROM impact_meta"
+        row = self.repo.conn.execute(sql).fetchone()
+        if row is None or int(row["index_version"]) != int(self.repo.get_stats()["index_version"]):
+            return None
+        return row
+
+    def posting_term_ids(self, query: Query) -> list[int]:
+        if query.required or self.impact_meta() is None:
+            return super().posting_term_ids(query)
+        # scored terms are read from `impacts`
+        return list(self._resolve_terms(query.excluded).values())
+
+    def search_with_count(
+        self,
+        query: Query,
+        k: int,
+        stats: CollectionStats | None = None,
+        after: tuple[float, int] | None = None,
+        track_total_hits: int = 0,
+    ) -> tuple[list[ScoredDoc], int]:
+        self.exhaustive, self.postings_scored = True, 0
+        meta = self.impact_meta() if stats is None and not query.required else None
+        if meta is None:
+            return super().search_with_count(query, k, stats=stats, after=after)
+
+        scale = float(meta["scale"])
+        term_ids = self._resolve_terms(query.terms, query.prefixes)
+        excluded_ids = self._resolve_terms(query.excluded)
+        skip: set[int] = set()
+        for postings in self._postings(list(excluded_ids.values())).values():
+            skip.update(postings.doc_ids)
+
+        priors = load_priors(self.repo) if settings.prior_weight > 0 else None
+        weight = settings.prior_weight if priors else 0.0
+        # a cursor position refers to final scores, so deep pages are scored exhaustively
+        acc = self._score_at_a_time(
+            list(term_ids.values()),
+            k if after is None else None,
+            skip,
+            slack=math.ceil(weight / scale),
+            min_count=track_total_hits,
+        )
+        n = len(priors) if priors else 0
+        candidates = (
+            (d, q * scale + (weight * priors[d] if d < n else 0.0)) for d, q in acc.items()
+        )
+        if after is not None:
+            after_score, after_doc = after
+            candidates = (
+                (d, sc)
+                for d, sc in candidates
+                if sc < after_score or (sc == after_score and d > after_doc)
+            )
+        top = heapq.nsmallest(k, candidates, key=lambda kv: (-kv[1], kv[0]))
+        return [ScoredDoc(doc_id=d, score=sc) for d, sc in top], len(acc)
+
+    def _score_at_a_time(
+        self,
+        term_ids: list[int],
+        k: int | None,
+        skip: set[int],
+        slack: int = 0,
+        min_count: int = 0,
+    ) -> dict[int, int]:
+        """Quantized accumulators; `slack` bounds what the static prior can add to any doc."""
+        # stopping early leaves the match count short, so only once `min_count` docs are seen
+        lists = [
+            _ImpactList(
+                self.repo.conn.execute(
+                    "SELECT impact, doc_id FROM impacts WHERE term_id=? ORDER BY impact DESC",
+                    (tid,),
+                )
+            )
+            for tid in term_ids
+        ]
+        heap = [(-lst.head, i) for i, lst in enumerate(lists) if lst.head is not None]
+        heapq.heapify(heap)
+        # the most any doc can still gain: one head impact per unfinished list
+        remaining = sum(-h for h, _ in heap)
+        acc: dict[int, int] = {}
+        since_check = 0
+        try:
+            while heap:
+                neg, i = heapq.heappop(heap)
+                lst = lists[i]
+                docs = lst.take_segment()
+                for d in docs:
+                    if d not in skip:
+                        acc[d] = acc.get(d, 0) + -neg
+                self.postings_scored += len(docs)
+                remaining += neg
+                if lst.head is not None:
+                    remaining += lst.head
+                    heapq.heappush(heap, (-lst.head, i))
+
+                since_check += len(docs)
+                # amortized: the check is O(#accumulators)
+                counted = len(acc) >= max(k or 0, min_count)
+                if k is not None and heap and counted and since_check * 8 >= len(acc):
+                    since_check = 0
+                    best = heapq.nlargest(k + 1, acc.values())
+                    outside = best[k] if len(best) > k else 0
+                    if best[k - 1] > outside + remaining + slack:
+                        self.exhaustive = False
+                        break
+        finally:
+            for lst in lists:
+                lst.close()
+        return acc
+
+
+def _ndcg(exact: list[ScoredDoc], approx: list[ScoredDoc]) -> float:
+    gains = {s.doc_id: s.score for s in exact}
+    ideal = sum(s.score / math.log2(i + 2) for i, s in enumerate(exact))
+    dcg = sum(gains.get(s.doc_id, 0.0) / math.log2(i + 2) for i, s in enumerate(approx))
+    return dcg / ideal if ideal > 0 else 1.0
+
+
+def evaluate_impacts(
+    repo: Repo, queries: list[str], k: int = 10, repeats: int = 3
+) -> dict[str, object]:
+    """Overlap@k, NDCG@k (exact BM25 scores as gains) and latency against exact BM25."""
+    exact_ranker, impact_ranker = BM25Ranker(repo), ImpactRanker(repo)
+    if impact_ranker.impact_meta() is None:
+        raise ValueError("impact index is missing or was built for another index_version")
+
+    overlaps: list[float] = []
+    ndcgs: list[float] = []
+    exact_ms: list[float] = []
+    impact_ms: list[float] = []
+    early = 0
+    scored = 0
+    for text in queries:
+        query = parse_query(text)
+        exact = approx = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            exact = exact_ranker.search(query, k)
+            exact_ms.append((time.perf_counter() - start) * 1000.0)
+            start = time.perf_counter()
+            approx = impact_ranker.search(query, k)
+            impact_ms.append((time.perf_counter() - start) * 1000.0)
+        early += 0 if impact_ranker.exhaustive else 1
+        scored += impact_ranker.postings_scored
+        if not exact:
+            continue
+        overlaps.append(len({s.doc_id for s in exact} & {s.doc_id for s in approx}) / len(exact))
+        ndcgs.append(_ndcg(exact, approx))
+
+    def latency(ms: list[float]) -> dict[str, float]:
+        if not ms:
+            return {}
+        ms = sorted(ms)
+        return {
+            "mean": round(statistics.fmean(ms), 3),
+            "p50": round(ms[len(ms) // 2], 3),
+            "p95": round(ms[int(0.95 * (len(ms) - 1))], 3),
+        }
+
+    return {
+        "queries": len(queries),
+        "k": k,
+        "overlap_at_k": round(statistics.fmean(overlaps), 4) if overlaps else None,
+        "ndcg_at_k": round(statistics.fmean(ndcgs), 4) if ndcgs else None,
+        "early_terminated": early,
+        "impact_postings_scored": scored,
+        "latency_ms": {"exact": latency(exact_ms), "impact": latency(impact_ms)},
+    }
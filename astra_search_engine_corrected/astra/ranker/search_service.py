@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import base64
+import json
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 
+from astra.common.config import settings
 from astra.common.tokenizer import Query
 from astra.ranker.bm25 import BM25Ranker, ScoredDoc
-from astra.storage.repo import Repo
+from astra.ranker.impact import ImpactRanker
+from astra.ranker.spelling import Correction, merge_candidates, spelling_candidates
+from astra.storage.repo import Document, Repo
 
 
 @dataclass(frozen=True)
@@ -16,35 +23,125 @@ class SearchHit:
     score: float
 
 
-class SearchService:
-    def __init__(self, repo: Repo):
-        self.repo = repo
-        self.ranker = BM25Ranker(repo)
+@dataclass(frozen=True)
+class SearchPage:
+    hits: list[SearchHit]
+    total: int
+    # "eq": `total` is exact; "gte": counting stopped early, `total` is a lower bound
+    total_relation: str
+    next_cursor: str | None
+
+
+@dataclass(frozen=True)
+class BatchQuery:
+    query: Query
+    k: int = 10
+    page: int = 1
+    page_size: int = 10
+    search_after: str | None = None
+    track_total_hits: int | None = None
+
+
+@dataclass(frozen=True)
+class BatchOutcome:
+    page: SearchPage | None
+    error: Exception | None
+    took_ms: float
+
+
+@dataclass
+class BatchResult:
+    """What a batch read from storage; each term's postings and each document at most once."""
+
+    queries: int = 0
+    terms: int = 0
+    posting_lists: int = 0
+    documents: int = 0
+    took_ms: float = 0.0
+    outcomes: list[BatchOutcome] = field(default_factory=list)
+
+
+class StaleCursorError(ValueError):
+    """The cursor was issued for a different index_version."""
+
+
+def encode_cursor(score: float, doc_id: int, index_version: int) -> str:
+    raw = json.dumps({"s": score, "d": doc_id, "v": index_version}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int, int]:
+    """Returns (score, doc_id, index_version); raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return float(data["s"]), int(data["d"]), int(data["v"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("invalid search_after cursor") from e
+
+
+class BaseSearchService(ABC):
+    """Paging, phrase filtering, batching and snippets over a ranking backend."""
 
     def search(self, query: Query, k: int, page: int, page_size: int) -> tuple[list[SearchHit], int]:
-        # Retrieve more than we need so phrase filtering doesn't underflow
-        pre_k = max(k, (page * page_size) + page_size) * 5
-        scored = self.ranker.search(query, k=pre_k)
+        result = self.search_page(query, k=k, page=page, page_size=page_size)
+        return result.hits, result.total
 
-        doc_ids = [s.doc_id for s in scored]
-        docs = {d.doc_id: d for d in self.repo.fetch_documents_by_ids(doc_ids)}
+    def search_page(
+        self,
+        query: Query,
+        k: int,
+        page: int,
+        page_size: int,
+        search_after: str | None = None,
+        track_total_hits: int | None = None,
+    ) -> SearchPage:
+        """One page of results, addressed by `page` or by an opaque `search_after` cursor."""
+        return self._search_page(
+            query, k, page, page_size, search_after, track_total_hits, doc_memo=None
+        )
 
-        filtered: list[ScoredDoc] = []
-        for s in scored:
-            d = docs.get(s.doc_id)
-            if not d:
-                continue
-            if self._phrases_match(query, d.title, d.body):
-                filtered.append(s)
+    def _search_page(
+        self,
+        query: Query,
+        k: int,
+        page: int,
+        page_size: int,
+        search_after: str | None,
+        track_total_hits: int | None,
+        doc_memo: dict[int, Document] | None,
+    ) -> SearchPage:
+        track = settings.track_total_hits if track_total_hits is None else track_total_hits
+        index_version = self._index_version()
 
-        total = len(filtered)
+        after: tuple[float, int] | None = None
+        if search_after:
+            score, doc_id, version = decode_cursor(search_after)
+            if version != index_version:
+                raise StaleCursorError("index changed since the cursor was issued")
+            after = (score, doc_id)
+            skip, window = 0, page_size * 5
+        else:
+            skip = max(0, (page - 1) * page_size)
+            # Retrieve more than we need so phrase filtering doesn't underflow
+            window = max(k, (page * page_size) + page_size) * 5
 
-        start = max(0, (page - 1) * page_size)
-        end = start + page_size
-        page_scored = filtered[start:end]
+        need = skip + page_size
+        filtered, docs, matched, exhausted = self._collect(
+            query, need, window, after, doc_memo, track
+        )
+
+        if query.phrases:
+            # phrase matches are only known for the candidates checked so far
+            total = len(filtered)
+            exact = exhausted and after is None
+        else:
+            total, exact = matched, self._count_exact()
+        if total > track:
+            total, exact = track, False
 
         hits: list[SearchHit] = []
-        for s in page_scored:
+        for s in filtered[skip : skip + page_size]:
             d = docs[s.doc_id]
             hits.append(
                 SearchHit(
@@ -55,7 +152,94 @@ class SearchService:
                     score=s.score,
                 )
             )
-        return hits, total
+
+        next_cursor = None
+        if len(hits) == page_size:
+            next_cursor = encode_cursor(hits[-1].score, hits[-1].doc_id, index_version)
+        return SearchPage(
+            hits=hits,
+            total=total,
+            total_relation="eq" if exact else "gte",
+            next_cursor=next_cursor,
+        )
+
+    def search_batch(self, batch: list[BatchQuery]) -> BatchResult:
+        """Run related queries together, sharing term lookups, postings and documents."""
+        start = time.perf_counter()
+        result = BatchResult(queries=len(batch))
+        # doc_id -> Document shared across the queries of this batch
+        doc_memo: dict[int, Document] = {}
+        try:
+            queries = [b.query for b in batch]
+            result.terms, result.posting_lists = self._prefetch_postings(queries)
+            for b in batch:
+                q_start = time.perf_counter()
+                page: SearchPage | None = None
+                error: Exception | None = None
+                try:
+                    page = self._search_page(
+                        b.query,
+                        b.k,
+                        b.page,
+                        b.page_size,
+                        b.search_after,
+                        b.track_total_hits,
+                        doc_memo,
+                    )
+                except ValueError as e:
+                    error = e  # a bad or stale cursor fails only its own query
+                took_ms = round((time.perf_counter() - q_start) * 1000.0, 3)
+                result.outcomes.append(BatchOutcome(page, error, took_ms))
+            result.documents = len(doc_memo)
+        finally:
+            self._drop_prefetched()
+        result.took_ms = round((time.perf_counter() - start) * 1000.0, 3)
+        return result
+
+    def _documents(
+        self, doc_ids: list[int], memo: dict[int, Document] | None
+    ) -> dict[int, Document]:
+        if memo is None:
+            return {d.doc_id: d for d in self._fetch_documents(doc_ids)}
+        missing = [i for i in doc_ids if i not in memo]
+        if missing:
+            memo.update((d.doc_id, d) for d in self._fetch_documents(missing))
+        return {i: memo[i] for i in doc_ids if i in memo}
+
+    def _collect(
+        self,
+        query: Query,
+        need: int,
+        window: int,
+        after: tuple[float, int] | None,
+        doc_memo: dict[int, Document] | None,
+        track: int = 0,
+    ) -> tuple[list[ScoredDoc], dict[int, Document], int, bool]:
+        # returns (phrase matches in rank order, their documents, docs matching the
+        # terms, whether every candidate was checked)
+        filtered: list[ScoredDoc] = []
+        docs: dict[int, Document] = {}
+        scored, matched = self._rank(query, window, after, track)
+        complete = len(scored) < window
+        checked = 0
+        while True:
+            chunk = scored[checked : checked + window]
+            batch = self._documents([s.doc_id for s in chunk], doc_memo)
+            for s in chunk:
+                d = batch.get(s.doc_id)
+                if d and self._phrases_match(query, d.title, d.body):
+                    filtered.append(s)
+                    docs[s.doc_id] = d
+            checked += len(chunk)
+            if complete and checked >= len(scored):
+                return filtered, docs, matched, True
+            if len(filtered) >= need:
+                return filtered, docs, matched, False
+            if checked >= len(scored):
+                # the first window had too few phrase matches: rank every candidate once
+                # and keep walking, rather than re-scoring all postings per window
+                scored, matched = self._rank(query, matched + 1, after, track)
+                complete = True
 
     def _phrases_match(self, query: Query, title: str, body: str) -> bool:
         if not query.phrases:
@@ -84,3 +268,71 @@ class SearchService:
         if end < len(text):
             snippet = snippet + "…"
         return snippet
+
+    @abstractmethod
+    def spelling(self, query: Query) -> dict[str, list[Correction]]:
+        """Best-first corrections for the query words that are not indexed."""
+
+    @abstractmethod
+    def _prefetch_postings(self, queries: list[Query]) -> tuple[int, int]:
+        """Read what the ranker needs for every query of a batch; returns (terms, lists read)."""
+
+    @abstractmethod
+    def _drop_prefetched(self) -> None: ...
+
+    @abstractmethod
+    def _index_version(self) -> int: ...
+
+    @abstractmethod
+    def _rank(
+        self, query: Query, k: int, after: tuple[float, int] | None = None, track: int = 0
+    ) -> tuple[list[ScoredDoc], int]:
+        """Top-k (score desc, doc_id asc) after `after`, plus the number of matching docs.
+
+        The count must be exact up to `track`; past it the ranker may stop counting.
+        """
+
+    @abstractmethod
+    def _count_exact(self) -> bool:
+        """Whether the last `_rank` counted every matching doc."""
+
+    @abstractmethod
+    def _fetch_documents(self, doc_ids: list[int]) -> list[Document]: ...
+
+
+class SearchService(BaseSearchService):
+    """Search over one database."""
+
+    def __init__(self, repo: Repo):
+        self.repo = repo
+        self.ranker = ImpactRanker(repo) if settings.impact_scoring else BM25Ranker(repo)
+
+    def spelling(self, query: Query) -> dict[str, list[Correction]]:
+        words = query.terms + query.excluded
+        return merge_candidates([spelling_candidates(self.repo, words)]) if words else {}
+
+    def _prefetch_postings(self, queries: list[Query]) -> tuple[int, int]:
+        # every posting list the ranker will read, in one pass
+        term_ids: set[int] = set()
+        for q in queries:
+            term_ids.update(self.ranker.posting_term_ids(q))
+        self.ranker.postings_memo = {}
+        self.ranker._postings(sorted(term_ids))
+        return len(term_ids), len(self.ranker.postings_memo)
+
+    def _drop_prefetched(self) -> None:
+        self.ranker.postings_memo = None
+
+    def _index_version(self) -> int:
+        return int(self.repo.get_stats()["index_version"])
+
+    def _rank(
+        self, query: Query, k: int, after: tuple[float, int] | None = None, track: int = 0
+    ) -> tuple[list[ScoredDoc], int]:
+        return self.ranker.search_with_count(query, k=k, after=after, track_total_hits=track)
+
+    def _count_exact(self) -> bool:
+        return self.ranker.exhaustive
+
+    def _fetch_documents(self, doc_ids: list[int]) -> list[Document]:
+        return self.repo.fetch_documents_by_ids(doc_ids)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import heapq
+import os
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import replace
+
+from astra.common.config import settings
+from astra.common.tokenizer import Query
+from astra.ranker.bm25 import BM25Ranker, CollectionStats, ScoredDoc
+from astra.ranker.search_service import BaseSearchService
+from astra.ranker.spelling import Correction, merge_candidates, spelling_candidates
+from astra.storage.db import connect
+from astra.storage.repo import Document, Repo
+from astra.storage.shards import from_global_doc_id, to_global_doc_id
+
+# per-process shard repos, reused across tasks in a pool worker
+_SHARD_REPOS: dict[str, Repo] = {}
+
+
+def _shard_repo(path: str) -> Repo:
+    repo = _SHARD_REPOS.get(path)
+    if repo is None:
+        repo = Repo(connect(path))
+        _SHARD_REPOS[path] = repo
+    return repo
+
+
+def _shard_stats(path: str, terms: list[str]) -> CollectionStats:
+    return BM25Ranker(_shard_repo(path)).collection_stats(terms)
+
+
+def _shard_expand(path: str, prefixes: list[str], limit: int) -> list[dict[str, int]]:
+    ranker = BM25Ranker(_shard_repo(path))
+    return [ranker.prefix_dfs(p, limit) for p in prefixes]
+
+
+def _shard_search(
+    path: str,
+    query: Query,
+    k: int,
+    stats: CollectionStats,
+    after: tuple[float, int] | None,
+) -> tuple[list[ScoredDoc], int]:
+    return BM25Ranker(_shard_repo(path)).search_with_count(query, k=k, stats=stats, after=after)
+
+
+def _shard_spelling(path: str, words: list[str]) -> dict[str, list[Correction]]:
+    return spelling_candidates(_shard_repo(path), words)
+
+
+def _shard_version(path: str) -> int:
+    return int(_shard_repo(path).get_stats()["index_version"])
+
+
+def merge_collection_stats(parts: list[CollectionStats]) -> CollectionStats:
+    doc_count = sum(p.doc_count for p in parts)
+    total_len = sum(p.avg_doc_len * p.doc_count for p in parts)
+    df: dict[str, int] = {}
+    for p in parts:
+        for term, c in p.df.items():
+            df[term] = df.get(term, 0) + c
+    return CollectionStats(
+        doc_count=doc_count,
+        avg_doc_len=(total_len / doc_count) if doc_count else 0.0,
+        df=df,
+    )
+
+
+class ShardedSearchService(BaseSearchService):
+    """Scatter-gather search over shard databases; returned doc_ids are global."""
+
+    def __init__(self, shard_paths: list[str], executor: Executor | None = None):
+        self.shard_paths = shard_paths
+        self._owns_executor = executor is None
+        workers = min(len(shard_paths), os.cpu_count() or 1)
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers)
+        # document reads run in the request threads, each with its own shard connections
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.shard_paths)
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+
+    def _shard_repos(self) -> list[Repo]:
+        repos = getattr(self._local, "repos", None)
+        if repos is None:
+            conns = [connect(p) for p in self.shard_paths]
+            with self._conns_lock:
+                self._conns.extend(conns)
+            repos = self._local.repos = [Repo(c) for c in conns]
+        return repos
+
+    def _index_version(self) -> int:
+        # every shard's version only grows, so the sum changes whenever any shard does
+        return sum(self.executor.map(_shard_version, self.shard_paths))
+
+    def _rank(
+        self, query: Query, k: int, after: tuple[float, int] | None = None, track: int = 0
+    ) -> tuple[list[ScoredDoc], int]:
+        # shards score exhaustively, so their summed counts are exact regardless of `track`
+        if query.prefixes:
+            # expand wildcards once, to the terms with the highest df summed over
+            # shards, so every shard scores the same term set
+            n, limit = self.num_shards, settings.max_wildcard_expansions
+            prefixes = [query.prefixes] * n
+            parts = list(self.executor.map(_shard_expand, self.shard_paths, prefixes, [limit] * n))
+            extra: list[str] = []
+            for i in range(len(query.prefixes)):
+                df: Counter[str] = Counter()
+                for part in parts:
+                    df.update(part[i])
+                top = heapq.nsmallest(limit, df.items(), key=lambda kv: (-kv[1], kv[0]))
+                extra.extend(t for t, _ in top)
+            query = replace(query, terms=list(dict.fromkeys(query.terms + extra)), prefixes=[])
+
+        # score every shard with the global N/avgdl/df, then merge the per-shard top-k
+        terms = sorted(set(query.terms))
+        parts = list(self.executor.map(_shard_stats, self.shard_paths, [terms] * self.num_shards))
+        stats = merge_collection_stats(parts)
+
+        futures = []
+        for shard, path in enumerate(self.shard_paths):
+            shard_after = None
+            if after is not None:
+                # global id g = local * n + shard: g > after <=> local > (after - shard) // n
+                shard_after = (after[0], (after[1] - shard) // self.num_shards)
+            futures.append(self.executor.submit(_shard_search, path, query, k, stats, shard_after))
+
+        merged: list[ScoredDoc] = []
+        matched = 0
+        for shard, fut in enumerate(futures):
+            scored, shard_matched = fut.result()
+            matched += shard_matched
+            for s in scored:
+                doc_id = to_global_doc_id(shard, s.doc_id, self.num_shards)
+                merged.append(ScoredDoc(doc_id=doc_id, score=s.score))
+        return heapq.nsmallest(k, merged, key=lambda s: (-s.score, s.doc_id)), matched
+
+    def spelling(self, query: Query) -> dict[str, list[Correction]]:
+        # a word is misspelled only if no shard indexes it; df is summed over shards
+        words = query.terms + query.excluded
+        if not words:
+            return {}
+        per_shard = self.executor.map(_shard_spelling, self.shard_paths, [words] * self.num_shards)
+        return merge_candidates(list(per_shard))
+
+    def _prefetch_postings(self, queries: list[Query]) -> tuple[int, int]:
+        # postings are read inside the shard processes per query; only documents are shared
+        return len({t for q in queries for t in q.terms + q.excluded}), 0
+
+    def _drop_prefetched(self) -> None:
+        pass
+
+    def _count_exact(self) -> bool:
+        return True  # shards score with global stats, which always takes the exact path
+
+    def _fetch_documents(self, doc_ids: list[int]) -> list[Document]:
+        by_shard: dict[int, list[int]] = {}
+        for gid in doc_ids:
+            shard, local_id = from_global_doc_id(gid, self.num_shards)
+            by_shard.setdefault(shard, []).append(local_id)
+
+        repos = self._shard_repos()
+        docs: dict[int, Document] = {}
+        for shard, local_ids in by_shard.items():
+            for d in repos[shard].fetch_documents_by_ids(local_ids):
+                gid = to_global_doc_id(shard, d.doc_id, self.num_shards)
+                docs[gid] = replace(d, doc_id=gid)
+        return [docs[i] for i in doc_ids if i in docs]
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+
+from astra.common.config import settings
+from astra.common.tokenizer import Query
+from astra.indexer.spelling import deletes
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage.repo import Repo
+from astra.storage.term_dict import load_term_dictionary
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+@dataclass(frozen=True)
+class Correction:
+    term: str
+    distance: int
+    df: int
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps cost 1); `limit + 1` past `limit`."""
+    # only the diagonal band |i - j| <= limit of the DP table is computed
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    over = limit + 1
+    n = len(b)
+    prev2: list[int] = []
+    prev = [j if j <= limit else over for j in range(n + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [over] * (n + 1)
+        if i <= limit:
+            cur[0] = i
+        lo, hi = max(1, i - limit), min(n, i + limit)
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1]:
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d if d <= limit else over
+        if min(cur[lo - 1 : hi + 1]) > limit:
+            return over
+        prev2, prev = prev, cur
+    return prev[n]
+
+
+def word_max_distance(word: str, max_distance: int) -> int:
+    # two edits on a four-letter word reach half the vocabulary
+    return min(max_distance, 1 if len(word) <= 4 else 2)
+
+
+def spelling_candidates(
+    repo: Repo,
+    words: list[str],
+    max_distance: int | None = None,
+) -> dict[str, list[Correction]]:
+    """Indexed terms within edit distance of each word; an indexed word only maps to itself."""
+    words = list(dict.fromkeys(words))
+    known = load_term_dictionary(repo).lookup_many(words)
+    out = {w: [Correction(term=w, distance=0, df=0)] for w in known}
+    unknown = [w for w in words if w not in known]
+    meta = repo.conn.execute("SELECT max_distance, prefix_length FROM spell_meta").fetchone()
+    if not unknown or meta is None:
+        return out
+    if max_distance is None:
+        max_distance = settings.spell_max_distance
+    max_distance = min(int(meta["max_distance"]), max_distance)
+    prefix_length = int(meta["prefix_length"])
+
+    found: dict[str, dict[str, int]] = {}  # word -> term -> distance
+    for word in unknown:
+        limit = word_max_distance(word, max_distance)
+        variants = sorted(deletes(word, limit, prefix_length))
+        q = ",".join("?" for _ in variants)
+        rows = repo.conn.execute(
+            f"""
+            SELECT DISTINCT t.term
+            FROM spell_deletes s JOIN terms t ON t.term_id = s.term_id
+            WHERE s.variant IN ({q})
+            """,  # noqa: S608
+            variants,
+        )
+        near: dict[str, int] = {}
+        for r in rows:
+            d = edit_distance(word, r["term"], limit)
+            if d <= limit:
+                near[r["term"]] = d
+        found[word] = near
+
+    df = BM25Ranker(repo).collection_stats(sorted({t for near in found.values() for t in near})).df
+    for word, near in found.items():
+        out[word] = [Correction(term=t, distance=d, df=df[t]) for t, d in near.items() if df.get(t)]
+    return out
+
+
+def merge_candidates(
+    parts: list[dict[str, list[Correction]]],
+    limit: int | None = None,
+) -> dict[str, list[Correction]]:
+    """Corrections for the words no part knows exactly, df summed across parts, best first."""
+    limit = limit or settings.spell_max_suggestions
+    merged: dict[str, dict[str, Correction]] = {}
+    for part in parts:
+        for word, corrections in part.items():
+            by_term = merged.setdefault(word, {})
+            for c in corrections:
+                prev = by_term.get(c.term)
+                by_term[c.term] = replace(c, df=c.df + prev.df) if prev else c
+    out: dict[str, list[Correction]] = {}
+    for word, by_term in merged.items():
+        if word in by_term:
+            continue  # indexed as typed
+        ranked = sorted(by_term.values(), key=lambda c: (c.distance, -c.df, c.term))
+        if ranked:
+            out[word] = ranked[:limit]
+    return out
+
+
+def expand_query(
+    query: Query,
+    corrections: dict[str, list[Correction]],
+    max_expansions: int | None = None,
+) -> Query:
+    """Replace each misspelled word by its best correction; the next best join as optional terms."""
+    # required and excluded words only take the best one, keeping the boolean structure
+    if not corrections:
+        return query
+    max_expansions = max(1, max_expansions or settings.fuzzy_max_expansions)
+
+    def best(words: list[str]) -> list[str]:
+        return list(dict.fromkeys(corrections[w][0].term if w in corrections else w for w in words))
+
+    terms: list[str] = []
+    for w in query.terms:
+        alternatives = [c.term for c in corrections.get(w, [])[:max_expansions]] or [w]
+        terms.extend(t for t in alternatives if t not in terms)
+    return replace(query, terms=terms, required=best(query.required), excluded=best(query.excluded))
+
+
+def did_you_mean(q: str, corrections: dict[str, list[Correction]]) -> str | None:
+    """`q` with every misspelled word replaced by its best correction, if any was."""
+    if not corrections:
+        return None
+
+    def fix(m: re.Match[str]) -> str:
+        found = corrections.get(m.group(0).lower())
+        return found[0].term if found else m.group(0)
+
+    return _WORD_RE.sub(fix, q)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+
+from astra.common.config import settings
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.segments import SegmentSet
+
+log = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+_KINDS = ("term", "title", "query")
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    text: str
+    score: float
+    kind: str
+
+
+def normalize_completion(text: str, max_len: int = 80) -> str:
+    return _WS_RE.sub(" ", text.lower()).strip()[:max_len]
+
+
+class CompletionIndex:
+    """Prefix -> precomputed top-k completions."""
+
+    def __init__(self, candidates: dict[str, tuple[float, str]], k: int, max_prefix_len: int):
+        self.k = k
+        self.max_prefix_len = max_prefix_len
+        ranked = sorted(candidates.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        self._texts = [text for text, _ in ranked]
+        self._scores = array("d", (score for _, (score, _) in ranked))
+        self._kinds = bytes(_KINDS.index(kind) for _, (_, kind) in ranked)
+
+        # visiting candidates best-first leaves every prefix node's top-k sorted; prefixes
+        # with fewer than k completions are answered by a range scan of the sorted texts
+        nodes: dict[str, list[int]] = {}
+        for idx, text in enumerate(self._texts):
+            for n in range(1, min(len(text), max_prefix_len) + 1):
+                top = nodes.setdefault(text[:n], [])
+                if len(top) < k:
+                    top.append(idx)
+        self._nodes = {p: array("i", top) for p, top in nodes.items() if len(top) >= k}
+        del nodes
+
+        self._by_text = sorted(range(len(self._texts)), key=self._texts.__getitem__)
+        self._sorted_texts = [self._texts[i] for i in self._by_text]
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _suggestion(self, idx: int) -> Suggestion:
+        kind = _KINDS[self._kinds[idx]]
+        return Suggestion(text=self._texts[idx], score=self._scores[idx], kind=kind)
+
+    def complete(self, prefix: str, k: int | None = None) -> list[Suggestion]:
+        k = min(k or self.k, self.k)
+        prefix = normalize_completion(prefix)
+        if not prefix:
+            return []
+        top = self._nodes.get(prefix)
+        if top is not None:
+            return [self._suggestion(i) for i in top[:k]]
+
+        lo = bisect_left(self._sorted_texts, prefix)
+        hits: list[int] = []
+        for pos in range(lo, len(self._sorted_texts)):
+            if not self._sorted_texts[pos].startswith(prefix):
+                break
+            hits.append(self._by_text[pos])
+        return [self._suggestion(i) for i in sorted(hits)[:k]]  # idx order == score order
+
+
+def term_dfs(repo: Repo) -> dict[str, int]:
+    """Document frequency of every indexed term, in either index layout."""
+    if settings.index_layout == "segments":
+        rows = repo.conn.execute("SELECT term_id, term FROM terms")
+        names = {int(r["term_id"]): r["term"] for r in rows}
+        df: dict[str, int] = {}
+        with SegmentSet(repo) as segs:
+            for seg in segs.segments:
+                for term_id, _doc_id, _tt, _tb in segs.iter_postings(seg):
+                    term = names.get(term_id)
+                    if term is not None:
+                        df[term] = df.get(term, 0) + 1
+        return df
+    rows = repo.conn.execute(
+        """
+        SELECT t.term, COUNT(*) AS df
+        FROM postings p JOIN terms t ON t.term_id = p.term_id
+        GROUP BY p.term_id
+        """
+    )
+    return {r["term"]: int(r["df"]) for r in rows}
+
+
+def build_candidates(
+    repos: list[Repo], query_counts: Counter[str]
+) -> dict[str, tuple[float, str]]:
+    # terms score their df, titles the indexed documents carrying them, queries
+    # `suggest_query_weight` per time served
+    candidates: dict[str, tuple[float, str]] = {}
+
+    def add(text: str, score: float, kind: str) -> None:
+        if not text:
+            return
+        prev = candidates.get(text)
+        candidates[text] = (score + prev[0], prev[1]) if prev else (score, kind)
+
+    for repo in repos:
+        for term, df in term_dfs(repo).items():
+            add(term, float(df), "term")
+        rows = repo.conn.execute(
+            """
+            SELECT d.title, COUNT(*) AS c
+            FROM documents d JOIN indexed_docs i ON i.doc_id = d.doc_id
+            GROUP BY d.title
+            """
+        )
+        for r in rows:
+            add(normalize_completion(r["title"]), float(r["c"]), "title")
+
+    for q, c in query_counts.items():
+        add(q, settings.suggest_query_weight * c, "query")
+
+    if len(candidates) > settings.suggest_max_candidates:
+        ranked = sorted(candidates.items(), key=lambda kv: -kv[1][0])
+        candidates = dict(ranked[: settings.suggest_max_candidates])
+    return candidates
+
+
+def _index_version(path: str) -> int:
+    # a plain read: Repo() would run the schema script on every check
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT MAX(index_version) FROM stats").fetchone()
+    except sqlite3.OperationalError:
+        return 0  # not created yet
+    finally:
+        conn.close()
+    return int(row[0] or 0)
+
+
+class Suggester:
+    """Serves completions from a `CompletionIndex` kept in sync with the index.
+
+    Built at startup; on an index_version change (checked at most once per
+    `suggest_refresh_seconds`) it is rebuilt in the background while the old
+    one keeps serving.
+    """
+
+    def __init__(self, db_paths: list[str]):
+        self.db_paths = db_paths
+        self.query_counts: Counter[str] = Counter()
+        self._index: CompletionIndex | None = None
+        self._versions: tuple[int, ...] | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def record_query(self, q: str) -> None:
+        text = normalize_completion(q)
+        if not text:
+            return
+        with self._lock:
+            self.query_counts[text] += 1
+            if len(self.query_counts) > 2 * settings.suggest_max_queries:
+                # keep the most frequent; the long tail of one-off queries goes
+                top = self.query_counts.most_common(settings.suggest_max_queries)
+                self.query_counts = Counter(dict(top))
+
+    def _current_versions(self) -> tuple[int, ...]:
+        return tuple(_index_version(p) for p in self.db_paths)
+
+    def rebuild(self, versions: tuple[int, ...] | None = None) -> CompletionIndex:
+        start = time.perf_counter()
+        conns = [connect(p) for p in self.db_paths]
+        try:
+            repos = [Repo(c) for c in conns]
+            versions = versions or tuple(int(r.get_stats()["index_version"]) for r in repos)
+            with self._lock:
+                counts = Counter(self.query_counts)
+            candidates = build_candidates(repos, counts)
+        finally:
+            for c in conns:
+                c.close()
+        index = CompletionIndex(
+            candidates, k=settings.suggest_top_k, max_prefix_len=settings.suggest_max_prefix_len
+        )
+        with self._lock:
+            self._index, self._versions = index, versions
+        log.info(
+            "suggest_rebuilt",
+            extra={"latency_ms": round((time.perf_counter() - start) * 1000.0, 2)},
+        )
+        return index
+
+    def _rebuild_in_background(self, versions: tuple[int, ...]) -> None:
+        try:
+            self.rebuild(versions)
+        except Exception:
+            log.exception("suggest_rebuild_failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def index(self) -> CompletionIndex | None:
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < settings.suggest_refresh_seconds:
+            return self._index
+        self._checked_at = now
+        versions = self._current_versions()
+        if versions != self._versions:
+            with self._lock:
+                start = not self._rebuilding
+                self._rebuilding = True
+            if start:
+                threading.Thread(
+                    target=self._rebuild_in_background, args=(versions,), daemon=True
+                ).start()
+        return self._index
+
+    def suggest(self, prefix: str, k: int) -> list[Suggestion]:
+        index = self.index()
+        return index.complete(prefix, k) if index is not None else []
@@ -43,6 +43,7 @@ CREATE TABLE IF NOT EXISTS stats (
   index_version INTEGER NOT NULL,
   created_at TEXT NOT NULL
 );
+CREATE INDEX IF NOT EXISTS idx_stats_version ON stats(index_version);
 
 -- auxiliary table for safe incremental indexing
 CREATE TABLE IF NOT EXISTS indexed_docs (
@@ -52,10 +53,99 @@ CREATE TABLE IF NOT EXISTS indexed_docs (
   FOREIGN KEY(doc_id) REFERENCES documents(doc_id) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_postings_term ON postings(term_id);
-CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+-- segment layout: manifest of immutable segment files (see storage/segments.py)
+CREATE TABLE IF NOT EXISTS segments (
+  segment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  path TEXT NOT NULL,
+  seq INTEGER NOT NULL,
+  level INTEGER NOT NULL,
+  doc_count INTEGER NOT NULL,
+  posting_count INTEGER NOT NULL,
+  size_bytes INTEGER NOT NULL,
+  live INTEGER NOT NULL DEFAULT 1,
+  created_at TEXT NOT NULL,
+  retired_at TEXT
+);
+
+-- postings of doc_id in segments with seq < tombstones.seq are dead
+CREATE TABLE IF NOT EXISTS tombstones (
+  doc_id INTEGER PRIMARY KEY,
+  seq INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS segment_counters (
+  name TEXT PRIMARY KEY,
+  value INTEGER NOT NULL
+);
+
+-- quantized BM25 term weights in impact order (see indexer/impacts.py)
+CREATE TABLE IF NOT EXISTS impacts (
+  term_id INTEGER NOT NULL,
+  impact INTEGER NOT NULL,
+  doc_id INTEGER NOT NULL,
+  PRIMARY KEY(term_id, impact DESC, doc_id)
+) WITHOUT ROWID;
+
+-- one row: the index_version the impacts were built for and the quantization step
+CREATE TABLE IF NOT EXISTS impact_meta (
+  index_version INTEGER NOT NULL,
+  bits INTEGER NOT NULL,
+  scale REAL NOT NULL,
+  posting_count INTEGER NOT NULL,
+  built_at TEXT NOT NULL
+);
+
+-- link graph: target URLs are interned once; a page's outlinks are one blob of
+-- sorted uint32 url_ids (see storage/links.py)
+CREATE TABLE IF NOT EXISTS link_urls (
+  url_id INTEGER PRIMARY KEY,
+  url TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS outlinks (
+  doc_id INTEGER PRIMARY KEY,
+  url_ids BLOB NOT NULL,
+  FOREIGN KEY(doc_id) REFERENCES documents(doc_id) ON DELETE CASCADE
+);
+
+-- static per-document scores from `astra rank-prior` (prior is normalized to [0, 1])
+CREATE TABLE IF NOT EXISTS doc_priors (
+  doc_id INTEGER PRIMARY KEY,
+  pagerank REAL NOT NULL,
+  prior REAL NOT NULL
+);
+
+-- one row: bumped by every `astra rank-prior` run, so priors change without a new index_version
+CREATE TABLE IF NOT EXISTS prior_meta (
+  version INTEGER NOT NULL,
+  built_at TEXT NOT NULL
+);
+
+-- symmetric-delete spelling index: every term's deletion variants (see indexer/spelling.py)
+CREATE TABLE IF NOT EXISTS spell_deletes (
+  variant TEXT NOT NULL,
+  term_id INTEGER NOT NULL,
+  PRIMARY KEY(variant, term_id)
+) WITHOUT ROWID;
+
+-- one row: the highest term_id covered by spell_deletes and the parameters it was built with
+CREATE TABLE IF NOT EXISTS spell_meta (
+  max_term_id INTEGER NOT NULL,
+  max_distance INTEGER NOT NULL,
+  prefix_length INTEGER NOT NULL,
+  built_at TEXT NOT NULL
+);
+
 """
 
+# secondary indexes, dropped during bulk loads and rebuilt afterwards
+SECONDARY_INDEXES = {
+    "idx_postings_term": "CREATE INDEX IF NOT EXISTS idx_postings_term ON postings(term_id)",
+    "idx_postings_doc": "CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id)",
+}
+
+SCHEMA_SQL += "".join(f"{sql};\n" for sql in SECONDARY_INDEXES.values())
+
 
 def connect(db_path: str | None = None) -> sqlite3.Connection:
     path = Path(db_path or settings.db_path)
@@ -66,6 +156,12 @@ def connect(db_path: str | None = None) -> sqlite3.Connection:
 
 
 def init_db(conn: sqlite3.Connection) -> None:
+    if conn.execute("PRAGMA query_only").fetchone()[0]:
+        return  # read-only views (index images) carry the schema of the database they copy
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        # setting it needs the write lock and only works before the first table; existing
+        # databases are converted by `astra maintain --enable-incremental-vacuum`
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
     conn.executescript(SCHEMA_SQL)
     # ensure there is at least one stats row
     cur = conn.execute("SELECT COUNT(*) AS c FROM stats")
@@ -78,11 +174,37 @@ def init_db(conn: sqlite3.Connection) -> None:
 
 
 @contextmanager
-def tx(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+def bulk_load(conn: sqlite3.Connection, cache_mb: int = 256) -> Iterator[sqlite3.Connection]:
+    """Relax durability and defer secondary indexes for the duration of a bulk load."""
+    # a crash mid-load can lose the load but not corrupt the database; missing
+    # indexes are recreated by the next init_db
+    prev_sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+    prev_cache = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(f"PRAGMA cache_size=-{int(cache_mb) * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    for name in SECONDARY_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    try:
+        yield conn
+    finally:
+        for sql in SECONDARY_INDEXES.values():
+            conn.execute(sql)
+        conn.execute(f"PRAGMA cache_size={int(prev_cache)}")
+        conn.execute(f"PRAGMA synchronous={int(prev_sync)}")
+        conn.execute("PRAGMA optimize")
+
+
+@contextmanager
+def tx(conn: sqlite3.Connection, immediate: bool = False) -> Iterator[sqlite3.Connection]:
     """Transaction helper that supports nesting.
 
     - If not already in a transaction: BEGIN / COMMIT / ROLLBACK
     - If already in a transaction: use a SAVEPOINT so nesting works safely
+
+    Writers pass `immediate=True` to take the write lock up front: a deferred
+    transaction that reads and then writes fails with "database is locked"
+    instead of waiting when another writer committed meanwhile.
     """
 
     # Nested transaction -> use SAVEPOINT
@@ -100,7 +222,7 @@ def tx(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
         return
 
     # Top-level transaction
-    conn.execute("BEGIN")
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
     try:
         yield conn
     except Exception:
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from astra.common.config import settings
+
+from .db import connect
+from .links import drop_cached_priors, prior_version
+from .posting_cache import drop_cached_postings
+from .repo import Repo
+from .term_dict import drop_cached_dictionary
+
+log = logging.getLogger(__name__)
+
+_IMAGE_PREFIX = "image-v"
+# "start-end perms offset dev inode [path]" opens each mapping in /proc/<pid>/smaps
+_MAPPING_HEADER = re.compile(r"^[0-9a-f]+-[0-9a-f]+ ")
+
+
+def images_dir(db_path: str | None = None) -> Path:
+    p = Path(db_path or settings.db_path)
+    return p.with_name(f"{p.stem}.images")
+
+
+def _image_key(path: Path) -> tuple[int, int]:
+    # image-v<index_version>-p<prior_version>.db
+    index_version, _, prior = path.stem[len(_IMAGE_PREFIX) :].partition("-p")
+    return int(index_version), int(prior or 0)
+
+
+def live_version(db_path: str) -> tuple[int, int]:
+    """(index_version, prior_version) of the live database."""
+    # a plain read: Repo() would run the schema script on every poll
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT (SELECT MAX(index_version) FROM stats), (SELECT MAX(version) FROM prior_meta)"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0, 0  # not created yet
+    finally:
+        conn.close()
+    return int(row[0] or 0), int(row[1] or 0)
+
+
+def build_image(db_path: str | None = None, keep: int = 2) -> Path:
+    """Snapshot the database into a compact read-only image for its current versions."""
+    # safe from every worker at once: one writes under the file lock, the rest reuse it.
+    # Unlinked old images stay readable for workers that still map them
+    db_path = db_path or settings.db_path
+    directory = images_dir(db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        conn = connect(db_path)
+        try:
+            version = int(Repo(conn).get_stats()["index_version"])
+            path = directory / f"{_IMAGE_PREFIX}{version}-p{prior_version(conn)}.db"
+            if not path.exists():
+                start = time.perf_counter()
+                tmp = path.with_suffix(".tmp")
+                tmp.unlink(missing_ok=True)
+                # one read snapshot of the WAL database, written defragmented
+                conn.execute("VACUUM INTO ?", (str(tmp),))
+                os.replace(tmp, path)
+                elapsed_ms = round((time.perf_counter() - start) * 1000.0, 2)
+                log.info("image_built", extra={"db_path": str(path), "latency_ms": elapsed_ms})
+        finally:
+            conn.close()
+        images = sorted(directory.glob(f"{_IMAGE_PREFIX}*.db"), key=_image_key)
+        for old in images[:-keep]:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def open_image(path: Path) -> sqlite3.Connection:
+    """Read-only connection that serves pages straight from a shared memory map."""
+    # immutable: no locks, no WAL, no change detection
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only=1")
+    conn.execute(f"PRAGMA mmap_size={path.stat().st_size}")
+    return conn
+
+
+class IndexImage:
+    """The image a worker currently serves from, with one connection per thread."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def index_version(self) -> int:
+        return _image_key(self.path)[0]
+
+    def repo(self) -> Repo:
+        local = self._local
+        if getattr(local, "path", None) != self.path:
+            if getattr(local, "repo", None) is not None:
+                local.repo.conn.close()
+            local.repo = Repo(open_image(self.path))
+            local.path = self.path
+        return local.repo
+
+    def switch(self, path: Path) -> None:
+        # threads reopen on their next request; in-flight ones finish on the old image
+        old, self.path = self.path, path
+        # version-keyed caches are keyed by database file; the old image's won't be hit again
+        drop_cached_dictionary(str(old.resolve()))
+        drop_cached_priors(str(old.resolve()))
+        drop_cached_postings(str(old.resolve()))
+
+
+def _kb_fields(path: str) -> dict[str, int]:
+    out: dict[str, int] = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return out
+
+
+def process_memory(image: Path | None = None) -> dict[str, int]:
+    """Resident, proportional, shared and private bytes of this process (Linux /proc)."""
+    try:
+        rollup = _kb_fields("/proc/self/smaps_rollup")
+    except OSError:
+        return {}
+    report = {
+        "rss_bytes": rollup.get("Rss", 0),
+        "pss_bytes": rollup.get("Pss", 0),
+        "shared_bytes": rollup.get("Shared_Clean", 0) + rollup.get("Shared_Dirty", 0),
+        "private_bytes": rollup.get("Private_Clean", 0) + rollup.get("Private_Dirty", 0),
+    }
+    if image is not None:
+        resident = 0
+        mapped = False
+        with open("/proc/self/smaps") as f:
+            for line in f:
+                if _MAPPING_HEADER.match(line):
+                    mapped = line.rstrip().endswith(str(image))
+                elif mapped and line.startswith("Rss:"):
+                    resident += int(line.split()[1]) * 1024
+        report["image_rss_bytes"] = resident
+    return report
+
+
+def read_worker_reports(db_path: str | None = None) -> list[dict[str, object]]:
+    """Memory reports of every live worker serving images of `db_path`."""
+    reports = []
+    for p in sorted((images_dir(db_path) / "workers").glob("*.json")):
+        try:
+            os.kill(int(p.stem), 0)
+            reports.append(json.loads(p.read_text(encoding="utf-8")))
+        except (ProcessLookupError, ValueError):
+            p.unlink(missing_ok=True)  # worker exited
+        except (OSError, json.JSONDecodeError):
+            continue
+    return reports
+
+
+class ImageWatcher(threading.Thread):
+    """Per-worker thread: follows the versions of the live database and reports memory."""
+
+    def __init__(
+        self, image: IndexImage, db_path: str | None = None, poll_seconds: float | None = None
+    ):
+        super().__init__(name="astra-image-watcher", daemon=True)
+        self.image = image
+        self.db_path = db_path or settings.db_path
+        self.poll_seconds = poll_seconds or settings.image_poll_seconds
+        self._stop_event = threading.Event()
+        self._report = images_dir(self.db_path) / "workers" / f"{os.getpid()}.json"
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._report.unlink(missing_ok=True)
+
+    def check(self) -> bool:
+        """Switch to a new image if the live versions moved; returns whether it did."""
+        if live_version(self.db_path) == _image_key(self.image.path):
+            return False
+        path = build_image(self.db_path)
+        switched = path != self.image.path
+        if switched:
+            self.image.switch(path)
+            log.info("image_switched", extra={"db_path": str(path)})
+        return switched
+
+    def write_report(self) -> None:
+        self._report.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "pid": os.getpid(),
+            "index_version": self.image.index_version,
+            "image": self.image.path.name,
+            "updated_at": time.time(),
+            **process_memory(self.image.path),
+        }
+        tmp = self._report.with_suffix(".tmp")
+        tmp.write_text(json.dumps(report), encoding="utf-8")
+        os.replace(tmp, self._report)
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.check()
+                self.write_report()
+            except Exception:
+                log.exception("image_watch_failed")
+            if self._stop_event.wait(self.poll_seconds):
+                return
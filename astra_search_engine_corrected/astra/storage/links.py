@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+import threading
+from array import array
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .repo import Repo
+
+
+def encode_url_ids(url_ids: Iterable[int]) -> bytes:
+    """Sorted, de-duplicated url_ids as little-endian uint32 (4 bytes per edge)."""
+    # fixed width, not varints: PageRank decodes all outlinks with one numpy.frombuffer
+    arr = array("I", sorted(set(url_ids)))
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def decode_url_ids(blob: bytes) -> list[int]:
+    arr = array("I")
+    arr.frombytes(blob)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tolist()
+
+
+_CACHE: dict[str, tuple[int, array]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def prior_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM prior_meta").fetchone()
+    return int(row[0] or 0)
+
+
+def load_priors(repo: Repo) -> array:
+    """Process-wide dense prior per doc_id, reloaded when `astra rank-prior` rewrites them."""
+    db_file = repo.conn.execute("PRAGMA database_list").fetchone()["file"]
+    version = prior_version(repo.conn)
+    cached = _CACHE.get(db_file)
+    if cached and cached[0] == version:
+        return cached[1]
+    with _CACHE_LOCK:
+        cached = _CACHE.get(db_file)
+        if cached and cached[0] == version:
+            return cached[1]
+        priors = array("d")
+        top = repo.conn.execute("SELECT MAX(doc_id) FROM doc_priors").fetchone()[0]
+        if top is not None:
+            priors.frombytes(bytes(priors.itemsize * (int(top) + 1)))  # zero-filled doubles
+            for doc_id, prior in repo.conn.execute("SELECT doc_id, prior FROM doc_priors"):
+                priors[int(doc_id)] = float(prior)
+        _CACHE[db_file] = (version, priors)
+        return priors
+
+
+def drop_cached_priors(db_file: str) -> None:
+    with _CACHE_LOCK:
+        _CACHE.pop(db_file, None)
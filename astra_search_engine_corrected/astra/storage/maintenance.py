@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from astra.common.config import settings
+
+from .db import connect
+from .repo import Repo
+from .segments import SegmentSet, db_file, live_segments
+
+log = logging.getLogger(__name__)
+
+_AUTO_VACUUM = {0: "none", 1: "full", 2: "incremental"}
+_DF_BUCKETS = ((1, "1"), (10, "2-10"), (100, "11-100"), (1000, "101-1000"), (10_000, "1001-10000"))
+
+
+def _pragma(conn: sqlite3.Connection, name: str) -> int:
+    return int(conn.execute(f"PRAGMA {name}").fetchone()[0])
+
+
+def _ms_since(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 2)
+
+
+def checkpoint(conn: sqlite3.Connection, mode: str = "TRUNCATE") -> dict[str, int]:
+    # frames still needed by an open reader are left in place (busy=1)
+    busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return {
+        "busy": int(busy),
+        "wal_frames": int(log_frames),
+        "checkpointed_frames": int(checkpointed),
+    }
+
+
+def _object_sizes(conn: sqlite3.Connection) -> list[dict[str, object]]:
+    # fragmentation: share of b-tree pages not directly after their predecessor on
+    # disk (as in sqlite3_analyzer)
+    try:
+        sql = "SELECT name, pageno, pgsize, unused FROM dbstat ORDER BY name, path"
+        rows = conn.execute(sql).fetchall()
+    except sqlite3.OperationalError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        return []
+    out: dict[str, dict[str, int]] = {}
+    prev: dict[str, int] = {}
+    for name, pageno, pgsize, unused in rows:
+        o = out.setdefault(name, {"pages": 0, "bytes": 0, "unused": 0, "gaps": 0})
+        o["pages"] += 1
+        o["bytes"] += int(pgsize)
+        o["unused"] += int(unused)
+        if name in prev and pageno != prev[name] + 1:
+            o["gaps"] += 1
+        prev[name] = int(pageno)
+    report = [
+        {
+            "name": name,
+            "bytes": o["bytes"],
+            "pages": o["pages"],
+            "fill": round(1.0 - o["unused"] / o["bytes"], 3) if o["bytes"] else 0.0,
+            "fragmentation": round(o["gaps"] / (o["pages"] - 1), 3) if o["pages"] > 1 else 0.0,
+        }
+        for name, o in out.items()
+    ]
+    return sorted(report, key=lambda r: -r["bytes"])
+
+
+def _postings_per_term(repo: Repo) -> list[int]:
+    if live_segments(repo.conn):
+        df: dict[int, int] = {}
+        with SegmentSet(repo) as segs:
+            for seg in segs.segments:
+                for term_id, _doc_id, _tt, _tb in segs.iter_postings(seg):
+                    df[term_id] = df.get(term_id, 0) + 1
+        return sorted(df.values())
+    rows = repo.conn.execute("SELECT COUNT(*) FROM postings GROUP BY term_id")
+    return sorted(int(r[0]) for r in rows)
+
+
+def _distribution(values: list[int]) -> dict[str, object]:
+    if not values:
+        return {"terms": 0}
+    n = len(values)
+    buckets: dict[str, int] = {}
+    for v in values:
+        label = next((lbl for hi, lbl in _DF_BUCKETS if v <= hi), f">{_DF_BUCKETS[-1][0]}")
+        buckets[label] = buckets.get(label, 0) + 1
+    return {
+        "terms": n,
+        "postings": sum(values),
+        "mean": round(sum(values) / n, 3),
+        "p50": values[n // 2],
+        "p90": values[int(0.9 * (n - 1))],
+        "p99": values[int(0.99 * (n - 1))],
+        "max": values[-1],
+        "buckets": buckets,
+    }
+
+
+def storage_report(repo: Repo) -> dict[str, object]:
+    conn = repo.conn
+    path = Path(db_file(conn))
+    wal = path.with_name(path.name + "-wal")
+    page_size = _pragma(conn, "page_size")
+    page_count = _pragma(conn, "page_count")
+    freelist = _pragma(conn, "freelist_count")
+    segs = live_segments(conn)
+    return {
+        "db_path": str(path),
+        "file_bytes": path.stat().st_size if path.exists() else 0,
+        "wal_bytes": wal.stat().st_size if wal.exists() else 0,
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_pages": freelist,
+        "free_fraction": round(freelist / page_count, 3) if page_count else 0.0,
+        "auto_vacuum": _AUTO_VACUUM.get(_pragma(conn, "auto_vacuum"), "unknown"),
+        "stats_rows": int(conn.execute("SELECT COUNT(*) FROM stats").fetchone()[0]),
+        "segment_count": len(segs),
+        "segment_bytes": sum(s.size_bytes for s in segs),
+        "objects": _object_sizes(conn),
+        "postings_per_term": _distribution(_postings_per_term(repo)),
+    }
+
+
+def maintain(
+    repo: Repo,
+    analyze: bool = True,
+    vacuum_pages: int | None = None,
+    enable_incremental_vacuum: bool = False,
+    checkpoint_mode: str = "TRUNCATE",
+) -> dict[str, dict[str, object]]:
+    """One maintenance pass; returns what each step did and how long it took."""
+    # analyze=False leaves only PRAGMA optimize, cheap enough for a background schedule
+    conn = repo.conn
+    steps: dict[str, dict[str, object]] = {}
+
+    def step(name: str, sql: str) -> dict[str, object]:
+        start = time.perf_counter()
+        # executescript steps to completion; execute() would free one page per incremental_vacuum
+        conn.executescript(sql)
+        steps[name] = {"ms": _ms_since(start)}
+        return steps[name]
+
+    start = time.perf_counter()
+    removed = repo.compact_stats()
+    steps["compact_stats"] = {"rows_removed": removed, "ms": _ms_since(start)}
+    if analyze:
+        step("analyze", "ANALYZE")
+    step("optimize", "PRAGMA optimize")
+
+    if _pragma(conn, "auto_vacuum") != 2 and enable_incremental_vacuum:
+        # one-off full rewrite; afterwards free pages can be released incrementally
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        step("vacuum", "VACUUM")
+    if _pragma(conn, "auto_vacuum") == 2:
+        before = _pragma(conn, "freelist_count")
+        arg = "" if vacuum_pages is None else f"({int(vacuum_pages)})"
+        result = step("incremental_vacuum", f"PRAGMA incremental_vacuum{arg}")
+        result["pages_released"] = before - _pragma(conn, "freelist_count")
+
+    start = time.perf_counter()
+    steps["checkpoint"] = {**checkpoint(conn, checkpoint_mode), "ms": _ms_since(start)}
+    return steps
+
+
+class MaintenanceThread(threading.Thread):
+    """Scheduled WAL checkpoints plus a periodic `maintain` pass for a serving process."""
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        interval_seconds: float | None = None,
+        checkpoint_seconds: float | None = None,
+    ):
+        super().__init__(name="astra-maintenance", daemon=True)
+        self.db_path = db_path or settings.db_path
+        self.interval_seconds = interval_seconds or settings.maintenance_interval_seconds
+        checkpoint_seconds = checkpoint_seconds or settings.wal_checkpoint_seconds
+        self.checkpoint_seconds = min(checkpoint_seconds, self.interval_seconds)
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        conn = connect(self.db_path)
+        try:
+            repo = Repo(conn)
+            last_pass = time.monotonic()
+            while not self._stop_event.wait(self.checkpoint_seconds):
+                try:
+                    if time.monotonic() - last_pass >= self.interval_seconds:
+                        last_pass = time.monotonic()
+                        vacuum_pages = settings.maintenance_vacuum_pages
+                        maintain(repo, analyze=False, vacuum_pages=vacuum_pages)
+                    else:
+                        # PASSIVE never waits on readers or writers
+                        checkpoint(conn, "PASSIVE")
+                except Exception:
+                    log.exception("maintenance_failed")
+        finally:
+            conn.close()
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import sqlite3
+import threading
+from array import array
+from collections.abc import Iterable
+
+from astra.common.config import settings
+
+from .repo import Repo
+
+# dict slot, object headers and array headers of one cached list
+_ENTRY_OVERHEAD = 400
+
+
+class PostingList:
+    """One term's postings as parallel arrays, sorted by doc_id (about 20 bytes per posting)."""
+
+    __slots__ = ("doc_ids", "tf_title", "tf_body", "lengths")
+
+    def __init__(self, doc_ids: array, tf_title: array, tf_body: array, lengths: array):
+        self.doc_ids = doc_ids
+        self.tf_title = tf_title
+        self.tf_body = tf_body
+        self.lengths = lengths
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[sqlite3.Row]) -> PostingList:
+        """Rows of (doc_id, tf_title, tf_body, length) in doc_id order."""
+        plist = cls(array("q"), array("i"), array("i"), array("i"))
+        for r in rows:
+            plist.doc_ids.append(int(r["doc_id"]))
+            plist.tf_title.append(int(r["tf_title"]))
+            plist.tf_body.append(int(r["tf_body"]))
+            plist.lengths.append(int(r["length"] or 0))
+        return plist
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return _ENTRY_OVERHEAD + len(self.doc_ids) * (8 + 4 + 4 + 4)
+
+
+class PostingCache:
+    """term_id -> `PostingList` for one database at one index_version, within a byte budget."""
+
+    # GreedyDual eviction with frequency: priority is `L + hits * cost`, where cost is the
+    # measured load time and L the priority of the last eviction. Not divided by size as in
+    # GDSF, which would evict exactly the hot head-term lists this cache is for.
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.version: int | None = None
+        self._entries: dict[int, PostingList] = {}
+        self._hits: dict[int, int] = {}
+        self._cost: dict[int, float] = {}
+        self._priority: dict[int, float] = {}
+        # (priority, seq, term_id); stale entries are skipped when popped
+        self._heap: list[tuple[float, int, int]] = []
+        self._seq = itertools.count()
+        self._inflation = 0.0  # L
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.rejected = 0  # lists larger than the whole budget
+
+    def sync(self, version: int) -> None:
+        """Drop everything when the index changed."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._hits.clear()
+            self._cost.clear()
+            self._priority.clear()
+            self._heap.clear()
+            self._inflation = 0.0
+            self.bytes = 0
+            self.version = version
+
+    def _touch(self, term_id: int) -> None:
+        priority = self._inflation + self._hits[term_id] * self._cost[term_id]
+        self._priority[term_id] = priority
+        heapq.heappush(self._heap, (priority, next(self._seq), term_id))
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            # re-pushed entries leave stale heap items behind
+            self._heap = [(p, next(self._seq), t) for t, p in self._priority.items()]
+            heapq.heapify(self._heap)
+
+    def get(self, term_id: int) -> PostingList | None:
+        with self._lock:
+            plist = self._entries.get(term_id)
+            if plist is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._hits[term_id] += 1
+            self._touch(term_id)
+            return plist
+
+    def put(self, term_id: int, plist: PostingList, cost: float, version: int) -> None:
+        """Cache a list read at `version`; dropped if the index moved on while it was read."""
+        size = plist.nbytes
+        with self._lock:
+            if version != self.version:
+                return
+            if size > self.budget_bytes:
+                self.rejected += 1
+                return
+            if term_id in self._entries:
+                return
+            while self.bytes + size > self.budget_bytes and self._evict():
+                pass
+            self._entries[term_id] = plist
+            self._hits[term_id] = 1
+            self._cost[term_id] = max(cost, 1e-9)
+            self.bytes += size
+            self._touch(term_id)
+
+    def _evict(self) -> bool:
+        while self._heap:
+            priority, _, term_id = heapq.heappop(self._heap)
+            if self._priority.get(term_id) != priority:
+                continue
+            self._inflation = priority
+            self.bytes -= self._entries.pop(term_id).nbytes
+            del self._hits[term_id], self._cost[term_id], self._priority[term_id]
+            self.evictions += 1
+            return True
+        return False
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "index_version": self.version,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "rejected": self.rejected,
+            }
+
+
+_CACHES: dict[str, PostingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def posting_cache(repo: Repo) -> tuple[PostingCache, int] | None:
+    """Process-wide cache for `repo`'s database and the index_version it was synced to."""
+    if settings.posting_cache_mb <= 0:
+        return None
+    db_file = repo.conn.execute("PRAGMA database_list").fetchone()["file"]
+    cache = _CACHES.get(db_file)
+    if cache is None:
+        with _CACHES_LOCK:
+            # each serve worker holds its own cache, so the budget is per deployment
+            budget = settings.posting_cache_mb * 1024 * 1024 // max(1, settings.serve_workers)
+            cache = _CACHES.setdefault(db_file, PostingCache(budget))
+    version = int(repo.get_stats()["index_version"])
+    cache.sync(version)
+    return cache, version
+
+
+def drop_cached_postings(db_file: str) -> None:
+    """Forget the posting lists of a database file that is no longer served (an old index image)."""
+    with _CACHES_LOCK:
+        _CACHES.pop(db_file, None)
+
+
+def posting_cache_stats() -> dict[str, dict[str, object]]:
+    """Stats of every posting cache in this process, by database file."""
+    with _CACHES_LOCK:
+        caches = dict(_CACHES)
+    return {db_file: cache.stats() for db_file, cache in caches.items()}
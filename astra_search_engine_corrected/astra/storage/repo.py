@@ -5,6 +5,7 @@ from dataclasses import dataclass
 from typing import Iterable
 
 from .db import init_db, tx
+from .links import encode_url_ids
 
 
 @dataclass(frozen=True)
@@ -25,7 +26,10 @@ class Repo:
     # -------------------- documents --------------------
     def upsert_document(self, url: str, title: str, body: str, fetched_at: str) -> int:
         length = len(body.split())
-        with tx(self.conn):
+        with tx(self.conn, immediate=True):
+            prev = self.conn.execute(
+                "SELECT doc_id, title, body FROM documents WHERE url=?", (url,)
+            ).fetchone()
             self.conn.execute(
                 """
                 INSERT INTO documents(url, title, body, length, fetched_at)
@@ -38,9 +42,98 @@ class Repo:
                 """,
                 (url, title, body, length, fetched_at),
             )
+            if prev is not None:
+                if prev["title"] != title or prev["body"] != body:
+                    # content changed -> make the indexer pick it up again
+                    self.conn.execute("DELETE FROM indexed_docs WHERE doc_id=?", (prev["doc_id"],))
+                return int(prev["doc_id"])
             cur = self.conn.execute("SELECT doc_id FROM documents WHERE url=?", (url,))
             return int(cur.fetchone()["doc_id"])
 
+    def bulk_upsert_documents(
+        self, rows: list[tuple[str, str, str, str]]
+    ) -> tuple[list[int], list[int]]:
+        """Upsert (url, title, body, fetched_at) rows; returns (new doc_ids, changed doc_ids)."""
+        if not rows:
+            return [], []
+        by_url = {r[0]: r for r in rows}  # last write wins within a batch
+        urls = list(by_url)
+        q = ",".join("?" for _ in urls)
+        with tx(self.conn, immediate=True):
+            sql = f"SELECT doc_id, url, title, body FROM documents WHERE url IN ({q})"  # noqa: S608
+            prev = {r["url"]: r for r in self.conn.execute(sql, urls)}
+            self.conn.executemany(
+                """
+                INSERT INTO documents(url, title, body, length, fetched_at)
+                VALUES(?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                  title=excluded.title,
+                  body=excluded.body,
+                  length=excluded.length,
+                  fetched_at=excluded.fetched_at
+                """,
+                [(u, t, b, len(b.split()), f) for u, t, b, f in by_url.values()],
+            )
+            changed = [
+                int(p["doc_id"])
+                for u, p in prev.items()
+                if p["title"] != by_url[u][1] or p["body"] != by_url[u][2]
+            ]
+            # as in upsert_document: changed content is picked up by the indexer again
+            self.conn.executemany(
+                "DELETE FROM indexed_docs WHERE doc_id=?", [(d,) for d in changed]
+            )
+            new_urls = [u for u in urls if u not in prev]
+            new_ids: list[int] = []
+            if new_urls:
+                q = ",".join("?" for _ in new_urls)
+                sql = f"SELECT doc_id FROM documents WHERE url IN ({q})"  # noqa: S608
+                new_ids = [int(r["doc_id"]) for r in self.conn.execute(sql, new_urls)]
+        return sorted(new_ids), changed
+
+    def delete_document(self, url: str) -> int | None:
+        """Delete a document and its postings; returns the deleted doc_id."""
+        # bumps index_version so caches keyed by it stop serving the document
+        with tx(self.conn, immediate=True):
+            row = self.conn.execute("SELECT doc_id FROM documents WHERE url=?", (url,)).fetchone()
+            if not row:
+                return None
+            doc_id = int(row["doc_id"])
+            self.conn.execute("DELETE FROM postings WHERE doc_id=?", (doc_id,))
+            self.conn.execute("DELETE FROM indexed_docs WHERE doc_id=?", (doc_id,))
+            self.conn.execute("DELETE FROM outlinks WHERE doc_id=?", (doc_id,))
+            self.conn.execute("DELETE FROM documents WHERE doc_id=?", (doc_id,))
+            # segment layout: postings in existing segments can't be removed in place
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO tombstones(doc_id, seq)
+                SELECT ?, MAX(seq) + 1 FROM segments WHERE live=1 HAVING COUNT(*) > 0
+                """,
+                (doc_id,),
+            )
+            self.bump_stats()
+            return doc_id
+
+    def set_outlinks(self, doc_id: int, urls: Iterable[str]) -> int:
+        """Replace `doc_id`'s outgoing links; returns the number of distinct targets."""
+        urls = list(dict.fromkeys(urls))
+        url_ids: list[int] = []
+        with tx(self.conn, immediate=True):
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO link_urls(url) VALUES(?)", [(u,) for u in urls]
+            )
+            for i in range(0, len(urls), 500):
+                chunk = urls[i : i + 500]
+                q = ",".join("?" for _ in chunk)
+                sql = f"SELECT url_id FROM link_urls WHERE url IN ({q})"  # noqa: S608
+                rows = self.conn.execute(sql, chunk)
+                url_ids.extend(int(r["url_id"]) for r in rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO outlinks(doc_id, url_ids) VALUES(?, ?)",
+                (doc_id, encode_url_ids(url_ids)),
+            )
+        return len(url_ids)
+
     def iter_unindexed_documents(self, limit: int | None = None) -> Iterable[Document]:
         sql = """
         SELECT d.*
@@ -71,12 +164,26 @@ class Repo:
         by_id = {d.doc_id: d for d in docs}
         return [by_id[i] for i in doc_ids if i in by_id]
 
+    def fetch_unindexed_documents(self, doc_ids: list[int]) -> list[Document]:
+        """Like `fetch_documents_by_ids`, minus documents whose content is already indexed."""
+        if not doc_ids:
+            return []
+        q = ",".join("?" for _ in doc_ids)
+        sql = f"""
+        SELECT d.*
+        FROM documents d
+        LEFT JOIN indexed_docs i ON i.doc_id = d.doc_id
+        WHERE d.doc_id IN ({q}) AND i.doc_id IS NULL
+        ORDER BY d.doc_id ASC
+        """  # noqa: S608
+        return [Document(**dict(r)) for r in self.conn.execute(sql, doc_ids)]
+
     # -------------------- terms/postings --------------------
     def ensure_term_id(self, term: str) -> int:
         row = self.conn.execute("SELECT term_id FROM terms WHERE term=?", (term,)).fetchone()
         if row:
             return int(row["term_id"])
-        with tx(self.conn):
+        with tx(self.conn, immediate=True):
             self.conn.execute("INSERT OR IGNORE INTO terms(term) VALUES(?)", (term,))
         row2 = self.conn.execute("SELECT term_id FROM terms WHERE term=?", (term,)).fetchone()
         return int(row2["term_id"])
@@ -93,7 +200,11 @@ class Repo:
             (term_id, doc_id, tf_title, tf_body),
         )
 
+    def delete_postings_for_doc(self, doc_id: int) -> None:
+        self.conn.execute("DELETE FROM postings WHERE doc_id=?", (doc_id,))
+
     def get_postings_for_term_ids(self, term_ids: list[int]) -> dict[int, list[sqlite3.Row]]:
+        """Postings per term_id, each list sorted by doc_id."""
         if not term_ids:
             return {}
         q = ",".join("?" for _ in term_ids)
@@ -103,6 +214,7 @@ class Repo:
             FROM postings p
             JOIN documents d ON d.doc_id = p.doc_id
             WHERE p.term_id IN ({q})
+            ORDER BY p.term_id, p.doc_id
             """,
             term_ids,
         ).fetchall()
@@ -126,16 +238,30 @@ class Repo:
 
     # -------------------- stats --------------------
     def get_stats(self) -> sqlite3.Row:
-        return self.conn.execute("SELECT * FROM stats ORDER BY created_at DESC LIMIT 1").fetchone()
+        sql = "SELECT * FROM stats ORDER BY index_version DESC LIMIT 1"
+        return self.conn.execute(sql).fetchone()
 
     def bump_stats(self) -> None:
         # Recompute avg_doc_len and doc_count; increment index_version
         row = self.conn.execute("SELECT COUNT(*) AS c, AVG(length) AS a FROM documents").fetchone()
         doc_count = int(row["c"] or 0)
         avg_len = float(row["a"] or 0.0)
-        cur = self.conn.execute("SELECT index_version FROM stats ORDER BY created_at DESC LIMIT 1").fetchone()
+        cur = self.conn.execute(
+            "SELECT index_version FROM stats ORDER BY index_version DESC LIMIT 1"
+        ).fetchone()
         next_ver = int(cur["index_version"]) + 1 if cur else 1
         self.conn.execute(
             "INSERT INTO stats(avg_doc_len, doc_count, index_version, created_at) VALUES(?, ?, ?, datetime('now'))",
             (avg_len, doc_count, next_ver),
         )
+
+    def compact_stats(self) -> int:
+        """Drop every stats row but the current one; returns the number removed."""
+        with tx(self.conn, immediate=True):
+            cur = self.conn.execute(
+                """
+                DELETE FROM stats
+                WHERE rowid != (SELECT rowid FROM stats ORDER BY index_version DESC LIMIT 1)
+                """
+            )
+        return cur.rowcount
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+from astra.common.config import settings
+
+from .db import tx
+from .repo import Repo
+
+# Each segment is a standalone SQLite file that is written once, in key order,
+# and never modified afterwards. Document lengths are snapshotted per segment so
+# a segment can be scored without the `documents` table.
+SEGMENT_SCHEMA_SQL = """
+PRAGMA journal_mode=OFF;
+PRAGMA synchronous=OFF;
+
+CREATE TABLE postings (
+  term_id INTEGER NOT NULL,
+  doc_id INTEGER NOT NULL,
+  tf_title INTEGER NOT NULL,
+  tf_body INTEGER NOT NULL,
+  PRIMARY KEY(term_id, doc_id)
+) WITHOUT ROWID;
+
+CREATE TABLE docs (
+  doc_id INTEGER PRIMARY KEY,
+  length INTEGER NOT NULL
+);
+"""
+
+PostingTuple = tuple[int, int, int, int]  # (term_id, doc_id, tf_title, tf_body)
+
+
+@dataclass(frozen=True)
+class SegmentInfo:
+    segment_id: int
+    path: str
+    seq: int
+    level: int
+    doc_count: int
+    posting_count: int
+    size_bytes: int
+
+
+def segments_dir(db_path: str | None = None) -> Path:
+    p = Path(db_path or settings.db_path)
+    return p.with_name(f"{p.stem}.segments")
+
+
+def db_file(conn: sqlite3.Connection) -> str:
+    return conn.execute("PRAGMA database_list").fetchone()["file"]
+
+
+def open_segment(path: Path) -> sqlite3.Connection:
+    # segments are immutable: skip locking and change detection entirely
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def write_segment_file(
+    directory: Path,
+    postings: Iterable[PostingTuple],
+    doc_lengths: Iterable[tuple[int, int]],
+    batch_size: int = 10_000,
+) -> tuple[str, int, int, int]:
+    """Write (term_id, doc_id)-sorted postings; returns (name, docs, postings, bytes)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"seg-{uuid4().hex}.db"
+    path = directory / name
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.executescript(SEGMENT_SCHEMA_SQL)
+        conn.execute("BEGIN")
+        posting_count = 0
+        batch: list[PostingTuple] = []
+        for p in postings:
+            batch.append(p)
+            if len(batch) >= batch_size:
+                conn.executemany("INSERT INTO postings VALUES(?, ?, ?, ?)", batch)
+                posting_count += len(batch)
+                batch.clear()
+        if batch:
+            conn.executemany("INSERT INTO postings VALUES(?, ?, ?, ?)", batch)
+            posting_count += len(batch)
+        conn.executemany("INSERT OR REPLACE INTO docs VALUES(?, ?)", doc_lengths)
+        doc_count = int(conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0])
+        conn.commit()
+    finally:
+        conn.close()
+    return name, doc_count, posting_count, path.stat().st_size
+
+
+def bump_counter(conn: sqlite3.Connection, name: str, delta: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO segment_counters(name, value) VALUES(?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        """,
+        (name, delta),
+    )
+
+
+def flush_segment(
+    repo: Repo,
+    postings: list[PostingTuple],
+    doc_lengths: dict[int, int],
+    index_version: int,
+) -> SegmentInfo:
+    # reindexed docs are tombstoned at the new seq so their older postings stop matching
+    postings.sort()
+    directory = segments_dir(db_file(repo.conn))
+    name, doc_count, posting_count, size = write_segment_file(
+        directory, postings, sorted(doc_lengths.items())
+    )
+
+    reindexed: set[int] = set()
+    doc_ids = list(doc_lengths)
+    with SegmentSet(repo) as current:
+        for seg in current.segments:
+            reindexed.update(current.find_docs(seg, doc_ids))
+
+    with tx(repo.conn, immediate=True):
+        cur = repo.conn.execute(
+            """
+            INSERT INTO segments(path, seq, level, doc_count, posting_count, size_bytes, created_at)
+            VALUES(?, 0, 0, ?, ?, ?, datetime('now'))
+            """,
+            (name, doc_count, posting_count, size),
+        )
+        segment_id = int(cur.lastrowid)
+        repo.conn.execute("UPDATE segments SET seq=? WHERE segment_id=?", (segment_id, segment_id))
+        repo.conn.executemany(
+            "INSERT OR REPLACE INTO tombstones(doc_id, seq) VALUES(?, ?)",
+            [(doc_id, segment_id) for doc_id in sorted(reindexed)],
+        )
+        for doc_id in doc_ids:
+            repo.mark_indexed(doc_id, index_version)
+        bump_counter(repo.conn, "bytes_flushed", size)
+
+    return SegmentInfo(segment_id, name, segment_id, 0, doc_count, posting_count, size)
+
+
+def live_segments(conn: sqlite3.Connection) -> list[SegmentInfo]:
+    rows = conn.execute(
+        """
+        SELECT segment_id, path, seq, level, doc_count, posting_count, size_bytes
+        FROM segments WHERE live=1 ORDER BY seq ASC, segment_id ASC
+        """
+    ).fetchall()
+    return [SegmentInfo(**dict(r)) for r in rows]
+
+
+def load_tombstones(conn: sqlite3.Connection) -> dict[int, int]:
+    rows = conn.execute("SELECT doc_id, seq FROM tombstones")
+    return {int(r["doc_id"]): int(r["seq"]) for r in rows}
+
+
+class SegmentSet:
+    """Live segments as of opening, read like `Repo` postings minus tombstoned docs."""
+
+    def __init__(self, repo: Repo):
+        with tx(repo.conn):
+            # one read transaction so manifest and tombstones are consistent
+            self.segments = live_segments(repo.conn)
+            self.tombstones = load_tombstones(repo.conn)
+        self.directory = segments_dir(db_file(repo.conn))
+        self._conns: dict[int, sqlite3.Connection] = {}
+
+    def __enter__(self) -> SegmentSet:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for c in self._conns.values():
+            c.close()
+        self._conns.clear()
+
+    def _conn(self, seg: SegmentInfo) -> sqlite3.Connection:
+        conn = self._conns.get(seg.segment_id)
+        if conn is None:
+            conn = open_segment(self.directory / seg.path)
+            self._conns[seg.segment_id] = conn
+        return conn
+
+    def is_live(self, seg: SegmentInfo, doc_id: int) -> bool:
+        return self.tombstones.get(doc_id, 0) <= seg.seq
+
+    def get_postings_for_term_ids(self, term_ids: list[int]) -> dict[int, list[sqlite3.Row]]:
+        if not term_ids:
+            return {}
+        q = ",".join("?" for _ in term_ids)
+        out: dict[int, list[sqlite3.Row]] = {}
+        for seg in self.segments:
+            rows = self._conn(seg).execute(
+                f"""
+                SELECT p.term_id, p.doc_id, p.tf_title, p.tf_body, d.length
+                FROM postings p
+                JOIN docs d ON d.doc_id = p.doc_id
+                WHERE p.term_id IN ({q})
+                ORDER BY p.term_id, p.doc_id
+                """,  # noqa: S608 - placeholders only
+                term_ids,
+            ).fetchall()
+            for r in rows:
+                if self.is_live(seg, int(r["doc_id"])):
+                    out.setdefault(int(r["term_id"]), []).append(r)
+        if len(self.segments) > 1:
+            # concatenated per-segment runs -> one doc-id-sorted list per term
+            for postings in out.values():
+                postings.sort(key=lambda r: r["doc_id"])
+        return out
+
+    def find_docs(self, seg: SegmentInfo, doc_ids: list[int]) -> list[int]:
+        """Subset of `doc_ids` that have postings in `seg`."""
+        found: list[int] = []
+        for i in range(0, len(doc_ids), 500):
+            chunk = doc_ids[i : i + 500]
+            q = ",".join("?" for _ in chunk)
+            sql = f"SELECT doc_id FROM docs WHERE doc_id IN ({q})"  # noqa: S608 - placeholders only
+            rows = self._conn(seg).execute(sql, chunk)
+            found.extend(int(r[0]) for r in rows)
+        return found
+
+    def iter_postings(self, seg: SegmentInfo) -> Iterable[PostingTuple]:
+        """All live postings of one segment in (term_id, doc_id) order."""
+        for r in self._conn(seg).execute(
+            "SELECT term_id, doc_id, tf_title, tf_body FROM postings ORDER BY term_id, doc_id"
+        ):
+            if self.is_live(seg, int(r[1])):
+                yield (int(r[0]), int(r[1]), int(r[2]), int(r[3]))
+
+    def iter_doc_lengths(self, seg: SegmentInfo) -> Iterable[tuple[int, int]]:
+        for r in self._conn(seg).execute("SELECT doc_id, length FROM docs ORDER BY doc_id"):
+            if self.is_live(seg, int(r[0])):
+                yield int(r[0]), int(r[1])
+
+
+def segment_report(conn: sqlite3.Connection) -> dict[str, object]:
+    segs = live_segments(conn)
+    rows = conn.execute("SELECT name, value FROM segment_counters")
+    counters = {r["name"]: int(r["value"]) for r in rows}
+    flushed = counters.get("bytes_flushed", 0)
+    merged = counters.get("bytes_merged", 0)
+    tombstones = int(conn.execute("SELECT COUNT(*) AS c FROM tombstones").fetchone()["c"])
+    return {
+        "segment_count": len(segs),
+        "posting_count": sum(s.posting_count for s in segs),
+        "size_bytes": sum(s.size_bytes for s in segs),
+        "tombstones": tombstones,
+        "bytes_flushed": flushed,
+        "bytes_merged": merged,
+        # total bytes written per byte of freshly indexed data
+        "write_amplification": round((flushed + merged) / flushed, 3) if flushed else 0.0,
+        "segments": [s.__dict__ for s in segs],
+    }
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from pathlib import Path
+
+from .repo import Repo
+
+
+def shard_paths(db_path: str, num_shards: int) -> list[str]:
+    # astra.db -> astra-shard00.db, astra-shard01.db, ...; one shard is db_path itself
+    if num_shards <= 1:
+        return [db_path]
+    p = Path(db_path)
+    return [str(p.with_name(f"{p.stem}-shard{i:02d}{p.suffix}")) for i in range(num_shards)]
+
+
+def shard_for_url(url: str, num_shards: int) -> int:
+    # stable across processes/runs (unlike hash())
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def to_global_doc_id(shard: int, local_doc_id: int, num_shards: int) -> int:
+    return local_doc_id * num_shards + shard
+
+
+def from_global_doc_id(doc_id: int, num_shards: int) -> tuple[int, int]:
+    return doc_id % num_shards, doc_id // num_shards
+
+
+class ShardRouter:
+    """The subset of `Repo` the crawler uses, routed to the shard owning each URL."""
+
+    def __init__(self, conns: list[sqlite3.Connection]):
+        self.repos = [Repo(c) for c in conns]
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.repos)
+
+    def upsert_document(self, url: str, title: str, body: str, fetched_at: str) -> int:
+        shard = shard_for_url(url, self.num_shards)
+        local_id = self.repos[shard].upsert_document(
+            url=url, title=title, body=body, fetched_at=fetched_at
+        )
+        return to_global_doc_id(shard, local_id, self.num_shards)
+
+    def delete_document(self, url: str) -> int | None:
+        shard = shard_for_url(url, self.num_shards)
+        local_id = self.repos[shard].delete_document(url)
+        return None if local_id is None else to_global_doc_id(shard, local_id, self.num_shards)
+
+    def set_outlinks(self, doc_id: int, urls: list[str]) -> int:
+        # stored with the source page; targets are matched to documents by URL across shards
+        shard, local_id = from_global_doc_id(doc_id, self.num_shards)
+        return self.repos[shard].set_outlinks(local_id, urls)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+
+from .repo import Repo
+
+log = logging.getLogger(__name__)
+
+BLOCK_SIZE = 16
+# terms added since the last front-coding are kept in a sorted tail; past this share of the
+# dictionary it is compacted in the background
+_TAIL_FRACTION = 8
+_SEP = "\x00"  # terms are [a-z0-9]+, so NUL never occurs inside one
+
+
+def _lcp(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TermDictionary:
+    """Immutable sorted term -> term_id map, front-coded in blocks of `BLOCK_SIZE`.
+
+    `extended` copies it with newer terms in a plain sorted tail, so an index change costs
+    only the terms it added; `compacted` front-codes the tail too.
+    """
+
+    def __init__(self, sorted_terms: Iterable[tuple[str, int]]):
+        # each block keeps its first term verbatim in `heads` for binary search and
+        # the rest as (shared-prefix length, suffix) against the previous term
+        self.heads: list[str] = []
+        self._blocks: list[str] = []
+        self._term_ids = array("q")
+        self._tail_terms: list[str] = []
+        self._tail_ids: list[int] = []
+        self.max_term_id = 0
+        prev = ""
+        parts: list[str] = []
+        for i, (term, term_id) in enumerate(sorted_terms):
+            if i % BLOCK_SIZE == 0:
+                if parts:
+                    self._blocks.append(_SEP.join(parts))
+                    parts = []
+                self.heads.append(term)
+            else:
+                n = _lcp(prev, term)
+                parts.append(chr(n + 1) + term[n:])  # +1 keeps the length byte off _SEP
+            self._term_ids.append(term_id)
+            self.max_term_id = max(self.max_term_id, term_id)
+            prev = term
+        if self.heads:
+            self._blocks.append(_SEP.join(parts))
+
+    def __len__(self) -> int:
+        return len(self._term_ids) + len(self._tail_ids)
+
+    def extended(self, new_terms: Iterable[tuple[str, int]]) -> TermDictionary:
+        """A copy that also holds `new_terms`, sharing this one's front-coded blocks."""
+        td = object.__new__(TermDictionary)
+        td.heads, td._blocks, td._term_ids = self.heads, self._blocks, self._term_ids
+        old = zip(self._tail_terms, self._tail_ids, strict=True)
+        tail = list(heapq.merge(old, sorted(new_terms)))
+        td._tail_terms = [t for t, _ in tail]
+        td._tail_ids = [i for _, i in tail]
+        td.max_term_id = max([self.max_term_id, *td._tail_ids])
+        return td
+
+    def needs_compaction(self) -> bool:
+        return len(self._tail_ids) * _TAIL_FRACTION > max(len(self._term_ids), 1024)
+
+    def compacted(self) -> TermDictionary:
+        return TermDictionary(self._iter_all())
+
+    def _iter_all(self) -> Iterator[tuple[str, int]]:
+        tail = zip(self._tail_terms, self._tail_ids, strict=True)
+        return heapq.merge(self._iter_from(0), tail)
+
+    def _tail_from(self, prefix: str) -> Iterator[tuple[str, int]]:
+        start = bisect_left(self._tail_terms, prefix)
+        return zip(self._tail_terms[start:], self._tail_ids[start:], strict=True)
+
+    def _iter_block(self, block: int) -> Iterator[tuple[str, int]]:
+        term = self.heads[block]
+        base = block * BLOCK_SIZE
+        yield term, self._term_ids[base]
+        encoded = self._blocks[block]
+        if not encoded:
+            return
+        for j, part in enumerate(encoded.split(_SEP), start=1):
+            term = term[: ord(part[0]) - 1] + part[1:]
+            yield term, self._term_ids[base + j]
+
+    def _iter_from(self, block: int) -> Iterator[tuple[str, int]]:
+        for b in range(block, len(self.heads)):
+            yield from self._iter_block(b)
+
+    def lookup(self, term: str) -> int | None:
+        block = bisect_right(self.heads, term) - 1
+        if block >= 0:
+            for t, term_id in self._iter_block(block):
+                if t == term:
+                    return term_id
+                if t > term:
+                    break
+        i = bisect_left(self._tail_terms, term)
+        if i < len(self._tail_terms) and self._tail_terms[i] == term:
+            return self._tail_ids[i]
+        return None
+
+    def lookup_many(self, terms: Iterable[str]) -> dict[str, int]:
+        out: dict[str, int] = {}
+        for t in terms:
+            if t in out:
+                continue
+            term_id = self.lookup(t)
+            if term_id is not None:
+                out[t] = term_id
+        return out
+
+    def expand_prefix(self, prefix: str, limit: int) -> list[tuple[str, int]]:
+        """Terms starting with `prefix` in lexicographic order, at most `limit`."""
+        out: list[tuple[str, int]] = []
+        if limit <= 0:
+            return out
+        block = max(0, bisect_left(self.heads, prefix) - 1)
+        front_coded = (kv for kv in self._iter_from(block) if kv[0] >= prefix)
+        merged = heapq.merge(front_coded, self._tail_from(prefix))
+        for t, term_id in merged:
+            if not t.startswith(prefix):
+                break
+            out.append((t, term_id))
+            if len(out) >= limit:
+                break
+        return out
+
+
+_CACHE: dict[str, tuple[int, TermDictionary]] = {}
+_CACHE_LOCK = threading.Lock()
+_COMPACTING: set[str] = set()
+
+
+def load_term_dictionary(repo: Repo) -> TermDictionary:
+    """Process-wide dictionary for `repo`'s database, kept current on index_version change."""
+    db_file = repo.conn.execute("PRAGMA database_list").fetchone()["file"]
+    version = int(repo.get_stats()["index_version"])
+    cached = _CACHE.get(db_file)
+    if cached and cached[0] == version:
+        return cached[1]
+    with _CACHE_LOCK:
+        cached = _CACHE.get(db_file)
+        if cached and cached[0] == version:
+            return cached[1]
+        top = int(repo.conn.execute("SELECT MAX(term_id) FROM terms").fetchone()[0] or 0)
+        if cached and cached[1].max_term_id <= top:
+            # terms are only ever added with growing ids, so the new ones are enough
+            sql = "SELECT term, term_id FROM terms WHERE term_id > ?"
+            rows = repo.conn.execute(sql, (cached[1].max_term_id,))
+            td = cached[1].extended((r["term"], int(r["term_id"])) for r in rows)
+        else:
+            rows = repo.conn.execute("SELECT term, term_id FROM terms ORDER BY term")
+            td = TermDictionary((r["term"], int(r["term_id"])) for r in rows)
+        _CACHE[db_file] = (version, td)
+        if td.needs_compaction() and db_file not in _COMPACTING:
+            _COMPACTING.add(db_file)
+            threading.Thread(target=_compact, args=(db_file, td), daemon=True).start()
+        return td
+
+
+def _compact(db_file: str, td: TermDictionary) -> None:
+    # queries keep using the tailed dictionary meanwhile
+    try:
+        compacted = td.compacted()
+        with _CACHE_LOCK:
+            cached = _CACHE.get(db_file)
+            # unless the database was replaced by a full rebuild meanwhile
+            if cached is not None and cached[1].heads is td.heads:
+                current = cached[1]
+                newer = [
+                    (t, i)
+                    for t, i in zip(current._tail_terms, current._tail_ids, strict=True)
+                    if i > compacted.max_term_id
+                ]
+                _CACHE[db_file] = (cached[0], compacted.extended(newer) if newer else compacted)
+    except Exception:
+        log.exception("term_dictionary_compaction_failed")
+    finally:
+        with _CACHE_LOCK:
+            _COMPACTING.discard(db_file)
+
+
+def drop_cached_dictionary(db_file: str) -> None:
+    """Forget the dictionary of a database file that is no longer served (an old index image)."""
+    with _CACHE_LOCK:
+        _CACHE.pop(db_file, None)
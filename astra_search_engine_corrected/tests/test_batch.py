@@ -0,0 +1,87 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.ranker.search_service import BatchQuery, SearchService, encode_cursor
+from astra.ranker.sharded import ShardedSearchService
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.shards import ShardRouter, shard_paths
+
+
+def _corpus(repo: Repo) -> None:
+    repo.upsert_document("http://x/a", "Pasta", "fresh pasta with tomato", "2025-01-01T00:00:00Z")
+    repo.upsert_document("http://x/b", "Soup", "tomato soup", "2025-01-01T00:00:00Z")
+    repo.upsert_document("http://x/c", "Bread", "sourdough bread", "2025-01-01T00:00:00Z")
+    Indexer(repo, layout="table").index_new_documents(batch_size=10)
+
+
+def test_batch_reads_each_posting_list_and_document_once():
+    with tempfile.TemporaryDirectory() as td:
+        repo = Repo(connect(f"{td}/b.db"))
+        _corpus(repo)
+        reads: list[list[int]] = []
+        fetch = repo.get_postings_for_term_ids
+        repo.get_postings_for_term_ids = lambda ids: reads.append(sorted(ids)) or fetch(ids)
+
+        svc = SearchService(repo)
+        texts = ["pasta tomato", "tomato", "tomato soup -bread", "pasta*"]
+        result = svc.search_batch([BatchQuery(parse_query(t)) for t in texts])
+        # pasta tomato soup bread
+        assert len(reads) == 1 and result.terms == result.posting_lists == 4
+        assert result.documents == 2
+
+        for t, outcome in zip(texts, result.outcomes, strict=True):
+            single = SearchService(repo).search_page(parse_query(t), k=10, page=1, page_size=10)
+            assert outcome.page == single and outcome.took_ms >= 0
+        assert svc.ranker.postings_memo is None
+
+
+def test_concurrent_batches_on_a_shared_sharded_service():
+    with tempfile.TemporaryDirectory() as td:
+        paths = shard_paths(f"{td}/s.db", 2)
+        router = ShardRouter([connect(p) for p in paths])
+        for i in range(20):
+            body = f"tomato pasta {i}"
+            router.upsert_document(f"http://x/{i}", f"Doc {i}", body, "2025-01-01T00:00:00Z")
+        for repo in router.repos:
+            Indexer(repo, layout="table").index_new_documents(batch_size=50)
+
+        pool, clients = ThreadPoolExecutor(max_workers=2), ThreadPoolExecutor(max_workers=4)
+        with pool, clients:
+            svc = ShardedSearchService(paths, executor=pool)  # one instance serves every request
+            batch = [BatchQuery(parse_query(t)) for t in ["tomato", "pasta", "tomato pasta"]]
+            results = list(clients.map(lambda _: svc.search_batch(batch), range(40)))
+        for r in results:
+            assert r.documents == 20 and [o.page.total for o in r.outcomes] == [20] * 3
+
+
+def test_batch_endpoint_reports_per_query_errors():
+    with tempfile.TemporaryDirectory() as td:
+        settings.db_path = f"{td}/api.db"
+        conn = connect(settings.db_path)
+        _corpus(Repo(conn))
+        conn.close()
+
+        client = TestClient(create_app())
+        stale = encode_cursor(1.0, 1, index_version=0)
+        queries = [
+            {"q": "tomato", "page_size": 1},
+            {"q": "tomato", "search_after": stale},
+            {"q": "bread"},
+        ]
+        r = client.post("/search/batch", json={"queries": queries})
+        assert r.status_code == 200
+        data = r.json()
+        first, second, third = data["results"]
+        assert first["status"] == 200 and first["result"]["hits"][0]["url"] == "http://x/b"
+        assert first["result"]["next_cursor"]
+        assert second["status"] == 409 and second["result"] is None
+        assert third["result"]["total_hits"] == 1 and data["took_ms"] >= third["took_ms"]
+
+        assert client.post("/search/batch", json={"queries": []}).status_code == 422
@@ -0,0 +1,54 @@
+import random
+import tempfile
+
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.ranker.bm25 import BM25Ranker
+from astra.ranker.boolean import gallop, intersect
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+
+
+def test_gallop_and_intersect_match_brute_force():
+    rng = random.Random(3)  # noqa: S311
+    lists = [sorted(rng.sample(range(2000), n)) for n in (40, 600, 1500)]
+    nots = [sorted(rng.sample(range(2000), 300))]
+
+    for target in (0, 5, 999, 1999, 5000):
+        i = gallop(lists[1], target, 10)
+        assert i == 10 + sum(1 for x in lists[1][10:] if x < target)
+
+    expected = sorted((set(lists[0]) & set(lists[1]) & set(lists[2])) - set(nots[0]))
+    got = list(intersect(lists, nots))
+    assert [d for d, _ in got] == expected
+    for doc_id, positions in got:
+        assert all(lst[p] == doc_id for lst, p in zip(lists, positions, strict=True))
+
+
+def test_boolean_queries():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/test.db")
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Python web", "FastAPI python framework", day)
+        repo.upsert_document("http://x/b", "Python data", "Pandas python dataframes", day)
+        repo.upsert_document("http://x/c", "Rust web", "Axum framework in rust", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        ranker = BM25Ranker(repo)
+
+        def ids(q):
+            return {s.doc_id for s in ranker.search(parse_query(q), k=10)}
+
+        assert ids("python OR framework") == {1, 2, 3}
+        assert ids("python AND framework") == {1}
+        assert ids("+framework -python") == {3}
+        assert ids("python NOT pandas") == {1}
+        assert ids("+python +golang") == set()
+
+        # terms rows outlive their postings
+        repo.upsert_document("http://x/z", "Zebra", "python zebra", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        assert ids("python AND zebra") == {4}
+        repo.delete_document("http://x/z")
+        assert ids("+zebra") == ids("python AND zebra") == set()
+        conn.close()
@@ -0,0 +1,138 @@
+import tempfile
+
+import httpx
+
+from astra.common.tokenizer import parse_query
+from astra.crawler import crawler as crawler_mod
+from astra.crawler.crawler import PoliteCrawler
+from astra.crawler.scheduler import HostScheduler
+from astra.indexer.live import LiveIndexer
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_scheduler_interleaves_hosts_and_adapts_delays():
+    clock = FakeClock()
+    s = HostScheduler(base_delay=1.0, max_delay=30.0, latency_factor=2.0, clock=clock)
+    for url in ["http://a/1", "http://a/2", "http://b/1"]:
+        s.add(url, 0)
+
+    url, _, wait = s.next()
+    assert (url, wait) == ("http://a/1", 0.0)
+    s.record("a", 0.1, 200)
+    # b is ready now; a is inside its window, so it does not block b
+    assert s.next()[0] == "http://b/1"
+    s.record("b", 0.1, 200)
+    url, _, wait = s.next()
+    assert url == "http://a/2" and wait == 1.0
+
+    # slow responses stretch the delay to latency_factor * smoothed latency
+    s.record("a", 3.0, 200)
+    assert s.hosts["a"].delay > 1.0
+    # throttling doubles it; an explicit Retry-After is honoured even past max_delay
+    before = s.hosts["a"].delay
+    s.record("a", 0.1, 429)
+    assert s.hosts["a"].delay == 2 * before and s.hosts["a"].throttled == 1
+    s.record("a", 0.1, 503, retry_after=100.0)
+    assert s.hosts["a"].delay == 100.0
+    # successes decay it back toward the target, never below robots Crawl-delay
+    s.set_robots_delay("a", 5.0)
+    for _ in range(50):
+        s.record("a", 0.01, 200)
+    assert abs(s.hosts["a"].delay - 5.0) < 0.01
+    assert len(s) == 0
+
+
+def test_crawl_two_hosts_with_throttling_and_robots_delay(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        host, path = request.url.host, request.url.path
+        if path == "/robots.txt":
+            body = "User-agent: *\nCrawl-delay: 3\nDisallow: /private\n" if host == "b.test" else ""
+            return httpx.Response(200, text=body)
+        if host == "a.test" and path == "/":
+            return httpx.Response(429, headers={"Retry-After": "7"})
+        links = '<a href="/p1">1</a><a href="/private">x</a>' if path == "/" else ""
+        html = f"<html><title>{host}{path}</title><body>page {path} {links}</body></html>"
+        return httpx.Response(200, text=html, headers={"content-type": "text/html"})
+
+    waits: list[float] = []
+    monkeypatch.setattr(crawler_mod.time, "sleep", waits.append)
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/x.db")
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        c = PoliteCrawler(
+            Repo(conn),
+            {"a.test", "b.test"},
+            max_pages=10,
+            client=client,
+            scheduler=HostScheduler(base_delay=0.0),
+        )
+        results = c.crawl(["http://a.test/", "http://b.test/"])
+        c.close()
+        conn.close()
+
+    by_status = {r.url: (r.status, r.error) for r in results}
+    assert by_status["http://a.test/"] == ("error", "http_429")
+    assert by_status["http://b.test/private"] == ("skipped", "robots")
+    assert by_status["http://b.test/p1"][0] == "stored"
+    # b's second fetch waited out its robots Crawl-delay
+    assert any(2.5 < w <= 3.0 for w in waits)
+
+    report = c.metrics.as_dict(c.scheduler)
+    assert report["pages"] == 3 and report["statuses"] == {"429": 1, "200": 2}
+    assert sum(report["fetch_latency_seconds"].values()) == 3
+    assert report["hosts"]["a.test"]["throttled"] == 1
+    assert report["hosts"]["a.test"]["delay_seconds"] == 7.0
+    assert report["hosts"]["b.test"]["robots_delay_seconds"] == 3.0
+
+
+def test_streamed_crawl_is_indexed_live(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/robots.txt":
+            return httpx.Response(404)
+        n = int(request.url.path.strip("/") or 0)
+        links = "".join(f'<a href="/{m}">{m}</a>' for m in (2 * n + 1, 2 * n + 2) if m < 7)
+        html = f"<html><title>page {n}</title><body>walnut page{n} {links}</body></html>"
+        return httpx.Response(200, text=html, headers={"content-type": "text/html"})
+
+    monkeypatch.setattr(crawler_mod.time, "sleep", lambda s: None)
+    with tempfile.TemporaryDirectory() as td:
+        path = f"{td}/x.db"
+        conn = connect(path)
+        repo = Repo(conn)
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        def crawl() -> LiveIndexer:
+            sched = HostScheduler(base_delay=0.0)
+            c = PoliteCrawler(repo, {"t.test"}, client=client, scheduler=sched)
+            live = LiveIndexer([path], batch_docs=3, flush_seconds=0.05)
+            live.start()
+            stream = c.iter_crawl(["http://t.test/0"])
+            assert not isinstance(stream, list)
+            for r in stream:
+                assert r.status == "stored", r
+                live.submit(r.stored_doc_id)
+            live.stop()
+            live.join()
+            return live
+
+        live = crawl()
+        assert live.indexed == 7 and live.failed == 0 and live.batches >= 3
+        # each batch bumped the stats, so documents became searchable batch by batch
+        assert int(repo.get_stats()["index_version"]) == 1 + live.batches
+        assert len(BM25Ranker(repo).search(parse_query("walnut"), k=10)) == 7
+        assert BM25Ranker(repo).search(parse_query("page5"), k=10)
+
+        # unchanged pages fetched again are not reindexed
+        assert crawl().indexed == 0
+        client.close()
+        conn.close()
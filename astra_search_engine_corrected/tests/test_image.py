@@ -0,0 +1,68 @@
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.indexer.indexer import Indexer
+from astra.indexer.pagerank import compute_priors
+from astra.storage.db import connect
+from astra.storage.image import ImageWatcher, build_image, images_dir, process_memory
+from astra.storage.repo import Repo
+
+
+def _add(db_path: str, url: str, title: str, body: str) -> None:
+    conn = connect(db_path)
+    try:
+        repo = Repo(conn)
+        repo.upsert_document(url, title, body, "2025-01-01T00:00:00Z")
+        Indexer(repo, layout="table").index_new_documents(batch_size=10)
+    finally:
+        conn.close()
+
+
+def test_workers_serve_image_and_follow_index_version(monkeypatch):
+    with tempfile.TemporaryDirectory() as td:
+        monkeypatch.setattr(settings, "db_path", f"{td}/img.db")
+        monkeypatch.setattr(settings, "serve_workers", 2)
+        _add(settings.db_path, "http://x/a", "Pasta", "fresh pasta recipes")
+
+        app = create_app()
+        image = app.state.image
+        # reused, not rebuilt
+        assert image is not None and build_image(settings.db_path) == image.path
+        client = TestClient(app)
+        hits = client.get("/search", params={"q": "pasta"}).json()["hits"]
+        assert [h["url"] for h in hits] == ["http://x/a"]
+        assert image.repo().conn.execute("PRAGMA query_only").fetchone()[0] == 1
+
+        watcher = ImageWatcher(image)
+        assert not watcher.check()
+        _add(settings.db_path, "http://x/b", "More pasta", "pasta with pesto")
+        old = image.path
+        assert watcher.check() and image.path != old
+        hits = client.get("/search", params={"q": "pesto"}).json()["hits"]
+        assert [h["url"] for h in hits] == ["http://x/b"]
+
+        _add(settings.db_path, "http://x/c", "Soup", "tomato soup")
+        watcher.check()
+        kept = list(images_dir().glob("*.db"))
+        assert len(kept) == 2 and image.path in kept and old not in kept  # older images pruned
+        assert client.get("/search", params={"q": "soup"}).json()["total_hits"] == 1
+
+        # new priors leave index_version alone but still produce a new image
+        version = image.index_version
+        conn = connect(settings.db_path)
+        compute_priors([Repo(conn)])
+        conn.close()
+        assert watcher.check() and image.index_version == version
+        assert client.get("/search", params={"q": "soup"}).json()["total_hits"] == 1
+
+        watcher.write_report()
+        workers = client.get("/workers").json()["workers"]
+        assert len(workers) == 1 and workers[0]["index_version"] == image.index_version
+        assert workers[0]["rss_bytes"] > 0
+        # read on this thread: a request thread's connection (and mapping) may be gone by now
+        image.repo().conn.execute("SELECT COUNT(*) FROM postings").fetchone()
+        assert process_memory(image.path)["image_rss_bytes"] > 0  # pages come from the mapping
+        watcher.stop()
@@ -0,0 +1,78 @@
+import tempfile
+
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.impacts import build_impacts
+from astra.indexer.indexer import Indexer
+from astra.ranker.bm25 import BM25Ranker
+from astra.ranker.impact import ImpactRanker, evaluate_impacts
+from astra.ranker.search_service import BatchQuery, SearchService
+from astra.storage.db import connect, tx
+from astra.storage.repo import Repo
+
+
+def _corpus(repo: Repo) -> None:
+    # a few docs dense in "pasta", more that mention it once in a long body, the rest never
+    day = "2025-01-01T00:00:00Z"
+    for i in range(5):
+        repo.upsert_document(f"http://x/hot{i}", f"Pasta {i}", "pasta " * (5 + i), day)
+    for i in range(200):
+        words = (["pasta"] if i < 60 else []) + [f"filler{j}" for j in range(60 + i % 7)]
+        repo.upsert_document(f"http://x/cold{i}", f"Page {i}", " ".join(words), day)
+    Indexer(repo, layout="table").index_new_documents(batch_size=1000)
+
+
+def test_impact_search_terminates_early_with_exact_top_k():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/i.db")
+        repo = Repo(conn)
+        _corpus(repo)
+        report = build_impacts(repo, bits=8)
+        assert report["postings"] == conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+
+        exact = BM25Ranker(repo).search(parse_query("pasta"), k=5)
+        ranker = ImpactRanker(repo)
+        approx, matched = ranker.search_with_count(parse_query("pasta"), k=5)
+        assert not ranker.exhaustive and ranker.postings_scored < 65 and matched < 65
+        # same top-k set; near-equal BM25 scores may share one quantized value
+        assert {s.doc_id for s in approx} == {s.doc_id for s in exact}
+        assert abs(approx[0].score - exact[0].score) < 0.05
+
+        queries = ["pasta", "pasta filler3", "filler1 -pasta"]
+        quality = evaluate_impacts(repo, queries, k=5, repeats=1)
+        assert quality["early_terminated"] >= 1 and 0.5 < quality["ndcg_at_k"] <= 1.0
+
+        # impacts describe one index_version; after a change search is exact again
+        with tx(conn):
+            repo.bump_stats()
+        assert ranker.search(parse_query("pasta"), k=5) == exact
+        assert ranker.exhaustive
+
+
+def test_batch_prefetches_only_what_impact_scoring_reads(monkeypatch):
+    monkeypatch.setattr(settings, "impact_scoring", True)
+    with tempfile.TemporaryDirectory() as td:
+        repo = Repo(connect(f"{td}/i.db"))
+        _corpus(repo)
+        build_impacts(repo, bits=8)
+        batch = [BatchQuery(parse_query(q)) for q in ["pasta", "filler1 -pasta"]]
+        result = SearchService(repo).search_batch(batch)
+        assert (result.terms, result.posting_lists) == (1, 1)  # only the NOT list
+        exact = SearchService(repo).search_batch([BatchQuery(parse_query("+pasta +filler1"))])
+        assert exact.posting_lists == 2  # AND queries score exact BM25 from postings
+
+
+def test_track_total_hits_bounds_impact_counting():
+    with tempfile.TemporaryDirectory() as td:
+        repo = Repo(connect(f"{td}/i.db"))
+        _corpus(repo)
+        build_impacts(repo, bits=8)
+        ranker = ImpactRanker(repo)
+        query = parse_query("pasta")
+
+        top, matched = ranker.search_with_count(query, k=5, track_total_hits=100)
+        assert matched == 65 and ranker.exhaustive
+        # early termination waits until the threshold is counted
+        bounded, matched = ranker.search_with_count(query, k=5, track_total_hits=30)
+        assert 30 <= matched < 65 and not ranker.exhaustive and ranker.postings_scored < 65
+        assert {s.doc_id for s in bounded} == {s.doc_id for s in top}
@@ -0,0 +1,105 @@
+import gzip
+import json
+import tempfile
+from pathlib import Path
+
+from astra.common.tokenizer import parse_query
+from astra.ingest.loader import BulkLoader
+from astra.ingest.readers import iter_records
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.shards import ShardRouter, shard_for_url, shard_paths
+
+
+def _warc_response(url: str, html: str) -> bytes:
+    payload = html.encode("utf-8")
+    http = b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n\r\n" + payload
+    head = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        "WARC-Date: 2025-01-01T00:00:00Z\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(http)}\r\n\r\n"
+    ).encode()
+    return head + http + b"\r\n\r\n"
+
+
+def test_ingest_jsonl_and_warc():
+    with tempfile.TemporaryDirectory() as td:
+        jsonl = Path(td) / "docs.jsonl"
+        jsonl.write_text(
+            "\n".join(
+                [
+                    json.dumps({"url": "http://x/a", "title": "FastAPI", "body": "fastapi rocks"}),
+                    "not json",
+                    json.dumps({"url": "http://x/empty", "body": ""}),
+                    json.dumps(
+                        {"url": "http://x/b", "html": "<title>Pasta</title><p>Boil the pasta</p>"}
+                    ),
+                ]
+            ),
+            encoding="utf-8",
+        )
+        warc = Path(td) / "crawl.warc.gz"
+        with gzip.open(warc, "wb") as fh:
+            fh.write(_warc_response("http://x/c", "<title>Sauce</title><p>Tomato pasta sauce</p>"))
+            fh.write(b"WARC/1.0\r\nWARC-Type: request\r\nContent-Length: 3\r\n\r\nGET\r\n\r\n")
+
+        conn = connect(f"{td}/ingest.db")
+        repo = Repo(conn)
+        records = [rec for p in (jsonl, warc) for rec in iter_records(p)]
+        stats = BulkLoader(repo, batch_size=2, index=True).load(records)
+        counts = (stats.records, stats.stored, stats.skipped, stats.errors, stats.indexed)
+        assert counts == (5, 3, 1, 1, 3)
+
+        # re-ingesting changed content reindexes it once the indexes are back
+        changed = {"url": "http://x/a", "title": "Pasta", "body": "Pasta salad"}
+        jsonl.write_text(json.dumps(changed), encoding="utf-8")
+        stats = BulkLoader(repo, index=True).load(iter_records(jsonl))
+        assert stats.indexed == 1
+
+        ranker = BM25Ranker(repo)
+        assert ranker.search(parse_query("fastapi"), k=5) == []
+        assert {s.doc_id for s in ranker.search(parse_query("pasta"), k=5)} == {1, 2, 3}
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        names = {r["name"] for r in rows}
+        assert {"idx_postings_term", "idx_postings_doc"} <= names
+
+
+def test_ingest_counts_bad_records_and_duplicate_urls():
+    with tempfile.TemporaryDirectory() as td:
+        jsonl = Path(td) / "docs.jsonl"
+        lines = [
+            {"url": "http://x/a", "body": "first draft", "fetched_at": None},
+            {"url": "http://x/a", "body": "second draft"},
+            {"url": "http://x/b", "body": ["not", "text"]},
+            {"url": 7, "body": "numeric url"},
+            {"url": "http://x/c", "title": {"t": 1}, "body": "bad title"},
+        ]
+        jsonl.write_text("\n".join([*(json.dumps(o) for o in lines), "[1, 2]"]), encoding="utf-8")
+
+        conn = connect(f"{td}/ingest.db")
+        stats = BulkLoader(Repo(conn), batch_size=10).load(iter_records(jsonl))
+        assert (stats.records, stats.stored, stats.skipped, stats.errors) == (6, 1, 1, 4)
+        row = conn.execute("SELECT body, fetched_at FROM documents").fetchone()
+        assert row["body"] == "second draft"
+        assert row["fetched_at"] != "None"
+
+
+def test_ingest_routes_documents_to_their_shards():
+    with tempfile.TemporaryDirectory() as td:
+        jsonl = Path(td) / "docs.jsonl"
+        urls = [f"http://x/p{i}" for i in range(8)]
+        lines = [json.dumps({"url": u, "body": f"pasta page {u}"}) for u in urls]
+        jsonl.write_text("\n".join(lines), encoding="utf-8")
+
+        conns = [connect(p) for p in shard_paths(f"{td}/ingest.db", 2)]
+        stats = BulkLoader(ShardRouter(conns), batch_size=3, index=True).load(iter_records(jsonl))
+        assert (stats.stored, stats.indexed) == (8, 8)
+        for shard, conn in enumerate(conns):
+            stored = {r["url"] for r in conn.execute("SELECT url FROM documents")}
+            assert stored == {u for u in urls if shard_for_url(u, 2) == shard}
+        for conn in conns:
+            conn.close()
@@ -0,0 +1,59 @@
+import tempfile
+
+import pytest
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.indexer.indexer import Indexer
+from astra.loadtest.queries import cycle_queries, zipf_queries
+from astra.loadtest.runner import StepResult, run_loadtest, saturation_point
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+
+
+def test_loadtest_against_asgi_app():
+    with tempfile.TemporaryDirectory() as td:
+        settings.db_path = f"{td}/lt.db"
+        conn = connect(settings.db_path)
+        repo = Repo(conn)
+        for i in range(20):
+            body = f"pasta tomato w{i % 5} w{i}"
+            repo.upsert_document(f"http://x/{i}", f"Page {i}", body, "2025-01-01T00:00:00Z")
+        Indexer(repo).index_new_documents(batch_size=50)
+        mix = zipf_queries(repo, 200, seed=1)
+        conn.close()
+        # the head of the Zipf mix is the most frequent terms
+        assert sum("pasta" in q or "tomato" in q for q in mix) > 60
+
+        report = run_loadtest(
+            create_app(), cycle_queries(mix), rates=[40.0], duration=0.5, clients=4, warmup=0.1
+        )
+        assert report["mode"] == "asgi"
+        (step,) = report["steps"]
+        assert step["sent"] > 0 and step["errors"] == 0
+        assert step["statuses"] == {"200": step["sent"]}
+        lat = step["latency_ms"]
+        assert 0 < lat["p50"] <= lat["p95"] <= lat["p99"] <= lat["p999"] <= lat["max"]
+
+
+def test_saturation_point():
+    def step(
+        offered: float, ok: int, p99: float, errors: int = 0, elapsed: float = 1.0
+    ) -> StepResult:
+        s = StepResult(offered, 1.0, sent=ok + errors, errors=errors, elapsed_seconds=elapsed)
+        s.latencies_ms = [1.0] * 98 + [p99] * 2
+        return s
+
+    # the last step needed 2s to drain 1s worth of arrivals
+    steps = [step(10, 10, 5.0), step(20, 20, 8.0), step(40, 40, 900.0, elapsed=2.0)]
+    expected = {"max_sustained_qps": 20, "saturated_at_qps": 40, "reason": "throughput"}
+    assert saturation_point(steps, None) == expected
+    assert saturation_point(steps[:2], 6.0)["reason"] == "p99_latency"
+    assert saturation_point([step(10, 9, 1.0, errors=1)], None)["reason"] == "errors"
+    assert saturation_point(steps[:2], None)["saturated_at_qps"] is None
+
+
+def test_loadtest_rejects_non_positive_rates_before_starting():
+    for kwargs in ({"rates": [10.0, 0.0]}, {"rates": []}, {"rates": [10.0], "duration": 0.0}):
+        with pytest.raises(ValueError):
+            run_loadtest("http://unused", cycle_queries(["pasta"]), **kwargs)
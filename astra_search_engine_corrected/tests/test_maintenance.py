@@ -0,0 +1,55 @@
+import tempfile
+
+from astra.indexer.indexer import Indexer
+from astra.storage.db import connect, tx
+from astra.storage.maintenance import maintain, storage_report
+from astra.storage.repo import Repo
+
+
+def test_maintain_compacts_stats_and_releases_free_pages():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/m.db")
+        repo = Repo(conn)
+        for i in range(40):
+            body = " ".join(f"word{i}x{j}" for j in range(200))
+            repo.upsert_document(f"http://x/{i}", f"Doc {i}", body, "2025-01-01T00:00:00Z")
+        Indexer(repo, layout="table").index_new_documents(batch_size=100)
+        for i in range(30):
+            repo.delete_document(f"http://x/{i}")
+        with tx(conn):
+            repo.bump_stats()
+        version = int(repo.get_stats()["index_version"])
+
+        before = storage_report(repo)
+        assert before["auto_vacuum"] == "incremental"
+        assert before["stats_rows"] > 1 and before["freelist_pages"] > 0
+        assert before["postings_per_term"]["buckets"]["1"] == 10 * 200 + 10  # "doc" is in all 10
+        assert {o["name"] for o in before["objects"]} >= {"postings", "idx_postings_term"}
+
+        steps = maintain(repo)
+        assert steps["incremental_vacuum"]["pages_released"] > 0
+        after = storage_report(repo)
+        assert after["stats_rows"] == 1 and after["freelist_pages"] == 0 and after["wal_bytes"] == 0
+        assert int(repo.get_stats()["index_version"]) == version
+
+
+def test_opening_a_repo_does_not_need_the_write_lock():
+    with tempfile.TemporaryDirectory() as td:
+        Repo(connect(f"{td}/m.db"))
+        writer = connect(f"{td}/m.db")
+        writer.execute("BEGIN IMMEDIATE")  # a crawl, index or maintenance transaction
+        reader = connect(f"{td}/m.db")
+        reader.execute("PRAGMA busy_timeout=100")
+        assert storage_report(Repo(reader))["auto_vacuum"] == "incremental"
+        writer.rollback()
+
+
+def test_existing_databases_convert_to_incremental_vacuum():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/old.db")
+        conn.execute("CREATE TABLE legacy (x INTEGER)")  # created before auto_vacuum was set
+        conn.commit()
+        repo = Repo(conn)
+        assert storage_report(repo)["auto_vacuum"] == "none"
+        assert "vacuum" in maintain(repo, enable_incremental_vacuum=True)
+        assert storage_report(repo)["auto_vacuum"] == "incremental"
@@ -0,0 +1,82 @@
+import tempfile
+
+import numpy as np
+
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.impacts import build_impacts
+from astra.indexer.indexer import Indexer
+from astra.indexer.pagerank import compute_priors, pagerank
+from astra.ranker.bm25 import BM25Ranker
+from astra.ranker.impact import ImpactRanker
+from astra.storage.db import connect
+from astra.storage.links import decode_url_ids
+from astra.storage.repo import Repo
+from astra.storage.shards import ShardRouter
+
+
+def test_pagerank_power_iteration():
+    # 3-cycle: uniform; dangling node 3 keeps the vector a distribution
+    ranks, iterations, delta = pagerank(np.array([0, 1, 2]), np.array([1, 2, 0]), 3)
+    assert np.allclose(ranks, 1 / 3) and iterations >= 1
+    src, dst = np.array([1, 2, 3, 0]), np.array([0, 0, 0, 3])
+    ranks, _, delta = pagerank(src, dst, 4, tol=1e-12, max_iter=500)
+    assert abs(ranks.sum() - 1.0) < 1e-9 and delta < 1e-12
+    assert ranks.argmax() == 0
+
+
+def test_priors_reorder_equal_bm25_scores(monkeypatch):
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/g.db")
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        ids = {
+            name: repo.upsert_document(f"http://x/{name}", name, "pasta with tomato", day)
+            for name in "abcd"
+        }
+        Indexer(repo, layout="table").index_new_documents(batch_size=10)
+        # everything points at d; d points at a and at a page that was never fetched
+        for name in "abc":
+            repo.set_outlinks(ids[name], ["http://x/d", f"http://x/{name}"])
+        assert repo.set_outlinks(ids["d"], ["http://x/a", "http://x/missing", "http://x/a"]) == 2
+        row = conn.execute("SELECT url_ids FROM outlinks WHERE doc_id=?", (ids["d"],)).fetchone()
+        blob = row[0]
+        assert len(decode_url_ids(blob)) == 2
+
+        ranker = BM25Ranker(repo)
+        # tie -> lowest doc_id
+        assert ranker.search(parse_query("pasta"), k=1)[0].doc_id == ids["a"]
+
+        build_impacts(repo)
+        version = int(repo.get_stats()["index_version"])
+        report = compute_priors([repo])
+        # self-links and unknown targets dropped
+        assert report["nodes"] == 4 and report["edges"] == 4
+        assert report["top"][0]["url"] == "http://x/d"
+        # postings unchanged: impacts stay usable, the cached (empty) priors are reloaded
+        assert int(repo.get_stats()["index_version"]) == version
+        assert ImpactRanker(repo).impact_meta() is not None
+
+        top = ranker.search(parse_query("pasta"), k=4)
+        assert [s.doc_id for s in top[:2]] == [ids["d"], ids["a"]]
+        assert top[0].score - top[-1].score <= settings.prior_weight + 1e-9
+
+        monkeypatch.setattr(settings, "prior_weight", 0.0)
+        assert ranker.search(parse_query("pasta"), k=1)[0].doc_id == ids["a"]
+
+
+def test_link_graph_spans_shards():
+    with tempfile.TemporaryDirectory() as td:
+        conns = [connect(f"{td}/s{i}.db") for i in range(2)]
+        router = ShardRouter(conns)
+        urls = [f"http://x/p{i}" for i in range(8)]
+        ids = [router.upsert_document(u, "page", "body text", "2025-01-01T00:00:00Z") for u in urls]
+        for i, doc_id in enumerate(ids):
+            router.set_outlinks(doc_id, [urls[(i + 1) % 8], urls[0]])
+        report = compute_priors(router.repos)
+        # p0 -> p0 dropped, p7 -> p0 stored once
+        assert report["nodes"] == 8 and report["edges"] == 14
+        assert report["top"][0]["url"] == "http://x/p0"
+        sql = "SELECT SUM(pagerank) FROM doc_priors"
+        total = sum(r.conn.execute(sql).fetchone()[0] for r in router.repos)
+        assert abs(total - 1.0) < 1e-6
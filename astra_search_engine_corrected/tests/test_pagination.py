@@ -0,0 +1,105 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.ranker.search_service import SearchService
+from astra.ranker.sharded import ShardedSearchService
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.shards import ShardRouter, shard_paths
+
+
+def _docs():
+    # repeated scores exercise the doc_id tie-break
+    for i in range(23):
+        body = "search " * (1 + i % 4) + "engine"
+        yield f"http://x/{i}", f"Doc {i}", body, "2025-01-01T00:00:00Z"
+
+
+def _walk(svc, query, page_size):
+    urls, cursor = [], None
+    while True:
+        result = svc.search_page(query, k=10, page=1, page_size=page_size, search_after=cursor)
+        urls.extend(h.url for h in result.hits)
+        if result.next_cursor is None:
+            return urls
+        cursor = result.next_cursor
+
+
+def test_cursor_pages_match_offset_pages_and_shards():
+    with tempfile.TemporaryDirectory() as td:
+        repo = Repo(connect(f"{td}/single.db"))
+        paths = shard_paths(f"{td}/sharded.db", 3)
+        router = ShardRouter([connect(p) for p in paths])
+        for doc in _docs():
+            repo.upsert_document(*doc)
+            router.upsert_document(*doc)
+        Indexer(repo).index_new_documents(batch_size=50)
+        for r in router.repos:
+            Indexer(r).index_new_documents(batch_size=50)
+
+        query = parse_query("search")
+        svc = SearchService(repo)
+        pages = [svc.search(query, k=10, page=p, page_size=5)[0] for p in range(1, 6)]
+        by_page = [h.url for hits in pages for h in hits]
+        assert len(by_page) == 23
+        assert _walk(svc, query, 5) == by_page
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            sharded = ShardedSearchService(paths, executor=pool)
+            # ties break on global doc ids there, so compare against its own offset pages
+            pages = [sharded.search(query, k=10, page=p, page_size=10)[0] for p in range(1, 4)]
+            sharded_pages = [h.url for hits in pages for h in hits]
+            assert sorted(sharded_pages) == sorted(by_page)
+            assert _walk(sharded, query, 4) == sharded_pages
+
+        bounded = svc.search_page(query, k=10, page=1, page_size=5, track_total_hits=10)
+        assert (bounded.total, bounded.total_relation) == (10, "gte")
+        exact = svc.search_page(query, k=10, page=1, page_size=5)
+        assert (exact.total, exact.total_relation) == (23, "eq")
+
+
+def test_stale_and_invalid_cursor():
+    with tempfile.TemporaryDirectory() as td:
+        settings.db_path = f"{td}/api.db"
+        conn = connect(settings.db_path)
+        repo = Repo(conn)
+        for doc in _docs():
+            repo.upsert_document(*doc)
+        Indexer(repo).index_new_documents(batch_size=50)
+
+        client = TestClient(create_app())
+        first = client.get("/search", params={"q": "search", "page_size": 5}).json()
+        assert first["total_hits_relation"] == "eq"
+        cursor = first["next_cursor"]
+        params = {"q": "search", "page_size": 5, "search_after": cursor}
+        assert client.get("/search", params=params).status_code == 200
+
+        repo.upsert_document("http://x/new", "New", "search engine", "2025-01-02T00:00:00Z")
+        Indexer(repo).index_new_documents(batch_size=50)
+        conn.close()
+        for after, status in ((cursor, 409), ("garbage!", 400)):
+            params = {"q": "search", "search_after": after}
+            assert client.get("/search", params=params).status_code == status
+
+
+def test_phrase_pages_rank_at_most_twice():
+    with tempfile.TemporaryDirectory() as td:
+        repo = Repo(connect(f"{td}/p.db"))
+        for i in range(300):
+            body = "exact phrase here" if i % 100 == 99 else "phrase words apart exact"
+            repo.upsert_document(f"http://x/{i}", f"Doc {i}", body, "2025-01-01T00:00:00Z")
+        Indexer(repo).index_new_documents(batch_size=500)
+
+        svc = SearchService(repo)
+        ranks = []
+        rank = svc._rank
+        svc._rank = lambda *a, **kw: ranks.append(a) or rank(*a, **kw)
+        result = svc.search_page(parse_query('phrase "exact phrase"'), k=10, page=1, page_size=10)
+        assert len(result.hits) == 3 and (result.total, result.total_relation) == (3, "eq")
+        assert len(ranks) == 2
@@ -0,0 +1,108 @@
+import tempfile
+from array import array
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage.db import connect
+from astra.storage.posting_cache import PostingCache, PostingList, posting_cache
+from astra.storage.repo import Repo
+
+
+def _plist(n: int) -> PostingList:
+    ones = array("i", [1] * n)
+    return PostingList(array("q", range(n)), ones, array("i", ones), array("i", [5] * n))
+
+
+def test_eviction_keeps_hot_expensive_lists():
+    big, small = _plist(1000), _plist(10)
+    cache = PostingCache(budget_bytes=big.nbytes + 3 * small.nbytes)
+    cache.sync(1)
+    cache.put(1, big, cost=0.010, version=1)
+    for _ in range(5):
+        assert cache.get(1) is big
+    for t in range(2, 8):
+        cache.put(t, _plist(10), cost=0.0005, version=1)  # cheap one-off lists push each other out
+    assert cache.get(1) is big and cache.bytes <= cache.budget_bytes
+    assert cache.evictions == 3 and cache.stats()["entries"] == 4
+
+    cache.put(99, _plist(100_000), cost=1.0, version=1)  # larger than the whole budget
+    assert cache.rejected == 1 and cache.get(99) is None
+
+    cache.sync(2)
+    assert cache.get(1) is None and cache.bytes == 0 and cache.invalidations == 1
+    cache.put(1, big, cost=0.010, version=1)  # read before the index changed
+    assert cache.get(1) is None
+
+
+def test_lists_read_before_an_index_change_are_not_cached():
+    with tempfile.TemporaryDirectory() as td:
+        path = f"{td}/race.db"
+        repo = Repo(connect(path))
+        repo.upsert_document("http://x/a", "Pasta", "fresh pasta", "2025-01-01T00:00:00Z")
+        Indexer(repo, layout="table").index_new_documents(batch_size=10)
+
+        fetch = repo.get_postings_for_term_ids
+
+        def read_then_race(ids: list[int]):
+            rows = fetch(ids)
+            # while this request decodes, a writer commits and another request syncs the cache
+            writer = Repo(connect(path))
+            day = "2025-01-01T00:00:00Z"
+            writer.upsert_document("http://x/b", "More pasta", "pasta again", day)
+            Indexer(writer, layout="table").index_new_documents(batch_size=10)
+            BM25Ranker(writer).search(parse_query("fresh"), k=10)
+            return rows
+
+        repo.get_postings_for_term_ids = read_then_race
+        assert [s.doc_id for s in BM25Ranker(repo).search(parse_query("pasta"), k=10)] == [1]
+        fresh = BM25Ranker(Repo(connect(path))).search(parse_query("pasta"), k=10)
+        assert sorted(s.doc_id for s in fresh) == [1, 2]
+
+
+def test_search_reuses_cached_postings_until_the_index_changes():
+    with tempfile.TemporaryDirectory() as td:
+        settings.db_path = f"{td}/api.db"
+        conn = connect(settings.db_path)
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Pasta", "fresh pasta with tomato", day)
+        repo.upsert_document("http://x/b", "Soup", "tomato soup", day)
+        Indexer(repo, layout="table").index_new_documents(batch_size=10)
+
+        reads: list[list[int]] = []
+        fetch = repo.get_postings_for_term_ids
+        repo.get_postings_for_term_ids = lambda ids: reads.append(sorted(ids)) or fetch(ids)
+        ranker = BM25Ranker(repo)
+        first = ranker.search(parse_query("tomato pasta"), k=10)
+        assert ranker.search(parse_query("tomato pasta"), k=10) == first
+        assert ranker.search(parse_query("tomato AND soup"), k=10)[0].doc_id == 2
+        assert len(reads) == 2 and len(reads[1]) == 1  # only "soup" was new
+
+        repo.upsert_document("http://x/c", "Tomato", "tomato tomato tomato", "2025-01-01T00:00:00Z")
+        Indexer(repo, layout="table").index_new_documents(batch_size=10)
+        assert ranker.search(parse_query("tomato"), k=10)[0].doc_id == 3
+        assert len(reads) == 3
+        repo.delete_document("http://x/c")
+        assert [s.doc_id for s in ranker.search(parse_query("tomato"), k=10)] == [2, 1]
+        conn.close()
+
+        stats = TestClient(create_app()).get("/cache/postings").json()["caches"]
+        cache = stats[str(Path(settings.db_path).resolve())]
+        assert cache["hits"] >= 2 and 0 < cache["hit_rate"] < 1
+        assert cache["invalidations"] == 2 and cache["bytes"] > 0
+
+
+def test_serve_workers_split_the_cache_budget(monkeypatch):
+    monkeypatch.setattr(settings, "posting_cache_mb", 8)
+    monkeypatch.setattr(settings, "serve_workers", 4)
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/w.db")
+        found = posting_cache(Repo(conn))
+        assert found is not None and found[0].budget_bytes == 2 * 1024 * 1024
+        conn.close()
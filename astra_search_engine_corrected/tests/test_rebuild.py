@@ -0,0 +1,67 @@
+import tempfile
+
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.indexer.rebuild import IndexRebuilder
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.segments import live_segments
+
+_DOCS = [
+    ("http://x/a", "FastAPI tutorial", "FastAPI is a fast web framework for python"),
+    ("http://x/b", "Cooking pasta", "Boil water and add pasta then salt"),
+    ("http://x/c", "Python web", "Python web frameworks compared fastapi flask django"),
+    ("http://x/d", "Pasta sauce", "Tomato sauce for pasta with basil and python snakes"),
+]
+
+
+def _postings(conn):
+    sql = "SELECT term_id, doc_id, tf_title, tf_body FROM postings ORDER BY term_id, doc_id"
+    return conn.execute(sql).fetchall()
+
+
+def test_full_rebuild_matches_incremental_index():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/r.db")
+        repo = Repo(conn)
+        for url, title, body in _DOCS:
+            repo.upsert_document(url, title, body, "2025-01-01T00:00:00Z")
+        Indexer(repo, layout="table").index_new_documents()
+        before = [tuple(r) for r in _postings(conn)]
+        version = int(repo.get_stats()["index_version"])
+
+        # a tiny budget and fan-in force several runs and merge passes
+        stats = IndexRebuilder(repo, memory_mb=0.0002, fanin=2, layout="table").rebuild()
+        assert stats.docs == 4 and stats.runs > 2 and stats.merge_passes > 1
+        assert [tuple(r) for r in _postings(conn)] == before
+        assert int(repo.get_stats()["index_version"]) == version + 1
+        assert list(repo.iter_unindexed_documents()) == []
+        names = {r["name"] for r in conn.execute("SELECT name FROM sqlite_master")}
+        assert {"idx_postings_term", "idx_postings_doc"} <= names
+        assert not {"postings_rebuild", "rebuild_docs"} & names
+
+
+def test_full_rebuild_segments_replaces_live_segments(monkeypatch):
+    monkeypatch.setattr(settings, "index_layout", "segments")
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/r.db")
+        repo = Repo(conn)
+        indexer = Indexer(repo)
+        ranker = BM25Ranker(repo)
+        for url, title, body in _DOCS:
+            repo.upsert_document(url, title, body, "2025-01-01T00:00:00Z")
+            indexer.index_new_documents()
+        day2 = "2025-01-02T00:00:00Z"
+        repo.upsert_document("http://x/a", "Pasta salad", "Cold pasta salad", day2)
+        indexer.index_new_documents()
+        repo.delete_document("http://x/d")
+
+        stats = IndexRebuilder(repo, memory_mb=0.001).rebuild()
+        assert stats.docs == 3
+        assert len(live_segments(conn)) == 1
+        # the delete, not the update
+        assert [r[0] for r in conn.execute("SELECT doc_id FROM tombstones")] == [4]
+        assert [s.doc_id for s in ranker.search(parse_query("pasta"), k=10)] == [1, 2]
+        assert ranker.search(parse_query("fastapi"), k=10)[0].doc_id == 3
@@ -0,0 +1,60 @@
+import tempfile
+
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.indexer.merger import SegmentMerger
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.segments import live_segments, segment_report
+
+
+def test_segments_update_delete_and_merge(monkeypatch):
+    monkeypatch.setattr(settings, "index_layout", "segments")
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/seg.db")
+        repo = Repo(conn)
+        indexer = Indexer(repo)
+        ranker = BM25Ranker(repo)
+
+        day1, day2 = "2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z"
+        repo.upsert_document("http://x/a", "FastAPI tutorial", "FastAPI is great", day1)
+        indexer.index_new_documents()
+        repo.upsert_document("http://x/b", "Cooking pasta", "Boil water and add pasta", day1)
+        indexer.index_new_documents()
+        assert len(live_segments(conn)) == 2
+        assert [s.doc_id for s in ranker.search(parse_query("pasta"), k=5)] == [2]
+
+        # update: the old postings of doc 1 must stop matching
+        repo.upsert_document("http://x/a", "Pasta recipes", "Fresh pasta at home", day2)
+        indexer.index_new_documents()
+        assert ranker.search(parse_query("fastapi"), k=5) == []
+        assert {s.doc_id for s in ranker.search(parse_query("pasta"), k=5)} == {1, 2}
+
+        repo.delete_document("http://x/b")
+        assert [s.doc_id for s in ranker.search(parse_query("pasta"), k=5)] == [1]
+
+        assert SegmentMerger(repo).merge_all() == 1
+        report = segment_report(conn)
+        assert report["segment_count"] == 1
+        assert report["write_amplification"] > 1.0
+        assert [s.doc_id for s in ranker.search(parse_query("pasta"), k=5)] == [1]
+        assert ranker.search(parse_query("fastapi"), k=5) == []
+        conn.close()
+
+
+def test_segment_reads_do_not_wait_for_writers(monkeypatch):
+    monkeypatch.setattr(settings, "index_layout", "segments")
+    with tempfile.TemporaryDirectory() as td:
+        repo = Repo(connect(f"{td}/seg.db"))
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Cooking pasta", "Boil water and add pasta", day)
+        Indexer(repo).index_new_documents()
+
+        writer = connect(f"{td}/seg.db")
+        writer.execute("BEGIN IMMEDIATE")  # e.g. a live indexer mid-batch
+        reader = connect(f"{td}/seg.db")
+        reader.execute("PRAGMA busy_timeout=100")
+        assert [s.doc_id for s in BM25Ranker(Repo(reader)).search(parse_query("pasta"), k=5)] == [1]
+        writer.rollback()
@@ -0,0 +1,74 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.ranker.search_service import SearchService
+from astra.ranker.sharded import ShardedSearchService
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.shards import ShardRouter, shard_paths
+
+DOCS = [
+    ("http://x/a", "FastAPI tutorial", "FastAPI is great for building APIs"),
+    ("http://x/b", "Cooking pasta", "Boil water and add pasta"),
+    ("http://x/c", "API design", "Designing a REST API with FastAPI and pydantic"),
+    ("http://x/d", "Pasta sauce", "Tomato sauce for pasta dishes"),
+    ("http://x/e", "Search engines", "BM25 ranks documents for an API query"),
+]
+
+
+def test_sharded_scores_match_single_index():
+    with tempfile.TemporaryDirectory() as td:
+        single = Repo(connect(f"{td}/single.db"))
+        paths = shard_paths(f"{td}/sharded.db", 3)
+        conns = [connect(p) for p in paths]
+        router = ShardRouter(conns)
+        for url, title, body in DOCS:
+            single.upsert_document(url, title, body, "2025-01-01T00:00:00Z")
+            router.upsert_document(url, title, body, "2025-01-01T00:00:00Z")
+        Indexer(single).index_new_documents(batch_size=10)
+        for repo in router.repos:
+            Indexer(repo).index_new_documents(batch_size=10)
+
+        query = parse_query("fastapi api")
+        expected, expected_total = SearchService(single).search(query, k=10, page=1, page_size=10)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            svc = ShardedSearchService(paths, executor=pool)
+            hits, total = svc.search(query, k=10, page=1, page_size=10)
+
+        assert total == expected_total
+        assert [h.url for h in hits] == [h.url for h in expected]
+        for h, e in zip(hits, expected, strict=True):
+            assert abs(h.score - e.score) < 1e-9
+
+        single.conn.close()
+        for c in conns:
+            c.close()
+
+
+def test_sharded_wildcards_deletes_and_document_connections(monkeypatch):
+    monkeypatch.setattr(settings, "max_wildcard_expansions", 1)
+    with tempfile.TemporaryDirectory() as td:
+        paths = shard_paths(f"{td}/sharded.db", 3)
+        router = ShardRouter([connect(p) for p in paths])
+        router.upsert_document("http://x/rare", "Rare", "paella", "2025-01-01T00:00:00Z")
+        for i in range(6):
+            router.upsert_document(f"http://x/p{i}", f"Pasta {i}", "pasta", "2025-01-01T00:00:00Z")
+        for repo in router.repos:
+            Indexer(repo).index_new_documents(batch_size=10)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            svc = ShardedSearchService(paths, executor=pool)
+            # "paella" sorts first, but "pasta" has the highest df over all shards
+            hits, total = svc.search(parse_query("pa*"), k=10, page=1, page_size=10)
+            assert total == 6 and all(h.title.startswith("Pasta") for h in hits)
+            svc.search(parse_query("pasta"), k=10, page=1, page_size=10)
+            assert len(svc._conns) == 3  # reused across requests of the same thread
+
+            gid = router.delete_document("http://x/p0")
+            assert gid is not None and router.delete_document("http://x/p0") is None
+            assert svc.search(parse_query("pasta"), k=10, page=1, page_size=10)[1] == 5
+            svc.close()
@@ -0,0 +1,89 @@
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.indexer.spelling import deletes, update_spelling_index
+from astra.ranker.search_service import SearchService
+from astra.ranker.spelling import edit_distance, expand_query
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+
+
+def test_deletes_and_edit_distance():
+    assert deletes("abc", 1, 7) == {"abc", "bc", "ac", "ab"}
+    assert "ace" in deletes("abcdefghij", 2, 5)  # only the 5-char prefix is expanded
+    assert edit_distance("walnut", "wlanut", 2) == 1  # transposition
+    assert edit_distance("walnut", "walnuts", 2) == 1
+    assert edit_distance("walnut", "peanut", 2) == 3  # past the limit
+
+
+def test_corrections_rank_by_distance_then_df_and_cover_new_terms():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/x.db")
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        for i in range(3):
+            repo.upsert_document(f"http://x/w{i}", "Walnut", f"walnut bread {i}", day)
+        repo.upsert_document("http://x/a", "Walnuts", "walnuts", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        svc = SearchService(repo)
+
+        fixes = svc.spelling(parse_query("wlanut bread"))
+        assert list(fixes) == ["wlanut"]  # "bread" is indexed as typed
+        ranked = [(c.term, c.distance, c.df) for c in fixes["wlanut"]]
+        assert ranked == [("walnut", 1, 3), ("walnuts", 2, 1)]
+        assert svc.spelling(parse_query("zzzzzz")) == {}
+
+        # terms of later index runs are added incrementally
+        repo.upsert_document("http://x/h", "Hazelnut", "hazelnut", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        assert svc.spelling(parse_query("hazlenut"))["hazlenut"][0].term == "hazelnut"
+        assert update_spelling_index(repo) == 0
+
+        query = parse_query("+wlanut -hazlenut")
+        expanded = expand_query(query, svc.spelling(query))
+        assert expanded.terms == ["walnut", "walnuts"]
+        assert (expanded.required, expanded.excluded) == (["walnut"], ["hazelnut"])
+        conn.close()
+
+
+def test_fuzzy_search_and_did_you_mean(monkeypatch):
+    with tempfile.TemporaryDirectory() as td:
+        settings.db_path = f"{td}/api.db"
+        conn = connect(settings.db_path)
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Pasta recipes", "tomato pasta with basil", day)
+        repo.upsert_document("http://x/b", "Bread", "sourdough bread", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        conn.close()
+
+        client = TestClient(create_app())
+        exact = client.get("/search", params={"q": "Tomatto pasta"}).json()
+        assert exact["did_you_mean"] == "tomato pasta"
+        fuzzy = client.get("/search", params={"q": "tomatto bsail", "fuzzy": "true"}).json()
+        assert fuzzy["hits"][0]["url"] == "http://x/a" and fuzzy["did_you_mean"] == "tomato basil"
+        assert client.get("/search", params={"q": "tomato"}).json()["did_you_mean"] is None
+
+        spell = client.get("/spell", params={"q": "sourdouhg"}).json()
+        assert spell["corrections"]["sourdouhg"][0] == {"term": "sourdough", "distance": 1, "df": 1}
+
+        calls = []
+        spelling = SearchService.spelling
+        monkeypatch.setattr(
+            SearchService, "spelling", lambda svc, q: calls.append(q) or spelling(svc, q)
+        )
+        client.get("/search", params={"q": "tomato pasta", "page_size": 1})  # full page: no lookup
+        assert calls == []
+        client.get("/search", params={"q": "tomato pasta", "page_size": 1, "fuzzy": "true"})
+        assert len(calls) == 1
+
+        queries = [{"q": "brad", "fuzzy": True}, {"q": "brad"}]
+        batch = client.post("/search/batch", json={"queries": queries}).json()
+        fuzzy_item, exact_item = batch["results"]
+        assert fuzzy_item["result"]["total_hits"] == 1 and exact_item["result"]["total_hits"] == 0
+        assert exact_item["result"]["did_you_mean"] == "bread"
@@ -0,0 +1,59 @@
+import random
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from astra.api.main import create_app
+from astra.common.config import settings
+from astra.indexer.indexer import Indexer
+from astra.ranker.suggest import CompletionIndex, Suggester
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+
+
+def test_completion_index_matches_brute_force():
+    rng = random.Random(7)  # noqa: S311
+    candidates = {
+        "".join(rng.choices("abc", k=rng.randint(1, 6))): (float(rng.randint(1, 50)), "term")
+        for _ in range(400)
+    }
+    index = CompletionIndex(candidates, k=5, max_prefix_len=3)
+    for prefix in ["a", "ab", "abc", "abca", "cc", "bbbb"]:
+        matches = [t for t in candidates if t.startswith(prefix)]
+        ranked = sorted(matches, key=lambda t: (-candidates[t][0], t))
+        assert [s.text for s in index.complete(prefix)] == ranked[:5]
+
+
+def test_suggest_endpoint():
+    with tempfile.TemporaryDirectory() as td:
+        settings.db_path = f"{td}/suggest.db"
+
+        conn = connect(settings.db_path)
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Pasta recipes", "Fresh pasta with tomato", day)
+        repo.upsert_document("http://x/b", "Pasta sauce", "Tomato sauce for pasta", day)
+        repo.upsert_document("http://x/c", "Patterns", "Design patterns", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        conn.close()
+
+        with TestClient(create_app()) as client:  # the completion index is built at startup
+            r = client.get("/suggest", params={"prefix": "Pa", "k": 3})
+        assert r.status_code == 200
+        suggestions = r.json()["suggestions"]
+        assert suggestions[0] == {"text": "pasta", "score": 2.0, "kind": "term"}
+        texts = {s["text"] for s in suggestions}
+        assert texts <= {"pasta", "pasta recipes", "pasta sauce", "patterns"}
+
+
+def test_query_counts_stay_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "suggest_max_queries", 5)
+    with tempfile.TemporaryDirectory() as td:
+        suggester = Suggester([f"{td}/q.db"])
+        for i in range(100):
+            suggester.record_query("pasta recipes")
+            suggester.record_query(f"one-off query {i}")
+        assert len(suggester.query_counts) <= 10
+        assert suggester.query_counts["pasta recipes"] == 100
+        suggester.rebuild()
+        assert suggester.suggest("pa", 5)[0].text == "pasta recipes"
@@ -0,0 +1,63 @@
+import tempfile
+
+from astra.common.tokenizer import parse_query
+from astra.indexer.indexer import Indexer
+from astra.ranker.bm25 import BM25Ranker
+from astra.storage import term_dict
+from astra.storage.db import connect
+from astra.storage.repo import Repo
+from astra.storage.term_dict import TermDictionary, load_term_dictionary
+
+
+def test_front_coded_lookup_and_prefix_expansion():
+    optim = {f"optim{s}" for s in ("", "al", "ize", "izer", "ization")}
+    terms = sorted(optim | {"opera", "zeta", "alpha"})
+    td = TermDictionary((t, i) for i, t in enumerate(terms))
+
+    assert all(td.lookup(t) == i for i, t in enumerate(terms))
+    assert td.lookup("optimise") is None
+    expanded = [t for t, _ in td.expand_prefix("optimi", limit=10)]
+    assert expanded == ["optimization", "optimize", "optimizer"]
+    assert len(td.expand_prefix("optim", limit=2)) == 2
+
+
+def test_wildcard_query_matches_expanded_terms():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/test.db")
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Optimizer notes", "Gradient optimizers", day)
+        repo.upsert_document("http://x/b", "Optimization", "Query optimization", day)
+        repo.upsert_document("http://x/c", "Cooking", "Boil water", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+
+        scored = BM25Ranker(repo).search(parse_query("optim*"), k=5)
+        assert {s.doc_id for s in scored} == {1, 2}
+        conn.close()
+
+
+def test_dictionary_takes_new_terms_without_rebuilding():
+    with tempfile.TemporaryDirectory() as td:
+        conn = connect(f"{td}/test.db")
+        repo = Repo(conn)
+        day = "2025-01-01T00:00:00Z"
+        repo.upsert_document("http://x/a", "Optimizer notes", "Gradient optimizers", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        first = load_term_dictionary(repo)
+
+        repo.upsert_document("http://x/b", "Optimization", "Query optimization", day)
+        Indexer(repo).index_new_documents(batch_size=10)
+        current = load_term_dictionary(repo)
+        assert current.heads is first.heads  # the front-coded blocks are reused
+        assert current.lookup("optimization") is not None
+        assert current.lookup("gradient") == first.lookup("gradient")
+        expanded = [t for t, _ in current.expand_prefix("optimiz", limit=5)]
+        assert expanded == ["optimization", "optimizer", "optimizers"]
+
+        # compaction front-codes the tail and replaces the cached dictionary
+        term_dict._compact(conn.execute("PRAGMA database_list").fetchone()["file"], current)
+        compacted = load_term_dictionary(repo)
+        assert compacted.heads is not first.heads and len(compacted) == len(current)
+        rows = conn.execute("SELECT term, term_id FROM terms ORDER BY term")
+        assert list(compacted._iter_from(0)) == [(r[0], r[1]) for r in rows]
+        conn.close()
@@ -13,3 +13,16 @@ def test_parse_query_phrases():
     assert q.phrases == ["machine learning"]
     assert "fast" in q.terms
     assert "api" in q.terms
+
+
+def test_parse_query_wildcards():
+    q = parse_query("optim* search")
+    assert q.prefixes == ["optim"]
+    assert q.terms == ["search"]
+
+
+def test_parse_query_boolean_operators():
+    q = parse_query("rust AND python +go -java NOT cobol ruby")
+    assert q.terms == ["rust", "python", "go", "ruby"]
+    assert q.required == ["rust", "python", "go"]
+    assert q.excluded == ["java", "cobol"]